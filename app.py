@@ -2,17 +2,20 @@ import streamlit as st
 from datetime import datetime, date
 from streamlit_drawable_canvas import st_canvas
 import json
-import pandas as pd
 from docx import Document
 from docx.shared import Inches
 import io
 from PIL import Image
 import numpy as np
-import smtplib
-from email.message import EmailMessage
 import re
 from dotenv import load_dotenv
 import os
+from blob_store import get_blob_store, store_upload
+from catalog import get_catalog, SUBJECT_AREA_FILE_V1
+from document_images import normalize_in_background, normalized_handle
+import mailer
+from resumable_upload import resumable_uploader, store_spooled_upload
+from settings import get_settings
 
 # Set page configuration with a favicon
 st.set_page_config(
@@ -38,17 +41,38 @@ def get_secret(key):
         return None
 
 if 'files' not in st.session_state:
-    st.session_state.files = []
+    st.session_state.files = []  # handles of the uploaded documents (see blob_store.py)
 
-# Load country names and dialing codes from the JSON file
-with open("resources/world-countries.json") as file:
-    data = json.load(file)
-    countries = {entry['name']: entry['dialing_code'] for entry in data}  # Map country name to dialing code
-country_names = ["Select"] + sorted(countries.keys())  # Sort country names
-
-# Load subject areas from the text file
-with open("resources/subject_area_list.txt", "r") as file:
-    subject_areas = [line.strip() for line in file.readlines()]
+def add_upload(uploaded_file, types=None):
+    # Copy the upload into the blob store once and keep only its handle
+    # (uploads from the resumable uploader are already on disk)
+    if uploaded_file is None:
+        return None
+    if isinstance(uploaded_file, dict):
+        handle, warning = store_spooled_upload(st.session_state, uploaded_file, types)
+    else:
+        handle, warning = store_upload(st.session_state, uploaded_file)
+    if warning:
+        st.warning(warning)
+    elif handle["sha256"] not in [h["sha256"] for h in st.session_state.files]:
+        st.session_state.files.append(handle)
+        normalize_in_background(handle)  # a smaller copy of photos for the email
+    return handle
+
+def upload_document(label, key):
+    # One document, through the resumable uploader (see resumable_upload.py)
+    # when RESUMABLE_UPLOADS is on
+    types = ["jpg", "png", "pdf", "docx"]
+    if get_settings().resumable_uploads:
+        uploads = resumable_uploader(label, types, key, multiple=False)
+        return add_upload(uploads[-1] if uploads else None, types)
+    return add_upload(st.file_uploader(label, type=types, key=key))
+
+# Load the shared reference data (built once per process, reloaded only when a resource file changes)
+catalog = get_catalog(SUBJECT_AREA_FILE_V1, with_courses=False)
+countries = catalog.countries  # Map country name to dialing code
+country_names = catalog.country_names  # "Select" + sorted country names
+subject_areas = catalog.subject_areas
 
 # The sub-options for each subject area, like Foundation, Undergraduate, etc.
 sub_options = [
@@ -113,33 +137,15 @@ def is_signature_drawn(signature):
         return True
     return False
 
-# Function to send email with attachments (Handle Local + Uploaded)
+# Function to send email with attachments (Handle Local + Uploaded), streamed
+# from disk through the shared SMTP connection pool (see mailer.py)
 def send_email_with_attachments(sender_email, sender_password, receiver_email, subject, body, files=None, local_file_path=None):
-    msg = EmailMessage()
-    msg['From'] = sender_email
-    msg['To'] = ", ".join(receiver_email)
-    msg['Subject'] = subject
-    msg.set_content(body, subtype='html')
-
-    # Attach uploaded files
-    if files:
-        for uploaded_file in files:
-            uploaded_file.seek(0)  # Move to the beginning of the UploadedFile
-            msg.add_attachment(uploaded_file.read(), maintype='application', subtype='octet-stream', filename=uploaded_file.name)
-
-    # Attach local file if specified
-    if local_file_path:
-        with open(local_file_path, 'rb') as f:
-            file_data = f.read()
-            file_name = local_file_path.split('/')[-1]
-            msg.add_attachment(file_data, maintype='application', subtype='octet-stream', filename=file_name)
-
-    # Use Gmail SMTP server for sending the email (office365 for outlook)
-    with smtplib.SMTP('smtp.gmail.com', 587) as server:
-        server.ehlo()
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.send_message(msg)
+    # Uploaded files are handles into the blob store; photos go as their
+    # normalized copies (see document_images.py)
+    store = get_blob_store()
+    uploads = [(store.path(handle["sha256"]), handle["name"]) for handle in map(normalized_handle, files or [])]
+    mailer.send_email_with_attachments(sender_email, sender_password, receiver_email, subject, body,
+                                       files=uploads, local_file_path=local_file_path)
 
 # Initialize session state variables if they do not exist
 if 'step' not in st.session_state:
@@ -467,8 +473,8 @@ if st.session_state.step == 8:
     # Subject area selection
     st.session_state.subject_area = st.selectbox(
         "Please select the subject area.", 
-        ["Select"] + sorted(subject_areas),  # Subject areas loaded from the text file
-        index=(sorted(subject_areas).index(st.session_state.subject_area) + 1) if st.session_state.subject_area in subject_areas else 0
+        catalog.subject_area_options,  # Subject areas loaded from the text file
+        index=catalog.subject_area_options.index(st.session_state.subject_area) if st.session_state.subject_area in subject_areas else 0
     )
 
     # Sub-option selection based on the selected subject area
@@ -518,17 +524,11 @@ elif st.session_state.step == 9:
     st.text("(*Upload of any 1 document is mandatory)")
 
     # Upload front and back of the document
-    st.session_state.front_id_document = st.file_uploader("Please upload a scan or photo of the front of your passport or ID.", type=["jpg", "png", "pdf", "docx"], key="front")
-    if st.session_state.front_id_document is not None:
-        if st.session_state.front_id_document not in st.session_state.files:
-            st.session_state.files.append(st.session_state.front_id_document)
+    st.session_state.front_id_document = upload_document("Please upload a scan or photo of the front of your passport or ID.", "front")
     # if st.session_state.front_id_document is not None:
     #     st.session_state.files(st.session_state.front_id_document)
 
-    st.session_state.back_id_document = st.file_uploader("Please upload a scan or photo of the back of your passport or ID.", type=["jpg", "png", "pdf", "docx"], key="back")
-    if st.session_state.back_id_document is not None:
-        if st.session_state.back_id_document not in st.session_state.files:
-            st.session_state.files.append(st.session_state.back_id_document)
+    st.session_state.back_id_document = upload_document("Please upload a scan or photo of the back of your passport or ID.", "back")
     # if st.session_state.back_id_document is not None:
     #      st.session_state.files(st.session_state.back_id_document)
     
@@ -551,10 +551,7 @@ elif st.session_state.step == 9:
 
 elif st.session_state.step == 10:
     st.title("> 9: Proof of Address")
-    st.session_state.address_proof = st.file_uploader("*Please upload a scan or photo of your proof of address.", type=["jpg", "png", "pdf", "docx"])
-    if st.session_state.address_proof is not None:
-        if st.session_state.address_proof not in st.session_state.files:
-            st.session_state.files.append(st.session_state.address_proof)
+    st.session_state.address_proof = upload_document("*Please upload a scan or photo of your proof of address.", "address")
 
     # Navigation buttons
     next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
@@ -701,7 +698,7 @@ elif st.session_state.step == 13:
     if st.session_state.files:
         st.write("Files uploaded:", len(st.session_state.files))
         for file in st.session_state.files:
-            st.write(f"File name: {file.name}, File type: {file.type}")
+            st.write(f"File name: {file['name']}, File type: {file['type']}")
     else:
         st.write("No files uploaded.")
     
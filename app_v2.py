@@ -1,192 +1,313 @@
 import streamlit as st
 from datetime import datetime, date
-from streamlit_drawable_canvas import st_canvas
-import json
-import pandas as pd
-from docx import Document
-from docx.shared import Inches
-import io
-from PIL import Image
-import numpy as np
-import smtplib
-from email.message import EmailMessage
-import re
-from dotenv import load_dotenv
-import os
-
-# Set page configuration with a favicon
+from functools import partial
+from assets import FAVICON, animation_html, favicon_url, icon_html
+from blob_store import store_upload
+from catalog import get_catalog
+from course_search import PAGE_SIZE
+from document_images import normalize_in_background
+from phone_numbers import normalize as normalize_phone, strip_trunk_prefix
+from form_schema import Note, get_form_schema
+from profiling import PROFILE_RUNS, count_script_run, meter_deltas
+from resumable_upload import resumable_uploader, store_spooled_upload
+from settings import get_settings
+from signature import capture_signature, is_signature_drawn, signature_preview
+from submission import enqueue_submission, get_submission_outbox, submission_record
+
+# Heavy dependencies (streamlit_drawable_canvas, numpy, PIL, docx, smtplib) are
+# imported inside the step (or outbox worker) that needs them, so steps 1-11
+# never pay for them.
+# Run `python profiling.py imports` to see what each one costs.
+
+# Set page configuration with a favicon (served from static/, see assets.py;
+# the full logo through st.image's media files until the assets are built)
 st.set_page_config(
     page_title="AspireCraft Enrolment Form",
-    page_icon="https://static.wixstatic.com/media/9699d3_131754d4208c4cfa86e38e9316e5df81~mv2.png/v1/fill/w_204,h_204,al_c,q_85,usm_0.66_1.00_0.01,enc_avif,quality_auto/9699d3_131754d4208c4cfa86e38e9316e5df81~mv2.png",  # Path to your logo
+    page_icon=favicon_url() or FAVICON,
     layout="centered"  # "centered" or "wide"
 )
 
-# add render support along with st.secret
-def get_secret(key):
-    try:
-        load_dotenv()
-        # Attempt to get the secret from environment variables
-        secret = os.environ.get(key)
-        if secret is None:
-            raise ValueError("Secret not found in environment variables")
-        return secret
-    except (ValueError, TypeError) as e:
-        # If an error occurs, fall back to Streamlit secrets
-        if hasattr(st, 'secrets'):
-            return st.secrets.get(key)
-        # If still not found, return None or handle as needed
-        return None
-
-# Load country names and dialing codes from the JSON file
-with open("resources/world-countries.json") as file:
-    data = json.load(file)
-    countries = {entry['name']: entry['dialing_code'] for entry in data}  # Map country name to dialing code
-country_names = ["Select"] + sorted(countries.keys())  # Sort country names
-
-# Load nationalities from the JSON file
-with open("resources/nationalities.json", "r") as f:
-    nationalities = json.load(f)
-    
-# Load subject areas from the text file
-with open("resources/subject_area_list_v2.txt", "r") as file:
-    subject_areas = [line.strip() for line in file.readlines()]
-
-# Load and process the CPD Excel file
-# df = pd.read_excel('courses.xlsx', sheet_name=0)
-df = pd.read_excel('resources/CPD_course_list.xlsx', sheet_name=0)
-df = df.drop_duplicates(subset=['Category', 'Course Title'])
-category_courses = df.groupby('Category')['Course Title'].apply(list).to_dict()
-category_courses = df.groupby('Category')['Course Title'].apply(lambda x: sorted(set(x))).to_dict()
-
-# The sub-options for each subject area, like Foundation, Undergraduate, etc.
-sub_options = [
-    "Foundation",
-    "Undergraduate",
-    "Pre-Masters",
-    "Postgraduate",
-    "PhD & Research",
-    "Professional development"
-]
-
-# Learning modes (these are hypothetical, but you can adjust them to your case)
-learning_modes = ["Online", "Blended", "On-Campus"]
-
-# Function to validate the phone number
-def validate_phone_number(phone, dialing_code):
-    # Remove all spaces and dashes from the phone number
-    phone = phone.replace(" ", "").replace("-", "")
-    
-    # Check if the phone number starts with the correct dialing code
-    # if not phone.startswith(dialing_code):
-    #     return False, f"Phone number must start with {dialing_code}."
-    
-    # Extract the number part (remove the dialing code)
-    number_without_code = phone[len(dialing_code):]
-    
-    # Ensure the number part contains only digits and has a valid length (e.g., 10-15 digits)
-    if not number_without_code.isdigit():
-        return False, "Phone number must contain only digits after the dialing code."
-    
-    # if not (10 <= len(number_without_code) <= 15):
-    #     return False, "Phone number must be between 10 and 15 digits long (excluding country code)."
-    
-    return True, ""
-
-def is_valid_email(email):
-    # Comprehensive regex for email validation
-    pattern = r'''
-        ^                         # Start of string
-        (?!.*[._%+-]{2})          # No consecutive special characters
-        [a-zA-Z0-9._%+-]{1,64}    # Local part: allowed characters and length limit
-        (?<![._%+-])              # No special characters at the end of local part
-        @                         # "@" symbol
-        [a-zA-Z0-9.-]+            # Domain part: allowed characters
-        (?<![.-])                 # No special characters at the end of domain
-        \.[a-zA-Z]{2,}$           # Top-level domain with minimum 2 characters
-    '''
-    
-    # Match the entire email against the pattern
-    return re.match(pattern, email, re.VERBOSE) is not None
-
-def is_signature_drawn(signature):
-    # Check if signature is None or an empty numpy array
-    if signature is None:
-        return False
-    # Ensure it is a numpy array and has content
-    if isinstance(signature, np.ndarray) and signature.size > 0:
-        # Additional check: if the array is not just empty white pixels
-        # Assuming white background is [255, 255, 255] in RGB
-        if np.all(signature == 255):
-            return False
-        return True
-    return False
-
-# Function to send email with attachments (Handle Local + Uploaded)
-def send_email_with_attachments(sender_email, sender_password, receiver_email, subject, body, files=None, local_file_path=None):
-    msg = EmailMessage()
-    msg['From'] = sender_email
-    msg['To'] = ", ".join(receiver_email)
-    msg['Subject'] = subject
-    msg.set_content(body, subtype='html')
-
-    # Attach uploaded files
-    if files:
-        for uploaded_file in files:
-            uploaded_file.seek(0)  # Move to the beginning of the UploadedFile
-            msg.add_attachment(uploaded_file.read(), maintype='application', subtype='octet-stream', filename=uploaded_file.name)
-
-    # Attach local file if specified
-    if local_file_path:
-        with open(local_file_path, 'rb') as f:
-            file_data = f.read()
-            file_name = local_file_path.split('/')[-1]
-            msg.add_attachment(file_data, maintype='application', subtype='octet-stream', filename=file_name)
-
-    # Use Gmail SMTP server for sending the email (office365 for outlook)
-    with smtplib.SMTP('smtp.gmail.com', 587) as server:
-        server.ehlo()
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.send_message(msg)
+# Start the background submission workers (once per process); this also
+# resumes any jobs left in the outbox by a previous run
+get_submission_outbox()
+
+# Load the shared reference data (built once per process, reloaded only when a resource file changes)
+catalog = get_catalog()
+countries = catalog.countries  # Map country name to dialing code
+country_names = catalog.country_names  # "Select" + sorted country names
+nationalities = catalog.nationalities
+subject_areas = catalog.subject_areas
+category_courses = catalog.category_courses
+
+# Every question of steps 2-11 (widget, options, validation, review label) is
+# described once in form_schema.py and compiled once per catalog
+schema = get_form_schema(catalog)
+
+# Navigation: the Next/Back buttons change the step in an on_click callback,
+# which Streamlit runs before the script, so each click costs exactly one
+# script run (setting the step after the button and calling
+# st.experimental_rerun() ran the whole script twice). Next only moves on when
+# the step's check returns no warnings; otherwise they are shown under the buttons.
+def go_to_step(step):
+    st.session_state.step = step
+
+def go_next(step, check=None):
+    warnings = check() if check else []
+    if warnings:
+        st.session_state.nav_warnings = warnings
+    else:
+        st.session_state.step = step
+
+def navigation_buttons(next_step, back_step, check=None, in_form=False):
+    if in_form:
+        # Inside an st.form the fields are only sent to the server when one of
+        # these is pressed, so typing and picking options costs no script runs
+        st.form_submit_button("Next", on_click=go_next, args=(next_step, check))
+        st.form_submit_button("Back", on_click=go_to_step, args=(back_step,))
+    else:
+        st.button("Next", key=f"next_{st.session_state.step}", on_click=go_next, args=(next_step, check))
+        st.button("Back", key=f"back_{st.session_state.step}", on_click=go_to_step, args=(back_step,))
+    for message in st.session_state.pop("nav_warnings", []):
+        st.warning(message)
+
+# Draw one schema field; its value lives in session state under field.key
+def render_field(field, in_form=False):
+    state = st.session_state
+    # Inside a form a field cannot appear when another one changes, so
+    # conditional fields are always shown there
+    if not (in_form or schema.is_shown(field, state)):
+        state[field.key] = schema.default_for(field.key)
+        return
+
+    if field.widget == "select":
+        st.selectbox(field.label, schema.options[field.key], key=field.key)
+    elif field.widget == "radio":
+        st.radio(field.label, options=schema.options[field.key], key=field.key)
+    elif field.widget == "multiselect":
+        st.multiselect(field.label, schema.options[field.key], key=field.key)
+    elif field.widget == "text":
+        st.text_input(field.label, placeholder=field.placeholder, key=field.key)
+    elif field.widget == "textarea":
+        st.text_area(field.label, key=field.key)
+    elif field.widget == "checkbox":
+        st.checkbox(field.label, key=field.key)
+    elif field.widget == "date":
+        # Check if the value is a string and convert it back to a date object
+        if isinstance(state.get(field.key), str):
+            state[field.key] = datetime.strptime(state.get(field.key), "%d-%m-%Y").date()
+        # The latest date allowed is min_age years ago from today
+        today = date.today()
+        st.date_input(
+            label=field.label,
+            min_value=field.min_value,
+            max_value=today.replace(year=today.year - field.min_age),
+            help=field.help,
+            format='DD/MM/YYYY',
+            key=field.key
+        )
+    elif field.widget == "course_search":
+        render_course_search(field)
+
+    # A follow-up question for each selected option
+    if field.per_option:
+        detail = field.per_option
+        if field.heading:
+            st.write(field.heading)
+        for option in state[field.key]:
+            with st.expander(detail.heading.format(option=option)):
+                st.text_area(detail.label.format(option=option), key=detail.key.format(option=option))
+
+# CPD courses: a search box and one page of matching courses as checkboxes
+# (whatever the size of the catalog). The selection is a set of course IDs in
+# session state under field.key, updated by the checkbox callbacks.
+def toggle_course(key, course_id):
+    if st.session_state[f"course_{course_id}"]:
+        st.session_state[key].add(course_id)
+    else:
+        st.session_state[key].discard(course_id)
+
+def change_course_page(change):
+    st.session_state.course_page = st.session_state.get("course_page", 0) + change
+
+def reset_course_page():
+    # A new search starts on the first page
+    st.session_state.course_page = 0
+
+def render_course_search(field):
+    state = st.session_state
+    index = catalog.course_index
+    selected = state[field.key]
+
+    st.text_input(field.label, placeholder=field.placeholder, key="course_query", on_change=reset_course_page)
+    # The category, when one is picked, narrows the search down
+    category = state.get("category") if state.get("category") in index.category_ranges else None
+    query = state.get("course_query", "")
+    page = state.get("course_page", 0)
+    results, total = index.search(query, category, page)
+    if not results and page:
+        page = state.course_page = 0
+        results, total = index.search(query, category, page)
+
+    for course_id, _, title in results:
+        st.checkbox(title, value=course_id in selected, key=f"course_{course_id}",
+                    on_change=toggle_course, args=(field.key, course_id))
+    if not results:
+        st.write("No courses match your search.")
+
+    if total > PAGE_SIZE:
+        first = page * PAGE_SIZE
+        st.caption(f"Showing {first + 1}-{first + len(results)} of {total} courses")
+        cols = st.columns(2)
+        with cols[0]:
+            st.button("Previous courses", disabled=page == 0, on_click=change_course_page, args=(-1,))
+        with cols[1]:
+            st.button("More courses", disabled=first + len(results) >= total, on_click=change_course_page, args=(1,))
+    if selected:
+        st.caption("Selected: " + ", ".join(title.strip() for title in index.titles(selected)))
+
+# Supporting documents (steps 9 and 10): each new upload is stored once, in
+# the uploader's callback, in the content-addressed store (blob_store.py);
+# the session keeps only small handles, one per distinct content. The
+# resumable uploader (resumable_upload.py) has already written the file to
+# disk in chunks, so it only needs to be looked up. Photos are then scaled
+# down for the team's email on a background thread (document_images.py).
+def add_uploads(key, list_key, types):
+    state = st.session_state
+    stored = state.setdefault(list_key, [])
+    for file in state[key] or []:
+        if isinstance(file, dict):
+            handle, warning = store_spooled_upload(state, file, types)
+        else:
+            handle, warning = store_upload(state, file)
+        if warning:
+            state.setdefault("upload_warnings", []).append(warning)
+        elif handle["sha256"] not in {h["sha256"] for h in stored}:
+            stored.append(handle)
+            normalize_in_background(handle)
+
+def render_uploads(label, types, key, list_key, heading):
+    if get_settings().resumable_uploads:
+        resumable_uploader(label, types, key, on_change=partial(add_uploads, key, list_key, types))
+    else:
+        st.file_uploader(label, type=types, accept_multiple_files=True, key=key,
+                         on_change=add_uploads, args=(key, list_key, types))
+    for message in st.session_state.pop("upload_warnings", []):
+        st.warning(message)
+    if st.session_state.get(list_key):
+        st.write(heading)
+        for handle in st.session_state[list_key]:
+            st.write(f"- {handle['name']} ({handle['size'] / 1024:.0f} KB)")
+
+# Draw a whole step from the schema: title, fields and notes, then Next/Back,
+# which only moves on when schema.check_step finds nothing missing
+def render_step(number):
+    step = schema.steps[number]
+    if step.title:
+        st.title(step.title)
+
+    # Steps in a form send all their fields together when Next/Back is pressed
+    with (st.form(f"step_{number}") if step.in_form else st.container()):
+        for item in step.items:
+            if isinstance(item, Note):
+                getattr(st, item.kind)(item.text)
+            else:
+                render_field(item, step.in_form)
+
+        navigation_buttons(step.next_step, step.back_step, partial(schema.check_step, number, st.session_state),
+                           in_form=step.in_form)
+
+# The Final Review as one markdown block per section, instead of one element
+# per answer. Cached by the record's digest (the summary itself is not hashed),
+# so reruns of the review and learners with the same answers reuse it.
+@st.cache_data(max_entries=256, show_spinner=False)
+def review_markdown(digest, _summary):
+    blocks = [[]]
+    for kind, label, value in _summary:
+        if kind == "section":
+            blocks.append([f"## {value}"])
+            continue
+        lines = blocks[-1]
+        if kind in ("field", "no_services"):
+            lines.append(f"**{label}:** {value}")
+        elif kind == "services":
+            lines.append(f"**{label}:**")
+        elif kind == "service":
+            lines.append(f"### {label}")
+        elif kind == "unknown_service":
+            lines.append(value)
+        elif kind in ("service_field", "no_options"):
+            lines.append(f"- **{label}:** {value}")
+        elif kind == "options":
+            lines.append(f"- **{label}:**")
+        elif kind == "option":
+            lines.append(f"  - {value}")
+        elif kind == "option_detail":
+            lines.append(f"    - **{label}:** {value}")
+    # Paragraphs apart, list items (and their nested items) on consecutive lines
+    markdown = []
+    for lines in blocks:
+        if not lines:
+            continue
+        text = lines[0]
+        for previous, line in zip(lines, lines[1:]):
+            is_item = previous.lstrip().startswith("- ") and line.lstrip().startswith("- ")
+            text += ("\n" if is_item else "\n\n") + line
+        markdown.append(text)
+    return markdown
 
 # Initialize session state variables if they do not exist
 if 'step' not in st.session_state:
     st.session_state.step = 1
     st.session_state.submission_done = False
-    st.session_state.personal_info = ""  # Full name
-    st.session_state.dob = None  # Date of birth
-    st.session_state.gender = "Select"  # Gender
-    st.session_state.country = ""  # Country of residence
-    st.session_state.email = ""  # Email address
-    # st.session_state.phone = ""  # Phone number
-    # st.session_state.address = ""  # Residential address
-    st.session_state.current_institution = ""  # Current institution
-    # st.session_state.start_date = None  # Uncomment if needed
     st.session_state.front_id_document = None  # Front ID document
     st.session_state.back_id_document = None  # Back ID document
     st.session_state.address_proof = None  # Address proof document
     st.session_state.additional_document = None  # Additional documents if needed
-    # st.session_state.learning_preferences = ""  # Learning preferences
-    st.session_state.special_requirements = ""  # Special requirements
-    # st.session_state.emergency_contact = ""  # Emergency contact information
-    st.session_state.consent = False  # Consent for data processing
-    st.session_state.signature = None  # Store signature
-    
-    st.session_state.sub_option = "Select"  # Default value
-    st.session_state.learning_mode = "Select"  # Default value
-    st.session_state.qualification_or_experience = "Select"  # Default value
-    st.session_state.vocational_sector = "Select"  # Default value
-    st.session_state.vocational_other = ""  # Default value
-    st.session_state.sector_accreditation = "Select"
-    st.session_state.ielts_reason = "Select"
-    st.session_state.internship_package = "Select"
-    st.session_state.cohort_date = "Select"
-    st.session_state.business_services  = None
-    st.session_state.category = "Select"  # Default value
-    st.session_state.courses = []  # Default to empty list
-    st.session_state.learning_mode_cpd = "Online"  # Default value    
-    st.session_state.selected_course = {}  # To store selected details   
-    st.session_state.selected_option = "    "
+    st.session_state.signature = None  # Store signature (strokes or compact PNG bytes)
+    st.session_state.signature_drawing = None  # Canvas JSON, to redraw the signature after Back
+    st.session_state.selected_course = {}  # To store selected details
+    st.session_state.dialing_code = ""
+
+    # Every form widget's starting value (widgets read them through their key)
+    for key in schema.defaults:
+        st.session_state[key] = schema.default_for(key)
+
+# Form widgets keep their values under their keys. Streamlit forgets the value
+# of a widget that is not on screen, so they are re-saved on every run to keep
+# them while the learner moves between steps.
+for key in list(st.session_state.keys()):
+    if schema.is_widget_key(key):
+        st.session_state[key] = st.session_state[key]
+# A choice that is no longer offered (the catalog changed) goes back to its default
+schema.sanitize(st.session_state)
+
+
+# Count this script run against the step it started on (PROFILE_RUNS=1 shows the counts)
+script_runs = count_script_run(st.session_state, st.session_state.step)
+if PROFILE_RUNS:
+    # Also count the elements (and bytes) each run sends to the browser
+    deltas = meter_deltas(st.session_state, st.session_state.step)
+    st.sidebar.write("Script runs per step")
+    st.sidebar.json(script_runs)
+    st.sidebar.write("Elements and bytes sent by the last run of each step")
+    st.sidebar.json(deltas)
+
+# Step 6: (download link, icon, alt text) per device
+WHATSAPP_DOWNLOADS = (
+    ("https://play.google.com/store/apps/details?id=com.whatsapp", "resources/icons/android.png", "Download for Android"),
+    ("https://apps.apple.com/app/whatsapp-messenger/id310633997", "resources/icons/iphone.png", "Download for iOS"),
+    ("https://get.microsoft.com/installer/download/9NKSQGP7F2NH", "resources/icons/windows.png", "Download for Windows"),
+    ("https://web.whatsapp.com/desktop/mac_native/release/?configuration=Release", "resources/icons/macbook.png", "Download for Mac"),
+)
+
+# The welcome/thank-you animations:the prebuilt WebP from static/ (see
+# assets.py), or the original GIF when the assets have not been built
+def show_animation(path):
+    picture = animation_html(path, alt="AspireCraft")
+    if picture and st.get_option("server.enableStaticServing"):
+        st.markdown(picture, unsafe_allow_html=True)
+    else:
+        st.image(path, use_column_width=True)
 
 
 # Define a function to calculate progress and percentage
@@ -207,7 +328,7 @@ st.progress(progress)
 
 # Define the different steps
 if st.session_state.step == 1:
-    st.image('resources/AspireCraft_resized.gif', use_column_width=True)
+    show_animation('resources/AspireCraft_resized.gif')
     # st.image(Image.open('resources/logo.png').resize((500, 300)), use_column_width=True)
 
     st.title("WELCOME TO ASPIRECRAFT!")
@@ -219,1635 +340,267 @@ if st.session_state.step == 1:
 
         Let’s get started!
     """)
-    if st.button("Next"):
-        st.session_state.step = 2
-        st.experimental_rerun()
+    st.button("Next", key="next_1", on_click=go_to_step, args=(2,))
 
 elif st.session_state.step == 2:
-    
-    # Add question with a dropdown menu
-    support_options = [
-    "    ", "Self", "M.I. Rushan", "Jaad Javed", "Shaad Javed", "Mohamed Sathath", "Aakifah Asger", "Navin Yogarasu", 
-    "Rochelle Ravishankar", "Dhilshan Abdul Rahman", "Pasindu Chamodya Nanayakkara", "Dinith Ferdinando"
-]
-    st.session_state.selected_option = st.selectbox(
-    "Who is supporting you to fill this form?", 
-    support_options
-)
-        
-    st.title("> 1: Personal Information")
-    
-    # Ensure the personal_info variable is correctly set from the session state
-    st.session_state.personal_info = st.text_input(
-        "Please enter your full name as it appears on your official documents.",
-        value=st.session_state.personal_info  # Retain previous value
-    )
-
-    # Next and Back buttons for navigation
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    # Handle Next button click
-    if next_clicked:
-        if st.session_state.personal_info and st.session_state.selected_option!='    ':  # Check if the field is not empty
-            st.session_state.step = 3  # Move to the next step
-            st.experimental_rerun()  # Refresh the app to reflect the new step
-        else:
-            if st.session_state.selected_option=='    ':
-                st.warning("Please select SUPPORTING option before proceeding.")
-            else:
-                st.warning("Please enter your full name before proceeding.")
-
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 1  # Go back to the previous step (Section 1)
-        st.experimental_rerun()  # Refresh to update the step
+    # Supporting person and full name
+    render_step(2)
 
 
 elif st.session_state.step == 3:
-    st.title("> 2: Date of Birth")
-    # Check if dob is a string and convert it back to a date object
-    if isinstance(st.session_state.get("dob"), str):
-        st.session_state.dob = datetime.strptime(st.session_state.get("dob"), "%d-%m-%Y").date()
-
     # Date of Birth
-    # Calculate the maximum allowable date (9 years ago from today)
-    max_date = date.today().replace(year=date.today().year - 14)
-    
-    st.session_state.dob = st.date_input(
-        label="Date of Birth",  # Label for the field
-        value=st.session_state.get("dob"),  # Correctly access dob from session state
-        min_value=date(1900, 1, 1),  # Minimum selectable date
-        max_value=max_date,  # Maximum selectable date (at least 9 years old)
-        help="Choose a date",  # Tooltip text
-        format='DD/MM/YYYY'
-    )
-    
-    # Next and Back buttons for navigation
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    # Handle Next button click
-    if next_clicked:
-        if st.session_state.dob:
-            # Convert the selected date to the desired string format (DD-MM-YYYY) only when proceeding to the next step
-            # st.session_state.dob = st.session_state.dob.strftime("%d-%m-%Y")
-
-            st.session_state.step = 4
-            st.experimental_rerun()
-        else:
-            st.warning("Please select your date of birth before proceeding.")
-
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 2  # Go back to the previous step (Section 1)
-        st.experimental_rerun()
+    render_step(3)
 
 
 elif st.session_state.step == 4:
-    st.title("> 3: Gender")
-
-    # Initialize gender if it doesn't exist
-    if 'gender' not in st.session_state:
-        st.session_state.gender = "Select"  # Default value
-
-    # Select gender using the selectbox, retaining the previous value
-    st.session_state.gender = st.selectbox(
-        "Please select your gender.", 
-        ["Select", "Male", "Female", "Other"],
-        index=["Select", "Male", "Female", "Other"].index(st.session_state.gender)  # Set default value based on session state
-    )
-
-    # Next and Back buttons for navigation
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    # Handle Next button click
-    if next_clicked:
-        if st.session_state.gender != "Select":
-            st.session_state.step = 5
-            st.experimental_rerun()
-        else:
-            st.warning("Please select your gender before proceeding.")
-
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 3  # Go back to the previous step (Section 2)
-        st.experimental_rerun()
+    # Gender
+    render_step(4)
 
 
 # Step 5: Country selection
 elif st.session_state.step == 5:
-    st.title("> 4: Country of Residence, Nationality, and Preferred Language")
-
-    # Initialize country, nationality, and preferred language if they don't exist
-    if 'country' not in st.session_state:
-        st.session_state.country = "Select"  # Default value
-    if 'nationality' not in st.session_state:
-        st.session_state.nationality = "Select"  # Default value
-    if 'preferred_language' not in st.session_state:
-        st.session_state.preferred_language = ""  # Default value
-
-    # Select country using the selectbox, retaining the previous value
-    st.session_state.country = st.selectbox(
-        "Please select your country of residence:", 
-        country_names,  # Use the predefined country_names list
-        index=country_names.index(st.session_state.country) if st.session_state.country in country_names else 0
-    )
-
-    # Select nationality using the selectbox, retaining the previous value
-    st.session_state.nationality = st.selectbox(
-        "Please select your nationality:",
-        ["Select"] + nationalities,  # Load from the JSON file
-        index=(["Select"] + nationalities).index(st.session_state.nationality) 
-        if st.session_state.nationality in nationalities else 0
-    )
-
-    # Text box for Preferred Language of Communication
-    st.session_state.preferred_language = st.text_input(
-        "Preferred Language of Communication: (OPTIONAL)",
-        value=st.session_state.preferred_language,  # Retain the previous input
-        placeholder="Enter your preferred language (e.g., English, Urdu)"
-    )
-
-    # Next and Back buttons for navigation
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    # Handle Next button click
-    if next_clicked:
-        # if st.session_state.country != "Select" and st.session_state.nationality != "Select" and st.session_state.preferred_language.strip():
-        if st.session_state.country != "Select" and st.session_state.nationality != "Select":
-            st.session_state.step = 6
-            st.experimental_rerun()
-        else:
-            st.warning("Please complete all fields (Country, Nationality, and Preferred Language) before proceeding.")
-
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 4  # Go back to the previous step (Section 3)
-        st.experimental_rerun()
+    # Country of residence, nationality and preferred language, sent together in one form
+    render_step(5)
 
 # Step 6: Contact Information
 elif st.session_state.step == 6:
-    st.title("> 5: Contact Information")
-
-    # Get the selected country's dialing code from the countries dictionary
-    selected_dialing_code = countries.get(st.session_state.country, "")
-
-    # Initialize fields if they do not exist
-    if 'email' not in st.session_state:
-        st.session_state.email = ""  # Default to empty string
-    # if 'phone' not in st.session_state:
-    #     st.session_state.phone = ""  # Default to empty string
-    # if 'address' not in st.session_state:
-    #     st.session_state.address = ""  # Default to empty string
-    if 'selected_country' not in st.session_state:
-        st.session_state.selected_country = "Select"
-    if 'dialing_code' not in st.session_state:
-        st.session_state.dialing_code = ""
-    if 'phone_number' not in st.session_state:
-        st.session_state.phone_number = ""
-        
-    # Input fields for contact information
-    st.session_state.email = st.text_input("Please enter your email address where we can reach you.", value=st.session_state.email)
-
-    # Display the country dialing code before the phone number input
-    # st.session_state.phone = st.text_input(
-    #     f"Please enter your WhatsApp number (international format starting with {selected_dialing_code} for {st.session_state.country}):", 
-    #     value=st.session_state.phone
-    # )
-    # st.session_state.phone = st.text_input(
-    #     f"Please Enter Your Contact number:", 
-    #     value=st.session_state.phone
-    # )
+    st.title(schema.steps[6].title)
 
-# ###############
     # Display country dropdown, dialing code, and phone number in a single row
     
     st.write("Please Enter Your Contact number:")
-    cols = st.columns([2, 0.4, 3])  # Adjust column widths as needed
-
-    with cols[0]:  # Country Dropdown
-        previous_country = st.session_state.get("selected_country", country_names[0])
-        st.session_state.selected_country = st.selectbox(
-            "Country:",
-            country_names,
-            index=country_names.index(previous_country) if previous_country in country_names else 0
-        )
 
     # Update dialing code if the selected country changes
-    if st.session_state.selected_country != previous_country:
+    def update_dialing_code():
         st.session_state.dialing_code = countries.get(st.session_state.selected_country, "")
-        
-    with cols[1]:  # Dialing Code
-        st.write("")  # Placeholder for alignment
-        st.write("")  # Placeholder for alignment
-        st.markdown(f"<p style='text-align:left; margin-top:2px;'><strong>{st.session_state.dialing_code}</strong></p>", unsafe_allow_html=True)
-
-    with cols[2]:  # Phone Number Input
-        st.session_state.phone_number = st.text_input(
-            "Phone Number:",
-            value=st.session_state.phone_number,
-            placeholder="Enter your contact number"
-        )
 
-    # Automatically remove leading zeros from the phone number
-    if st.session_state.phone_number.startswith("0"):
-        st.session_state.phone_number = st.session_state.phone_number.lstrip("0")
+    # The dialing code follows the country as soon as it is picked; as a
+    # fragment, only this row reruns for that, not the whole script
+    @st.experimental_fragment
+    def dialing_country():
+        cols = st.columns([2, 0.4, 3])  # Adjust column widths as needed
+
+        with cols[0]:  # Country Dropdown
+            st.selectbox(
+                schema.fields["selected_country"].label,
+                schema.options["selected_country"],
+                key="selected_country",
+                on_change=update_dialing_code
+            )
+
+        with cols[1]:  # Dialing Code
+            st.write("")  # Placeholder for alignment
+            st.write("")  # Placeholder for alignment
+            st.markdown(f"<p style='text-align:left; margin-top:2px;'><strong>{st.session_state.dialing_code}</strong></p>", unsafe_allow_html=True)
+
+    dialing_country()
+
+    # The phone number and email are sent together when Next/Back is pressed
+    step_6_form = st.form("step_6")
+    with step_6_form:
+        # Phone number and email inputs
+        render_field(schema.fields["phone_number"], in_form=True)
+        render_field(schema.fields["email"], in_form=True)
     
 # ###############
 
-    # Display the WhatsApp call availability message
-    st.markdown(
-        """
-        ### Ensure WhatsApp Call Availability:
-        We may contact you via WhatsApp. Please make sure your phone number is connected to WhatsApp and can receive international calls.
-        """
-    )
-    # Display clickable images in a single line
-    st.write("Download WhatsApp for your device:")
-
-    st.markdown(
-        """
-        <div style="display: flex; justify-content: space-around; align-items: center;">
-            <a href="https://play.google.com/store/apps/details?id=com.whatsapp" target="_blank">
-                <img src="https://raw.githubusercontent.com/osamatech786/ican-universitysuccess/refs/heads/main/resources/icons/android.png" alt="Download for Android" style="width:100px;height:100px;margin:10px;">
-            </a>
-            <a href="https://apps.apple.com/app/whatsapp-messenger/id310633997" target="_blank">
-                <img src="https://cdn3.iconfinder.com/data/icons/social-media-logos-i-filled-line/2048/5315_-_Apple-512.png" alt="Download for iOS" style="width:100px;height:100px;margin:10px;">
-            </a>
-            <a href="https://get.microsoft.com/installer/download/9NKSQGP7F2NH" target="_blank">
-                <img src="https://github.com/osamatech786/ican-universitysuccess/blob/main/resources/icons/windows.png?raw=true" alt="Download for Windows" style="width:100px;height:100px;margin:10px;">
-            </a>
-            <a href="https://web.whatsapp.com/desktop/mac_native/release/?configuration=Release" target="_blank">
-                <img src="https://github.com/osamatech786/ican-universitysuccess/blob/main/resources/icons/macbook.png?raw=true" alt="Download for Mac" style="width:100px;height:100px;margin:10px;">
-            </a>
-        </div>
-        """, 
-        unsafe_allow_html=True
-    )
+    with step_6_form:
+        # Display the WhatsApp call availability message
+        st.markdown(
+            """
+            ### Ensure WhatsApp Call Availability:
+            We may contact you via WhatsApp. Please make sure your phone number is connected to WhatsApp and can receive international calls.
+            """
+        )
+        # Display clickable images in a single line
+        st.write("Download WhatsApp for your device:")
+
+        # Icons served from static/ (see assets.py), 2x/3x variants for sharp screens
+        links = []
+        for href, icon, alt in WHATSAPP_DOWNLOADS:
+            icon_tag = icon_html(icon, alt=alt) or alt
+            links.append(f'<a href="{href}" target="_blank" style="margin:10px;">{icon_tag}</a>')
+        st.markdown(
+            '<div style="display: flex; justify-content: space-around; align-items: center;">'
+            + "".join(links) + "</div>",
+            unsafe_allow_html=True
+        )
 
-    # Input for address
-    # st.session_state.address = st.text_area(
-    #     "Please enter your complete mailing address.", 
-    #     value=st.session_state.address
-    # )
-
-    # Next and Back buttons for navigation
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    # Handle Next button click
-    if next_clicked:
-        # if st.session_state.phone and st.session_state.email and st.session_state.address:
-        if st.session_state.phone_number and st.session_state.email:
-            if is_valid_email(st.session_state.email):
-                is_valid, message = validate_phone_number(st.session_state.phone_number, selected_dialing_code)
-                if is_valid:
-                    st.session_state.step = 7
-                    st.experimental_rerun()
-                else:
-                    st.warning(message)
+        # Input for address
+        # st.session_state.address = st.text_area(
+        #     "Please enter your complete mailing address.", 
+        #     value=st.session_state.address
+        # )
+
+        def check_contact():
+            # A number pasted with its dialing code ("+44 7700...", "0044 7700...")
+            # picks its country by itself and keeps only the national number
+            routed = catalog.phone_index.route(
+                st.session_state.phone_number, (st.session_state.selected_country, st.session_state.country)
+            )
+            if routed:
+                st.session_state.selected_country, st.session_state.dialing_code, st.session_state.phone_number = routed
             else:
-                st.warning("Please enter a valid email address.")
-        else:
-            st.warning("Please fill out all the contact information fields before proceeding.")
+                # Remove the trunk prefix (a leading 0), except where national
+                # numbers really start with 0
+                st.session_state.phone_number = strip_trunk_prefix(
+                    normalize_phone(st.session_state.phone_number), st.session_state.dialing_code
+                )
+            return schema.check_step(6, st.session_state)
 
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 5  # Go back to the previous step (Country selection)
-        st.experimental_rerun()
+        # Next and Back buttons for navigation
+        navigation_buttons(7, 5, check_contact, in_form=True)
 
 elif st.session_state.step == 7:
-    st.title("> 6: Educational and Professional Background")
-
-    # Initialize fields if they do not exist
-    if 'current_institution' not in st.session_state:
-        st.session_state.current_institution = ""  # Default to empty string
-    if 'highest_education' not in st.session_state:
-        st.session_state.highest_education = "Select"  # Default to Select
-    if 'other_education' not in st.session_state:
-        st.session_state.other_education = ""  # Default to empty string
-    if 'accredited_qualifications' not in st.session_state:
-        st.session_state.accredited_qualifications = ""  # Default to empty string
-    if 'industry_experience' not in st.session_state:
-        st.session_state.industry_experience = "Select"  # Default to Select
-    if 'current_role' not in st.session_state:
-        st.session_state.current_role = ""  # Default to empty string
-
-    # Input for Current Educational Institution
-    st.session_state.current_institution = st.text_input(
-        "Please enter the name of your current educational institution (if applicable, else put 'none'):", 
-        value=st.session_state.current_institution
-    )
-
-    # Dropdown for Highest Level of Education
-    st.session_state.highest_education = st.selectbox(
-        "Highest Level of Education:",
-        [
-            "Select",
-            "High School Diploma",
-            "Bachelor's Degree",
-            "Master's Degree",
-            "Doctorate",
-            "Other (please specify)"
-        ],
-        index=[
-            "Select",
-            "High School Diploma",
-            "Bachelor's Degree",
-            "Master's Degree",
-            "Doctorate",
-            "Other (please specify)"
-        ].index(st.session_state.highest_education)
-    )
-
-    # Conditional text box for "Other" education
-    if st.session_state.highest_education == "Other (please specify)":
-        st.session_state.other_education = st.text_input(
-            "Please specify your highest level of education:",
-            value=st.session_state.other_education
-        )
-
-    # Text field for Accredited Qualifications
-    st.session_state.accredited_qualifications = st.text_input(
-        "Accredited Qualifications (please specify the sector, if applicable) (OPTIONAL):",
-        value=st.session_state.accredited_qualifications
-    )
-
-    # Dropdown for Years of Professional Industry Work Experience
-    st.session_state.industry_experience = st.selectbox(
-        "Years of Professional Industry Work Experience:",
-        [
-            "Select",
-            "Less than 1 year",
-            "1–2 years",
-            "3–5 years",
-            "More than 5 years"
-        ],
-        index=[
-            "Select",
-            "Less than 1 year",
-            "1–2 years",
-            "3–5 years",
-            "More than 5 years"
-        ].index(st.session_state.industry_experience)
-    )
-
-    # Text field for Current Role or Profession
-    st.session_state.current_role = st.text_input(
-        "Current Role or Profession: (Indicate N/A if not working)",
-        value=st.session_state.current_role
-    )
-
-    # Navigation buttons
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    # Handle Next button click
-    if next_clicked:
-        if (st.session_state.current_institution.strip() and
-            st.session_state.highest_education != "Select" and
-            (st.session_state.highest_education != "Other (please specify)" or st.session_state.other_education.strip()) and
-            st.session_state.industry_experience != "Select" and
-            st.session_state.current_role.strip()):
-            st.session_state.step = 8
-            st.experimental_rerun()
-        else:
-            st.warning("Please complete all fields before proceeding.")
-
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 6  # Go back to the previous step (Section 5)
-        st.experimental_rerun()
+    # Educational and professional background, sent together in one form
+    render_step(7)
 
 
 # Step 7: Select Services (with Subject Areas, Sub-options, and Learning Modes)
 elif st.session_state.step == 8:
-    st.title("> 7: Select Services")
-        
-    # Initialize session state variables
-    if "subject_areas" not in st.session_state:
-        st.session_state.subject_areas = []
-    if "previous_subject_areas" not in st.session_state:
-        st.session_state.previous_subject_areas = []
-    if "reason_for_interest_accreditation" not in st.session_state:
-        st.session_state.reason_for_interest_accreditation = "Select"
-    if "reason_for_interest_us" not in st.session_state:
-            st.session_state.reason_for_interest_us = "Select"
-                    
-        
-        
-
-    # Display multiselect for subject areas
-    selected_subject_areas = st.multiselect(
-        "Please select the subject area(s):",
-        sorted(subject_areas),  # Available options
-        default=st.session_state.subject_areas  # Retain previous selections
-    )
-
-    # Check if the selection has changed
-    if selected_subject_areas != st.session_state.previous_subject_areas:
-        # Update session state
-        st.session_state.subject_areas = selected_subject_areas
-        st.session_state.previous_subject_areas = selected_subject_areas
-        # Trigger rerun
-        st.experimental_rerun()
-
-
-    # Display relevant options for all selected subject areas
-    if st.session_state.subject_areas:
-        # st.write("You have selected the following subject area(s):")
-        # for area in st.session_state.subject_areas:
-        #     st.write(f"- {area}")
-
-        # Handle specific logic for each selected area
-        for area in st.session_state.subject_areas:
-            
-            # Logic for "University Success (Admissions Support)"
-            if area == "University Success (Admissions Support)":
-                st.subheader(area)
-                
-                # Course Level Selection
-                st.session_state.sub_option = st.selectbox(
-                    "Please select your course level.",
-                    ["Select"] + sub_options,
-                    index=(sub_options.index(st.session_state.sub_option) + 1) if st.session_state.sub_option in sub_options else 0
-                )
-
-                # Learning Mode Selection
-                st.session_state.learning_mode = st.selectbox(
-                    "Please select the learning mode.",
-                    ["Select"] + learning_modes,
-                    index=(learning_modes.index(st.session_state.learning_mode) + 1) if st.session_state.learning_mode in learning_modes else 0
-                )
-
-                # Higher Education Goals
-                st.session_state.higher_education_goals = st.text_area(
-                    "Higher Education Goals: Specify target countries, universities, or courses.",
-                    value=st.session_state.get("higher_education_goals", "")
-                )
-
-                # Assistance Needed
-                assistance_options = [
-                    "Portfolio development",
-                    "IELTS preparation",
-                    "Application documentation",
-                    "Scholarship assistance",
-                    "Other (please specify)"
-                ]
-                st.session_state.assistance_needed = st.multiselect(
-                    "Assistance Needed: Select areas of support.",
-                    options=assistance_options,
-                    default=st.session_state.get("assistance_needed", [])
-                )
-
-                # Conditional text input if "Other" is selected
-                if "Other (please specify)" in st.session_state.assistance_needed:
-                    st.session_state.assistance_other = st.text_input(
-                        "Please specify the additional assistance needed:",
-                        value=st.session_state.get("assistance_other", "")
-                    )
-                else:
-                    # Reset the other assistance field if "Other" is not selected
-                    st.session_state.assistance_other = ""
-
-                # Reason for Interest
-                reason_options = [
-                    "Simplifying university applications",
-                    "Securing admissions abroad",
-                    "Personalized guidance for successful placement"
-                ]
-                st.session_state.reason_for_interest_us = st.selectbox(
-                    "Reason for Interest:",
-                    ["Select"] + reason_options,
-                    index=(reason_options.index(st.session_state.reason_for_interest_us) + 1) if st.session_state.reason_for_interest_us in reason_options else 0
-                )
-
-
-            # Logic for "International Career Advice and Navigation (ICAN)"
-            elif area == "International Career Advice and Navigation (ICAN)":
-                st.subheader(area)
-
-                # Career Goals
-                st.session_state.career_goals = st.text_area(
-                    "Career Goals: Outline your career aspirations and sectors of interest:",
-                    value=st.session_state.get("career_goals", "")
-                )
-
-                # Reason for Interest
-                reason_for_interest_options = [
-                    "Select",
-                    "Career exploration and development",
-                    "CV building and job placement support",
-                    "Personalized career diagnostics"
-                ]
-                st.session_state.reason_for_interest_ican = st.selectbox(
-                    "Reason for Interest:",
-                    reason_for_interest_options,
-                    index=reason_for_interest_options.index(st.session_state.get("reason_for_interest_ican", "Select"))
-                )
-
-            # Logic for "Functional Skills Commerce (English & Math Training)"
-            elif area == "Functional Skills Commerce (English & Math Training)":
-                st.subheader(area)
-
-                # Input field for Current Role
-                st.session_state.functional_current_role = st.text_input(
-                    "Please specify your position (e.g., migrant worker, business owner):",
-                    value=st.session_state.get("functional_current_role", "")
-                )
-
-                # Select box for Reason for Interest
-                functional_reasons = [
-                    "Select",
-                    "To improve workplace communication and productivity.",
-                    "To meet employer expectations for functional skills.",
-                    "To access better employment opportunities."
-                ]
-                st.session_state.functional_reason_for_interest = st.selectbox(
-                    "Reason for Interest:",
-                    functional_reasons,
-                    index=functional_reasons.index(st.session_state.get("functional_reason_for_interest", "Select"))
-                )
-
-            # Logic for "Teaching and Assessment Programme"
-            elif area == "Teaching and Assessment Programme":
-                st.subheader("Teacher & Assessment Training")
-                st.write(
-                    """
-                    Please select your professional vocational sector where you have:
-                    - An accredited qualification.
-                    - More than 2 years of professional industry work experience.
-                    """
-                )
-                
-                # Vocational sector options
-                vocational_options = [
-                    "Health & Social Care",
-                    "Construction & Engineering",
-                    "Business & Administration",
-                    "Digital & IT",
-                    "Education & Training",
-                    "Retail & Customer Service",
-                    "Hospitality & Tourism",
-                    "Creative Arts & Media",
-                    "Other (please specify)"
-                ]
-                
-                # Multi-select for vocational sectors
-                st.session_state.selected_vocational_sectors = st.multiselect(
-                    "Please select your vocational sector(s):",
-                    vocational_options,
-                    default=st.session_state.get("selected_vocational_sectors", [])
-                )
-
-                # For each selected sector, add additional input fields
-                st.write("### Details for Selected Sectors")
-                sector_details = {}
-                for sector in st.session_state.selected_vocational_sectors:
-                    with st.expander(f"Details for {sector}"):
-                        sector_details[sector] = st.text_area(
-                            f"Specify your sector(s) with accredited qualifications and work experience for {sector}:",
-                            value=st.session_state.get(f"sector_details_{sector}", "")
-                        )
-                        st.session_state[f"sector_details_{sector}"] = sector_details[sector]
-
-                # Work Aspirations
-                st.session_state.work_aspirations = st.selectbox(
-                    "Are you interested in working for a UK teacher recruitment agency?",
-                    ["Select", "Yes", "No"],
-                    index=["Select", "Yes", "No"].index(st.session_state.get("work_aspirations", "Select"))
-                )
-
-                # Reason for Interest
-                reason_options = [
-                    "To gain qualifications as an accredited educator.",
-                    "To enhance teaching skills and pedagogy.",
-                    "To achieve UK tutor certification and recognition.",
-                    "To deliver affordable, high-quality education globally."
-                ]
-                
-                st.session_state.reason_for_interest_tap = st.radio(
-                    "Please select your reason for interest:",
-                    options=reason_options,
-                    index=reason_options.index(st.session_state.get("reason_for_interest_tap", reason_options[0]))
-                )
-
-            # Logic for "International Accredited Courses"
-            elif area == "International Accredited Courses":
-                st.subheader(area)
-                
-                # Sector Accreditation Options
-                accreditation_options = [
-                    "Select",
-                    "Health, public services and care",
-                    "Construction, planning and the built environment",
-                    "Information and communication technology",
-                    "Arts, media and publishing",
-                    "Education and training",
-                    "Preparation for Life and Work",
-                    "Business, administration and law",
-                    "Digital Transformation",
-                    "Sustainability"
-                ]
-
-                # Select Sector Accreditation
-                st.session_state.sector_accreditation = st.selectbox(
-                    "Which sector do you wish to achieve accreditation?",
-                    accreditation_options,
-                    index=accreditation_options.index(st.session_state.sector_accreditation)
-                    if st.session_state.sector_accreditation in accreditation_options else 0
-                )
-
-                # Reason for Interest
-                st.session_state.reason_for_interest_accreditation = st.selectbox(
-                    "Reason for Interest:",
-                    [
-                        "Select",
-                        "To advance your career with globally recognized qualifications.",
-                        "To meet employer requirements for niche skills.",
-                        "To gain expertise in emerging markets."
-                    ],
-                    index=[
-                        "Select",
-                        "To advance your career with globally recognized qualifications.",
-                        "To meet employer requirements for niche skills.",
-                        "To gain expertise in emerging markets."
-                    ].index(st.session_state.reason_for_interest_accreditation)
-                    if st.session_state.reason_for_interest_accreditation in [
-                        "Select",
-                        "To advance your career with globally recognized qualifications.",
-                        "To meet employer requirements for niche skills.",
-                        "To gain expertise in emerging markets."
-                    ] else 0
-                )
-
-
-            # Logic for "Summer International Internship Programme"
-            elif area == "Summer International Internship Programme":
-                st.subheader(area)
-                # Add a select box for Basic or Premium package selection
-                # Internship package selection
-                internship_options = ["Select", "Basic", "Premium"]
-                st.session_state.internship_package = st.selectbox(
-                    "Which package you are interested in? (Basic or Premium)",
-                    internship_options,
-                    index=internship_options.index(st.session_state.internship_package)
-                    if st.session_state.internship_package in internship_options else 0
-                )
-
-                # Cohort date selection
-                cohort_options = ["Select", "15th July 2025", "29th July 2025", "12th August 2025", "26th August 2025"]
-                st.session_state.cohort_date = st.selectbox(
-                    "Which cohort date would you like to be part of?",
-                    cohort_options,
-                    index=cohort_options.index(st.session_state.cohort_date)
-                    if st.session_state.cohort_date in cohort_options else 0
-                )
-
-                # Reason for Interest selection (single choice)
-                reason_options = [
-                    "Select",
-                    "To gain hands-on work experience in UK hospitals or allied sectors.",
-                    "To enhance employability with practical international exposure.",
-                    "To participate in cultural and professional development activities."
-                ]
-
-                st.session_state.reason_for_interest_siip = st.selectbox(
-                    "Please select your reason for interest:",
-                    reason_options,
-                    index=reason_options.index(st.session_state.reason_for_interest_siip)
-                    if st.session_state.get('reason_for_interest_siip') in reason_options else 0
-                )
-
-                # Explanations for Basic and Premium packages
-                st.write("### Basic Package (Included for All Students):")
-                st.markdown(
-                    """
-                    - **2 weeks work experience** in teaching hospitals across England.
-                    - **Accredited UK medical CPD or certification courses** (e.g., ACLS, BLS).
-                    - CPD training on patient communication and NHS protocols.
-                    - Accommodation in university dorms near teaching hospitals.
-                    - Guided London tours to iconic landmarks (e.g., Big Ben, Buckingham Palace).
-                    """
-                )
-                st.write("### Premium Package (Optional Upgrade):")
-                st.markdown(
-                    """
-                    - All Basic Package features.
-                    - **Private, upscale accommodation.**
-                    - Entertainment: Theme parks, cultural shows, or private river cruises.
-                    - **Career mentorship** with UK medical professionals.
-                    - Exclusive tours to elite medical facilities (e.g., Royal Society of Medicine).
-                    - Concierge services: Airport pickups, personalized itineraries, and meal customization.
-                    """
-                )
-
-            # Logic for "IELTS Preparation"
-            elif area == "IELTS":
-                st.subheader(area)
-                options = [
-                    "Select",
-                    "Higher Education Abroad: Admission to universities or colleges in English-speaking countries.",
-                    "Immigration: Meeting language requirements for migration to countries like the UK, Canada, or Australia.",
-                    "Professional Registration: Certification for professions such as nursing, engineering, or accounting.",
-                    "Employment: Enhancing job prospects in international or English-speaking environments.",
-                    "Personal Development: Assessing and improving English language proficiency for personal growth."
-                ]
-
-                # Use a concise index calculation
-                st.session_state.ielts_reason = st.selectbox(
-                    "Please select your primary reason for taking the IELTS exam:",
-                    options,
-                    index=options.index(st.session_state.ielts_reason) if st.session_state.ielts_reason in options else 0
-                )
-
-                # Display additional note
-                st.write(
-                    "_Note: Understanding your motivation helps tailor your preparation effectively._"
-                )
-
-            # Logic for "CPD Courses"
-            elif area == "CPD Courses":
-                st.subheader(area)
-                # Category selection
-                categories = ["Select"] + list(category_courses.keys())
-                st.session_state.category = st.selectbox(
-                    "Please select the course category.", 
-                    categories, 
-                    index=categories.index(st.session_state.category)  # Set default value based on session state
-                )
+    st.title(schema.steps[8].title)
+
+    # The services change what is asked (the subject areas pick the sections,
+    # the CPD category picks the courses, ...), so they stay live, but as a
+    # fragment: picking and filling them in reruns only this section, and the
+    # whole script runs again only for Next/Back.
+    @st.experimental_fragment
+    def services_section():
+        # Display multiselect for subject areas; the key keeps the selection, so a
+        # change shows up in this same run without forcing another one
+        render_field(schema.fields["subject_areas"])
+
+        # Display the questions of every selected subject area, as described in form_schema.SERVICES
+        if st.session_state.subject_areas:
+            for area in st.session_state.subject_areas:
+                service = schema.services.get(area)
+                if service is None:
+                    continue
+                st.subheader(service.heading)
+                if service.intro:
+                    st.write(service.intro)
+                for field in service.fields:
+                    render_field(field)
+                if service.outro:
+                    st.markdown(service.outro)
+        else:
+            st.write("Please select at least one subject area.")
 
-                # Dynamically update course options based on the selected category
-                if st.session_state.category != "Select":
-                    courses = category_courses.get(st.session_state.category, [])
-                else:
-                    courses = []
-
-                # Create checkboxes for each course, updating session state appropriately
-                selected_courses = st.session_state.courses  # Retrieve previously selected courses
-
-                for course in courses:
-                    is_checked = course in selected_courses  # Check if the course is already selected
-                    if st.checkbox(course, value=is_checked, key=course):  # Use the course name as the key
-                        if course not in selected_courses:
-                            selected_courses.append(course)  # Add to the list if checked
-                    else:
-                        if course in selected_courses:
-                            selected_courses.remove(course)  # Remove from the list if unchecked
-
-                # Update session state with selected courses
-                st.session_state.courses = selected_courses
-                st.session_state.learning_mode_cpd = st.selectbox(
-                    "Please select your preferred mode of learning.", 
-                    ["Online", "Blended", "On-Campus"],
-                    index=(["Online", "Blended", "On-Campus"].index(st.session_state.learning_mode_cpd)
-                        if st.session_state.get('learning_mode_cpd') in ["Online", "Blended", "On-Campus"] else 0)
-                )
+    services_section()
 
-            # Logic for "Business Incubation Services"
-            elif area == "Business Incubation Services":
-                st.subheader(area)
-
-                # Initialize the business_services session state if not already initialized
-                if "business_services" not in st.session_state:
-                    st.session_state.business_services = []
-
-                # Multi-select for selecting Business Incubation Services services
-                selected_services = st.multiselect(
-                    "Please select the services you are interested in:",
-                    [
-                        "MVP Testing: Minimal Viable Product testing and validation.",
-                        "Business Plan Review: Expert feedback on your business plan.",
-                        "Market Gap Analysis: Identifying opportunities in your target market.",
-                        "Workforce Development: Training and support for building your team.",
-                        "Growth Management: Strategies for scaling and managing business growth."
-                    ],
-                    default=st.session_state.business_services  # Retain previous selections
-                )
+    def check_services():
+        # Keep the answers of the selected subject areas once they are all complete
+        warnings, selected_course = schema.check_services(st.session_state)
+        if not warnings:
+            st.session_state.selected_course = selected_course
+        return warnings
 
-                # Trigger a rerun on change
-                if selected_services != st.session_state.business_services:
-                    st.session_state.business_services = selected_services
-                    st.experimental_rerun()
-
-    else:
-        st.write("Please select at least one subject area.")
-        
     # Navigation buttons
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    # Handle Next button click
-    if next_clicked:
-        # Ensure at least one subject area is selected
-        if not st.session_state.subject_areas:
-            st.warning("Please select at least one subject area before proceeding.")
-        else:
-            # Flag to track overall validation success
-            all_valid = True
-
-            # Iterate through each selected subject area
-            for subject_area in st.session_state.subject_areas:
-                if subject_area == "International Accredited Courses":
-                    if st.session_state.sector_accreditation != "Select" and st.session_state.reason_for_interest_accreditation != "Select":
-                        st.session_state.selected_course[subject_area] = {
-                            'sector_accreditation': st.session_state.sector_accreditation,
-                            'reason_for_interest_accreditation': st.session_state.reason_for_interest_accreditation
-                        }
-                    else:
-                        if st.session_state.sector_accreditation == "Select":
-                            st.warning(f"[{subject_area}] Please select a sector before proceeding.")
-                        if st.session_state.reason_for_interest_accreditation == "Select":
-                            st.warning(f"[{subject_area}] Please select a reason for your interest before proceeding.")
-                        all_valid = False
-
-
-                elif subject_area == "IELTS":
-                    if st.session_state.ielts_reason != "Select":
-                        st.session_state.selected_course[subject_area] = {
-                            'ielts_reason': st.session_state.ielts_reason
-                        }
-                    else:
-                        st.warning(f"[{subject_area}] Please select your reason for taking the IELTS exam before proceeding.")
-                        all_valid = False
-
-                elif subject_area == "CPD Courses":
-                    if st.session_state.courses and st.session_state.learning_mode_cpd != "Select":
-                        st.session_state.selected_course[subject_area] = {
-                            'category': st.session_state.category,
-                            'courses': st.session_state.courses,
-                            'learning_mode_cpd': st.session_state.learning_mode_cpd
-                        }
-                    else:
-                        st.warning(f"[{subject_area}] Please select your courses before proceeding.")
-                        all_valid = False
-
-                elif subject_area == "International Career Advice and Navigation (ICAN)":
-                    if (
-                        st.session_state.career_goals.strip() and
-                        st.session_state.reason_for_interest_ican != "Select"
-                    ):
-                        st.session_state.selected_course[subject_area] = {
-                            'career_goals': st.session_state.career_goals,
-                            'reason_for_interest_ican': st.session_state.reason_for_interest_ican
-                        }
-                    else:
-                        if not st.session_state.career_goals.strip():
-                            st.warning(f"[{subject_area}] Please outline your career goals before proceeding.")
-                        if st.session_state.reason_for_interest_ican == "Select":
-                            st.warning(f"[{subject_area}] Please select your reason for interest before proceeding.")
-                        all_valid = False
-
-                elif subject_area == "University Success (Admissions Support)":
-                    if (
-                        st.session_state.sub_option != "Select" and
-                        st.session_state.learning_mode != "Select" and
-                        st.session_state.higher_education_goals.strip() and
-                        st.session_state.assistance_needed and
-                        st.session_state.reason_for_interest_us != "Select" and
-                        (
-                            "Other (please specify)" not in st.session_state.assistance_needed or
-                            st.session_state.assistance_other.strip()
-                        )
-                    ):
-                        # Save the selected course details
-                        st.session_state.selected_course[subject_area] = {
-                            'course_level': st.session_state.sub_option,
-                            'learning_mode': st.session_state.learning_mode,
-                            'higher_education_goals': st.session_state.higher_education_goals,
-                            'assistance_needed': st.session_state.assistance_needed,
-                            'assistance_other': st.session_state.assistance_other if "Other (please specify)" in st.session_state.assistance_needed else "",
-                            'reason_for_interest_us': st.session_state.reason_for_interest_us
-                        }
-                    else:
-                        # Display warnings for missing fields
-                        if st.session_state.sub_option == "Select":
-                            st.warning(f"[{subject_area}] Please select the course level before proceeding.")
-                        if st.session_state.learning_mode == "Select":
-                            st.warning(f"[{subject_area}] Please select the learning mode before proceeding.")
-                        if not st.session_state.higher_education_goals.strip():
-                            st.warning(f"[{subject_area}] Please specify your higher education goals before proceeding.")
-                        if not st.session_state.assistance_needed:
-                            st.warning(f"[{subject_area}] Please select at least one area of assistance before proceeding.")
-                        if "Other (please specify)" in st.session_state.assistance_needed and not st.session_state.assistance_other.strip():
-                            st.warning(f"[{subject_area}] Please specify the additional assistance needed for 'Other'.")
-                        if st.session_state.reason_for_interest_us == "Select":
-                            st.warning(f"[{subject_area}] Please select your reason for interest before proceeding.")
-                        all_valid = False
-
-                elif subject_area == "Functional Skills Commerce (English & Math Training)":
-                    if (
-                        st.session_state.functional_current_role.strip() and
-                        st.session_state.functional_reason_for_interest != "Select"
-                    ):
-                        st.session_state.selected_course[subject_area] = {
-                            "current_role": st.session_state.functional_current_role,
-                            "functional_reason_for_interest": st.session_state.functional_reason_for_interest
-                        }
-                    else:
-                        if not st.session_state.functional_current_role.strip():
-                            st.warning(f"[{subject_area}] Please specify your current role before proceeding.")
-                        if st.session_state.functional_reason_for_interest == "Select":
-                            st.warning(f"[{subject_area}] Please select a reason for interest before proceeding.")
-                        all_valid = False
-
-                elif subject_area == "Teaching and Assessment Programme":
-                    # Validate vocational sector selection
-                    if not st.session_state.selected_vocational_sectors:
-                        st.warning(f"[{subject_area}] Please select at least one vocational sector.")
-                        all_valid = False
-                    else:
-                        # Validate details for each selected sector
-                        for sector in st.session_state.selected_vocational_sectors:
-                            if not st.session_state.get(f"sector_details_{sector}", "").strip():
-                                st.warning(f"[{subject_area}] Please provide details for the selected sector: {sector}.")
-                                all_valid = False
-                                break
-
-                    # Validate work aspirations
-                    if st.session_state.work_aspirations == "Select":
-                        st.warning(f"[{subject_area}] Please indicate your interest in working for a UK teacher recruitment agency.")
-                        all_valid = False
-
-                    # Validate reason for interest
-                    if not st.session_state.reason_for_interest_tap:
-                        st.warning(f"[{subject_area}] Please select a reason for interest.")
-                        all_valid = False
-
-                    # If all validations pass, save the data
-                    if all_valid:
-                        # Prepare sector details
-                        sector_details = {
-                            sector: st.session_state.get(f"sector_details_{sector}", "").strip()
-                            for sector in st.session_state.selected_vocational_sectors
-                        }
-
-                        # Save the data to `selected_course`
-                        st.session_state.selected_course[subject_area] = {
-                            'selected_vocational_sectors': st.session_state.selected_vocational_sectors,
-                            'sector_details': sector_details,
-                            'work_aspirations': st.session_state.work_aspirations,
-                            'reason_for_interest_tap': st.session_state.reason_for_interest_tap
-                        }
-
-
-                elif subject_area == "Business Incubation Services":
-                    if st.session_state.business_services:
-                        st.session_state.selected_course[subject_area] = {
-                            'business_services': st.session_state.business_services
-                        }
-                    else:
-                        st.warning(f"[{subject_area}] Please select at least one service to proceed.")
-                        all_valid = False
-
-                elif subject_area == "Summer International Internship Programme":
-                    if (
-                        st.session_state.internship_package != "Select"
-                        and st.session_state.cohort_date != "Select"
-                        and st.session_state.reason_for_interest_siip != "Select"
-                    ):
-                        st.session_state.selected_course[subject_area] = {
-                            'internship_package': st.session_state.internship_package,
-                            'cohort_date': st.session_state.cohort_date,
-                            'reason_for_interest_siip': st.session_state.reason_for_interest_siip
-                        }
-                    else:
-                        if st.session_state.internship_package == "Select":
-                            st.warning(f"[{subject_area}] Please select a package (Basic or Premium) before proceeding.")
-                        if st.session_state.cohort_date == "Select":
-                            st.warning(f"[{subject_area}] Please select a cohort date before proceeding.")
-                        if st.session_state.reason_for_interest_siip == "Select":
-                            st.warning(f"[{subject_area}] Please select a reason for interest before proceeding.")
-                        all_valid = False
-
-
-            # If all validations pass, move to the next step
-            if all_valid:
-                st.session_state.step = 11
-                st.experimental_rerun()
-            # else:
-            #     st.warning("Please complete all required fields before proceeding.")
-
-
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 7  # Go back to the previous step
-        st.experimental_rerun()
+    navigation_buttons(11, 7, check_services)
 
 
 elif st.session_state.step == 9:
     st.title("> 8: Supporting Documents (Optional)")
     st.write("**Note:** Please note that we will require additional documents to complete enrolment at a later stage.")
 
-    if "files_step_9" not in st.session_state:
-        st.session_state.files_step_9 = []
-
-    uploaded_files_9 = st.file_uploader(
-        "Upload CV or Portfolio (if applicable):",
-        type=["pdf", "docx", "jpg", "png"],
-        accept_multiple_files=True,
-        key="cv_portfolio"
-    )
-    if uploaded_files_9:
-        for file in uploaded_files_9:
-            if file.name not in [f.name for f in st.session_state.files_step_9]:
-                st.session_state.files_step_9.append(file)
+    render_uploads("Upload CV or Portfolio (if applicable):", ["pdf", "docx", "jpg", "png"],
+                   "cv_portfolio", "files_step_9", "Uploaded CV or Portfolio:")
 
-    if st.session_state.files_step_9:
-        st.write("Uploaded CV or Portfolio:")
-        for file in st.session_state.files_step_9:
-            st.write(f"- {file.name}")
-
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    if next_clicked:
-        st.session_state.step = 10
-        st.experimental_rerun()
-
-    if back_clicked:
-        st.session_state.step = 8
-        st.experimental_rerun()
+    navigation_buttons(10, 8)
 
 
 elif st.session_state.step == 10:
     st.title("> 9: Supporting Documents (Optional)")
     st.write("**Note:** Please note that we will require additional documents to complete enrolment at a later stage.")
 
-    if "files_step_10" not in st.session_state:
-        st.session_state.files_step_10 = []
-
-    uploaded_files_10 = st.file_uploader(
-        "Upload Supporting Documents (certificates, qualifications, etc.):",
-        type=["jpg", "png", "pdf", "docx"],
-        accept_multiple_files=True,
-        key="supporting_documents"
-    )
-    if uploaded_files_10:
-        for file in uploaded_files_10:
-            if file.name not in [f.name for f in st.session_state.files_step_10]:
-                st.session_state.files_step_10.append(file)
-
-    if st.session_state.files_step_10:
-        st.write("Uploaded Supporting Documents:")
-        for file in st.session_state.files_step_10:
-            st.write(f"- {file.name}")
+    render_uploads("Upload Supporting Documents (certificates, qualifications, etc.):", ["jpg", "png", "pdf", "docx"],
+                   "supporting_documents", "files_step_10", "Uploaded Supporting Documents:")
 
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    if next_clicked:
-        st.session_state.step = 11
-        st.experimental_rerun()
-
-    if back_clicked:
-        st.session_state.step = 9
-        st.experimental_rerun()
+    navigation_buttons(11, 9)
 
 
 
 elif st.session_state.step == 11:
-    st.title("> 10: Additional Information")
-
-    # Initialize fields if they do not exist
-    # if 'learning_preferences' not in st.session_state:
-    #     st.session_state.learning_preferences = ""  # Default to empty string
-    if 'special_requirements' not in st.session_state:
-        st.session_state.special_requirements = ""  # Default to empty string
-    # if 'emergency_contact' not in st.session_state:
-    #     st.session_state.emergency_contact = ""  # Default to empty string
-    if 'preferred_start_date' not in st.session_state:
-        st.session_state.preferred_start_date = "Select"  # Default to Select
-    if 'consent' not in st.session_state:
-        st.session_state.consent = False  # Default to unchecked
-    # Digital media release consent
-    if 'digital_media_consent' not in st.session_state:
-        st.session_state.digital_media_consent = True  # Default to unchecked        
-
-    # Input fields with default values from session state
-    # Dropdown for Preferred Start Date/Timeline
-    st.session_state.preferred_start_date = st.selectbox(
-        "Preferred Start Date/Timeline for Participation:",
-        [
-            "Select",
-            "ASAP",
-            "1 to 2 months",
-            "2 to 4 months",
-            "6 months +"
-        ],
-        index=[
-            "Select",
-            "ASAP",
-            "1 to 2 months",
-            "2 to 4 months",
-            "6 months +"
-        ].index(st.session_state.preferred_start_date) if st.session_state.preferred_start_date in [
-            "Select",
-            "ASAP",
-            "1 to 2 months",
-            "2 to 4 months",
-            "6 months +"
-        ] else 0
-    )    
-    # st.session_state.learning_preferences = st.text_area(
-    #     "Please describe any learning preferences you have.", 
-    #     value=st.session_state.learning_preferences
-    # )
-    st.session_state.special_requirements = st.text_area(
-        "Please let us know if you have any special requirements. (if applicable, else put 'none')", 
-        value=st.session_state.special_requirements
-    )
-    # st.session_state.emergency_contact = st.text_input(
-    #     "Please provide emergency contact details.", 
-    #     value=st.session_state.emergency_contact
-    # )
-
-    # Link to the privacy policy
-    privacy_policy_doc_link = 'https://drive.google.com/file/d/1sgF6eHZ57idELDEkQD8ZQ7p8VPrmy3WC/view?ts=6789943b'
-    st.write(f"[Privacy Policy]({privacy_policy_doc_link})")  # Actual link to privacy policy
-    # Privacy policy consent
-    st.session_state.consent = st.checkbox(
-        "I consent to the collection and processing of my personal data according to AspireCraft’s privacy policy.", 
-        value=st.session_state.consent
-    )
-    
-    # Link to the Media Release Consent (M) document
-    media_consent_doc_link = 'https://drive.google.com/file/d/1SrHyvp_PHM7OhHyQvE-JJRPCUvloTV0z/view?ts=67899187'
-    st.write(f"[Media Release Consent (M) document]({media_consent_doc_link})")  # Actual link to Media Release Consent (M) document
-    # Digital media release consent
-    st.session_state.digital_media_consent = st.checkbox(
-        "I consent to AspireCraft using my photos, videos, or digital media for promotional and educational purposes.", 
-        value=st.session_state.digital_media_consent
-    )
-        
-    # Path to the PDF file in the resources folder
-    # pdf_file_path = os.path.join('resources', 'Student Privacy Notice_30.07.2024_Rev.1_FF.pdf')
-    # Display the link for the PDF file to open in a new tab
-    # st.markdown(f'<a href="file://{pdf_file_path}" target="_blank">Privacy Policy</a>', unsafe_allow_html=True)
-
-    # Navigation buttons
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
-
-    # Handle Next button click
-    if next_clicked:
-        if st.session_state.preferred_start_date != "Select" and all([st.session_state.special_requirements, st.session_state.consent]):
-            st.session_state.step = 12
-            st.experimental_rerun()
-        else:
-            st.warning("Please complete all fields and consent before proceeding.")
-
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 8
-        st.experimental_rerun()
+    # Start date, special requirements and consents, sent together in one form
+    render_step(11)
 
 
 elif st.session_state.step == 12:
+    from streamlit_drawable_canvas import st_canvas
+
     st.title("> 11: Signature")
-    st.write("Please provide your signature below:")
+    st.write("Please provide your signature below, then press the save button (the first icon under the canvas) when you are done.")
 
+    # The canvas only sends the drawing when its save button is pressed, not on every
+    # stroke, so drawing does not rerun the whole script. The saved drawing is
+    # passed back in so the signature is still there after going Back.
     canvas_result = st_canvas(
         stroke_width=2,
         stroke_color="black",
         background_color="white",
-        update_streamlit=True,
+        update_streamlit=False,
         height=150,
         width=600,
         drawing_mode="freedraw",
+        initial_drawing=dict(st.session_state.signature_drawing) if st.session_state.signature_drawing else None,
         key="signature_canvas"
     )
-    # Only update the session state if there is a change in the canvas
-    if canvas_result.image_data is not None:
-        st.session_state.signature = canvas_result.image_data
+    if canvas_result.json_data is not None and canvas_result.json_data != st.session_state.signature_drawing:
+        # Keep only the strokes (or a cropped PNG of them), not the raw canvas array
+        st.session_state.signature_drawing = canvas_result.json_data
+        st.session_state.signature = capture_signature(canvas_result)
 
-    # Navigation buttons
-    next_clicked = st.button("Next", key=f"next_{st.session_state.step}")
-    back_clicked = st.button("Back", key=f"back_{st.session_state.step}")
+    if is_signature_drawn(st.session_state.signature):
+        st.success("Signature saved.")
 
-    # Handle Next button click
-    if next_clicked:
+    def check_signature():
         if is_signature_drawn(st.session_state.signature):
-        # if st.session_state.signature is not None:
-            st.session_state.step = 13
-            st.experimental_rerun()
-        else:
-            st.warning("Please provide your signature before proceeding.")
+            return []
+        return ["Please provide your signature and press the save button under the canvas before proceeding."]
 
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 11  # Go back to the previous step (Section 10)
-        st.experimental_rerun()
+    # Navigation buttons
+    navigation_buttons(13, 11, check_signature)
 
 elif st.session_state.step == 13:
     st.title("Final Review")
     # ==================================================================================================================================
     st.write("Thank you for providing your details. Please review your information.")
 
-    st.write(f"**Selected Support Option:** {st.session_state.selected_option}")
-    
-    st.header("> Personal Information Review")
-   
-    st.write(f"**Full Name:** {st.session_state.get('personal_info', 'Not Provided')}")
-    st.write(f"**Date of Birth:** {st.session_state.dob.strftime('%d-%m-%Y') if 'dob' in st.session_state else 'Not Provided'}")
-    st.write(f"**Gender:** {st.session_state.get('gender', 'Not Provided')}")
-    st.write(f"**Country of Residence:** {st.session_state.get('country', 'Not Provided')}")
-    st.write(f"**Nationality:** {st.session_state.get('nationality', 'Not Provided')}")
-    st.write(f"**Preferred Language of Communication:** {st.session_state.get('preferred_language', 'Not Provided')}")
-
-    st.header("> Contact Information")
-
-    st.write(f"**Email:** {st.session_state.email}")
-    st.write(f"**Phone:** {st.session_state.dialing_code}{st.session_state.phone_number}")
-    # st.write(f"**Address:** {st.session_state.address}")
-    
-    st.header("> 6: Educational and Professional Background")
-
-    # Display Current Institution
-    st.write(f"**Current Institution:** {st.session_state.current_institution}")
-    # Display Highest Level of Education
-    if st.session_state.highest_education == "Other (please specify)":
-        st.write(f"**Highest Level of Education:** {st.session_state.highest_education} - {st.session_state.other_education}")
-    else:
-        st.write(f"**Highest Level of Education:** {st.session_state.highest_education}")
-    # Display Accredited Qualifications
-    st.write(f"**Accredited Qualifications:** {st.session_state.accredited_qualifications}")
-    # Display Industry Experience
-    st.write(f"**Years of Professional Industry Work Experience:** {st.session_state.industry_experience}")
-    # Display Current Role or Profession
-    st.write(f"**Current Role or Profession:** {st.session_state.current_role}")
-
-    st.header("> 7: Select Services")
-
-    if "selected_course" in st.session_state and st.session_state.selected_course:
-        st.write("**Courses Interested In:**")
-        
-        for subject_area, details in st.session_state.selected_course.items():
-            st.write(f"### {subject_area}")
-            
-            # Custom logic for each subject area
-            if subject_area == "CPD Courses":
-                st.write(f"- **Category:** {details.get('category', 'Not Provided')}")
-                st.write(f"- **Courses:** {', '.join(details.get('courses', []))}")
-                st.write(f"- **Learning Mode:** {details.get('learning_mode_cpd', 'Not Provided')}")
-
-            elif subject_area == "International Career Advice and Navigation (ICAN)":
-                st.write(f"- **Career Goals:** {details.get('career_goals', 'Not Provided')}")
-                st.write(f"- **Reason for Interest:** {details.get('reason_for_interest_ican', 'Not Provided')}")
-            
-            elif subject_area == "University Success (Admissions Support)":
-                st.write(f"- **Course Level:** {details.get('course_level', 'Not Provided')}")
-                st.write(f"- **Learning Mode:** {details.get('learning_mode', 'Not Provided')}")
-                st.write(f"- **Higher Education Goals:** {details.get('higher_education_goals', 'Not Provided')}")
-                
-                assistance_needed = details.get('assistance_needed', [])
-                assistance_other = details.get('assistance_other', '')
-
-                if assistance_needed:
-                    assistance_display = ', '.join(assistance_needed)
-                    if "Other (please specify)" in assistance_needed and assistance_other:
-                        assistance_display += f" (Other: {assistance_other})"
-                    st.write(f"- **Assistance Needed:** {assistance_display}")
-                else:
-                    st.write("- **Assistance Needed:** Not Provided")
-                
-                st.write(f"- **Reason for Interest:** {details.get('reason_for_interest_us', 'Not Provided')}")
-
-
-            elif subject_area == "Functional Skills Commerce (English & Math Training)":
-                st.write(f"- **Current Role:** {details.get('current_role', 'Not Provided')}")
-                st.write(f"- **Reason for Interest:** {details.get('functional_reason_for_interest', 'Not Provided')}")
-            
-            elif subject_area == "Teaching and Assessment Programme":
-                # Display Selected Vocational Sectors
-                selected_sectors = details.get('selected_vocational_sectors', [])
-                if selected_sectors:
-                    st.write(f"- **Selected Vocational Sectors:**")
-                    for sector in selected_sectors:
-                        st.write(f"  - {sector}")
-                        # Display details for each sector
-                        sector_details = details.get('sector_details', {}).get(sector, 'Not Provided')
-                        st.write(f"    - **Details:** {sector_details}")
-                else:
-                    st.write(f"- **Selected Vocational Sectors:** None")
-
-                # Display Work Aspirations
-                st.write(f"- **Work Aspirations for a UK teacher recruitment agency:** {details.get('work_aspirations', 'Not Provided')}")
-
-                # Display Reason for Interest
-                reason_for_interest_tap = details.get('reason_for_interest_tap', [])
-                if reason_for_interest_tap:
-                    st.write(f"- **Reason for Interest:** {reason_for_interest_tap}")
-                else:
-                    st.write(f"- **Reason for Interest:** Not Provided")
-
-            elif subject_area == "International Accredited Courses":
-                st.write(f"- **Sector Accreditation:** {details.get('sector_accreditation', 'Not Provided')}")
-                st.write(f"- **Reason for Interest:** {details.get('reason_for_interest_accreditation', 'Not Provided')}")
-
-            elif subject_area == "Summer International Internship Programme":
-                st.write(f"- **Internship Package:** {details.get('internship_package', 'Not Provided')}")
-                st.write(f"- **Cohort Date:** {details.get('cohort_date', 'Not Provided')}")
-                st.write(f"- **Reason for Interest:** {details.get('reason_for_interest_siip', 'Not Provided')}")
-
-            elif subject_area == "IELTS":
-                st.write(f"- **IELTS Reason:** {details.get('ielts_reason', 'Not Provided')}")
-
-            elif subject_area == "Business Incubation Services":
-                st.write(f"- **Business Services:** {', '.join(details.get('business_services', []))}")
-
-            else:
-                st.write("No specific fields defined for this subject area.")
-    else:
-        st.write("**Courses Interested In:** None")
-
-
-
-    # st.header("> 8 & 9: Supporting Documents (Optional)")
-
-    # # Combine files from both steps for display purposes
-    # all_files = st.session_state.get("files_step_9", []) + st.session_state.get("files_step_10", [])
-    # if all_files:
-    #     st.write(f"**Total Files Uploaded:** {len(all_files)}")
-    #     for file in all_files:
-    #         st.write(f"- **File Name:** {file.name}")
-    # else:
-    #     st.write("No files uploaded.")
-
-        
-    st.header("> 10: Additional Information")
-
-    st.write(f"**Preferred Start Date/Timeline for Participation:** {st.session_state.preferred_start_date}")
-    # st.write(f"**Learning Preferences:** {st.session_state.learning_preferences}")
-    st.write(f"**Special Requirements:** {st.session_state.special_requirements}")
-    # st.write(f"**Emergency Contact:** {st.session_state.emergency_contact}")
-    # Display whether digital media consent is provided
-    if st.session_state.digital_media_consent:
-        st.write("**Digital Media Consent:** Yes, consent provided.")
-    else:
-        st.write("**Digital Media Consent:** No, consent not provided.")
-    
+    # The same record the DOCX and the emails are built from; it is only
+    # rebuilt when an answer changed since the last run. Each section is sent
+    # as one markdown element.
+    record = submission_record(st.session_state)
+    for block in review_markdown(record["digest"], record["summary"]):
+        st.markdown(block)
 
     st.header("> 11: Signature")
     
-    if st.session_state.signature is not None:
-        st.image(st.session_state.signature, caption="Your Signature")
+    if is_signature_drawn(st.session_state.signature):
+        st.image(signature_preview(st.session_state.signature), caption="Your Signature")
     
 
-    # Submit button
-    submit_clicked = st.button("Submit")
-
-###############################
-    with st.spinner('Processing....'):
-
-        # Handle Submit button click
-        if submit_clicked:        
-            # Create a new Document
-            # ======================================================================================================================
-            doc = Document()
-            
-            # Add image
-            # Create a table with 1 row and 2 columns
-            table = doc.add_table(rows=1, cols=4)
-            table.allow_autofit = False
-
-            # Access the cells
-            left_cell = table.cell(0, 0)
-            right_cell = table.cell(0, 3)
-
-            # Add the image to the right cell
-            image_path = "resources/img_doc.png"
-            paragraph = right_cell.paragraphs[0]
-            run = paragraph.add_run()
-            run.add_picture(image_path, width=Inches(1.5))  # Adjust the width as needed
-
-            # Add the heading to the left cell
-            left_cell.text = " "  # Empty text to leave room for formatting
-            
-            # Main Heading
-            doc.add_heading('Enrolment Form Submission', 0)
-
-            doc.add_paragraph(f"Selected Support Option: {st.session_state.selected_option}")
-
-            # Add Personal Information
-            doc.add_heading('Personal Information', level=1)
-            doc.add_paragraph(f"Full Name: {st.session_state.get('personal_info', 'Not Provided')}")
-            doc.add_paragraph(f"Date of Birth: {st.session_state.dob.strftime('%d-%m-%Y') if 'dob' in st.session_state else 'Not Provided'}")
-            doc.add_paragraph(f"Gender: {st.session_state.get('gender', 'Not Provided')}")
-            doc.add_paragraph(f"Country of Residence: {st.session_state.get('country', 'Not Provided')}")
-            doc.add_paragraph(f"Nationality: {st.session_state.get('nationality', 'Not Provided')}")
-            doc.add_paragraph(f"Preferred Language of Communication: {st.session_state.get('preferred_language', 'Not Provided')}")
-
-            # Add Contact Information
-            doc.add_heading('Contact Information', level=1)
-            doc.add_paragraph(f"Email: {st.session_state.email}")
-            doc.add_paragraph(f"Phone: {st.session_state.dialing_code}{st.session_state.phone_number}")
-            # doc.add_paragraph(f"Address: {st.session_state.address}")
-
-            # Add Educational and Professional Background
-            doc.add_heading('Educational and Professional Background', level=1)
-            doc.add_paragraph(f"Current Institution: {st.session_state.current_institution}")
-            if st.session_state.highest_education == "Other (please specify)":
-                doc.add_paragraph(f"Highest Level of Education: {st.session_state.highest_education} - {st.session_state.other_education}")
-            else:
-                doc.add_paragraph(f"Highest Level of Education: {st.session_state.highest_education}")
-            doc.add_paragraph(f"Accredited Qualifications: {st.session_state.accredited_qualifications}")
-            doc.add_paragraph(f"Years of Professional Industry Work Experience: {st.session_state.industry_experience}")
-            doc.add_paragraph(f"Current Role or Profession: {st.session_state.current_role}")
-
-            # Add Services and Courses Interested In
-            doc.add_heading('Services and Courses Interested In', level=1)
-            if "selected_course" in st.session_state and st.session_state.selected_course:
-                for subject_area, details in st.session_state.selected_course.items():
-                    doc.add_heading(subject_area, level=2)
-                    if subject_area == "CPD Courses":
-                        doc.add_paragraph(f"Category: {details.get('category', 'Not Provided')}")
-                        doc.add_paragraph(f"Courses: {', '.join(details.get('courses', []))}")
-                        doc.add_paragraph(f"Learning Mode: {details.get('learning_mode_cpd', 'Not Provided')}")
-                    elif subject_area == "International Career Advice and Navigation (ICAN)":
-                        doc.add_paragraph(f"Career Goals: {details.get('career_goals', 'Not Provided')}")
-                        doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_ican', 'Not Provided')}")
-                    elif subject_area == "University Success (Admissions Support)":
-                        doc.add_paragraph(f"Course Level: {details.get('course_level', 'Not Provided')}")
-                        doc.add_paragraph(f"Learning Mode: {details.get('learning_mode', 'Not Provided')}")
-                        doc.add_paragraph(f"Higher Education Goals: {details.get('higher_education_goals', 'Not Provided')}")
-                        # Handle assistance needed and "Other" option
-                        assistance_needed = details.get('assistance_needed', [])
-                        assistance_other = details.get('assistance_other', '')
-                        if assistance_needed:
-                            assistance_display = ', '.join(assistance_needed)
-                            if "Other (please specify)" in assistance_needed and assistance_other:
-                                assistance_display += f" (Other: {assistance_other})"
-                            doc.add_paragraph(f"Assistance Needed: {assistance_display}")
-                        else:
-                            doc.add_paragraph("Assistance Needed: Not Provided")
-                        doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_us', 'Not Provided')}")
-
-
-                    elif subject_area == "Functional Skills Commerce (English & Math Training)":
-                        doc.add_paragraph(f"Current Role: {details.get('current_role', 'Not Provided')}")
-                        doc.add_paragraph(f"Reason for Interest: {details.get('functional_reason_for_interest', 'Not Provided')}")
-                    elif subject_area == "Teaching and Assessment Programme":
-                        # Add Selected Vocational Sectors
-                        selected_sectors = details.get('selected_vocational_sectors', [])
-                        if selected_sectors:
-                            doc.add_paragraph("Selected Vocational Sectors:")
-                            for sector in selected_sectors:
-                                doc.add_paragraph(f"  - {sector}", style="List Bullet")
-                                # Add details for each sector
-                                sector_details = details.get('sector_details', {}).get(sector, 'Not Provided')
-                                doc.add_paragraph(f"    Details: {sector_details}")
-                        # Add Work Aspirations
-                        work_aspirations = details.get('work_aspirations', 'Not Provided')
-                        doc.add_paragraph(f"Work Aspirations for a UK teacher recruitment agency: {work_aspirations}")
-                        # Add Reason for Interest
-                        reason_for_interest_tap = details.get('reason_for_interest_tap', [])
-                        doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_tap', 'Not Provided')}")
-                    elif subject_area == "International Accredited Courses":
-                        doc.add_paragraph(f"Sector Accreditation: {details.get('sector_accreditation', 'Not Provided')}")
-                        doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_accreditation', 'Not Provided')}")
-                    elif subject_area == "Summer International Internship Programme":
-                        doc.add_paragraph(f"Internship Package: {details.get('internship_package', 'Not Provided')}")
-                        doc.add_paragraph(f"Cohort Date: {details.get('cohort_date', 'Not Provided')}")
-                        doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_siip', 'Not Provided')}")
-                    elif subject_area == "IELTS":
-                        doc.add_paragraph(f"IELTS Reason: {details.get('ielts_reason', 'Not Provided')}")
-                    elif subject_area == "Business Incubation Services":
-                        doc.add_paragraph(f"Business Services: {', '.join(details.get('business_services', []))}")
-            else:
-                doc.add_paragraph("Courses Interested In: None")
-
-            # Add Supporting Documents
-            # doc.add_heading('Supporting Documents (Optional)', level=1)
-            # all_files = st.session_state.get("files_step_9", []) + st.session_state.get("files_step_10", [])
-            # if all_files:
-            #     doc.add_paragraph(f"Total Files Uploaded: {len(all_files)}")
-            #     for file in all_files:
-            #         doc.add_paragraph(f"- File Name: {file.name}")
-            # else:
-            #     doc.add_paragraph("No files uploaded.")
-
-            # Add Additional Information
-            doc.add_heading('Additional Information', level=1)
-            doc.add_paragraph(f"Preferred Start Date/Timeline for Participation: {st.session_state.preferred_start_date}")
-            # doc.add_paragraph(f"Learning Preferences: {st.session_state.learning_preferences}")
-            doc.add_paragraph(f"Special Requirements: {st.session_state.special_requirements}")
-            # doc.add_paragraph(f"Emergency Contact: {st.session_state.emergency_contact}")
-            # Add Digital Media Consent to the document
-            digital_media_consent_status = "Yes, consent provided." if st.session_state.digital_media_consent else "No, consent not provided."
-            doc.add_paragraph(f"Digital Media Consent: {digital_media_consent_status}")
-            
-            # Add Signature
-            doc.add_heading('Signature', level=1)
-            if st.session_state.signature is not None:
-                # Convert numpy array to PIL image
-                image_data = st.session_state.signature
-                image = Image.fromarray(image_data.astype(np.uint8))  # Ensure correct data type
-                # Save the image to an in-memory file
-                image_stream = io.BytesIO()
-                image.save(image_stream, format='PNG')
-                image_stream.seek(0)
-                # Add image to docx
-                doc.add_picture(image_stream, width=Inches(2), height=Inches(1))
-
-            # Save the document
-            doc_path = f"AspireCraft_Form_Submission_{st.session_state.get('personal_info', 'Unnamed')}.docx"
-            doc.save(doc_path)
-
-            # Email
-            # ======================================================================================================================
-            # Sender email credentials
-            # Credentials: Streamlit host st.secrets
-            # sender_email = st.secrets["sender_email"]
-            # sender_password = st.secrets["sender_password"]
-
-            sender_email = get_secret("sender_email")
-            sender_password = get_secret("sender_password")
-
-            # Credentials: Local env
-            # load_dotenv()                                     # uncomment import of this library!
-            # sender_email = os.getenv('EMAIL')
-            # sender_password = os.getenv('PASSWORD')
-            team_email = [sender_email]
-
-            learner_email = [st.session_state.email]
-            
-            subject_team = f"AspireCraft - Country: {st.session_state.country} Name: {st.session_state.personal_info} Submission Date: {date.today()}"
-            body_team = "AspireCraft Form submitted. Please find the attached files."
-
-            subject_learner = "Thank You for Signing Up – Next Steps for Your Journey with AspireCraft"
-            body_learner = f"""
-            <html>
-            <body>
-                <p>Dear {st.session_state.personal_info},</p>
-
-                <p>Thank you for completing the registration form! We’re excited to have you take the first step toward unlocking your potential with AspireCraft.</p>
-
-                <p><strong>What’s Next?</strong></p>
-
-                <p>We will soon invite you to an <strong>Online Orientation Session</strong>, where you will:</p>
-                <ul>
-                    <li>Learn more about the program and how it can benefit you.</li>
-                    <li>Get detailed guidance on the opportunities available to you.</li>
-                    <li>Meet some of our team members who will support you throughout your journey.</li>
-                </ul>
-
-                <p><strong>Look Out for Our Invitation</strong></p>
-                <p>You’ll receive an email from us shortly with the link to join the orientation session. Please ensure you have a stable internet connection and a device to access the session.</p>
-
-                <p>If you have any questions or need assistance, feel free to contact us:</p>
-                <ul>
-                    <li><strong>Email:</strong> enquiries@aspirecraft.co.uk</li>
-                    <li><strong>WhatsApp:</strong> +44 7711 317561</li>
-                </ul>
-
-                <p>We look forward to welcoming you online and helping you craft your success!</p>
-
-                <p><strong>Warm regards,</strong></p>
-                <p>The AspireCraft Team<br>
-                <em>Crafting Success, Empowering Futures</em></p>
-            </body>
-            </html>
-            """
-
-
+    def submit():
+        # The DOCX and both emails are produced by the outbox workers;
+        # the job is on disk once this returns, so nothing is lost if
+        # Gmail is slow or down.
+        enqueue_submission(st.session_state)
 
-            # Send email to team with attachments
-            if doc_path:
-                # send_email_with_attachments(sender_email, sender_password, team_email, subject_team, body_team, all_files, doc_path)
-                send_email_with_attachments(sender_email, sender_password, team_email, subject_team, body_team, local_file_path=doc_path)
-                # pass
-            # Send thank you email to learner
-            send_email_with_attachments(sender_email, sender_password, learner_email, subject_learner, body_learner)
-            # pass
-        
-            # Update session state to show the final thank you message
-            st.session_state.submission_done = True
-            st.session_state.step = 14  # Move to the final step to show the thank you message
-            st.experimental_rerun()
+        # Update session state to show the final thank you message
+        st.session_state.submission_done = True
+        st.session_state.step = 14  # Move to the final step to show the thank you message
 
-#111111111111111111
-    # Add a warning before the back button
-    st.info("If you go back, you will have to re-sign the form.")
+    # Submit button
+    st.button("Submit", on_click=submit)
 
     # Navigation buttons
-    back_clicked = st.button("Back", disabled=st.session_state.submission_done)
-
-    # Handle Back button click
-    if back_clicked:
-        st.session_state.step = 12  # Go back to the previous step
-        st.experimental_rerun()
-#11111111111111111
+    st.button("Back", key="back_13", disabled=st.session_state.submission_done, on_click=go_to_step, args=(12,))
 
 # Add a new step for the thank you message
 elif st.session_state.step == 14:
     st.title("Thank You!")
     st.write("Check your email for the final boarding.")
     st.write('')
-    st.image('resources/AspireCraft.gif', use_column_width=True)
+    show_animation('resources/AspireCraft.gif')
 
     # if st.button("Back"):
     #     st.session_state.step = 13  # Go back to step 13
@@ -0,0 +1,299 @@
+"""Prebuilt, fingerprinted static images for the app.
+
+The welcome (step 1) and thank-you (step 14) animations are ~1 MB GIFs at
+20 frames per second. At build time each one is transcoded to an animated
+WebP at 10 frames per second (~300 KB), and the frame it holds longest (the
+finished logo) is saved as a small still "poster". The outputs are written to
+static/ under a name that contains a hash of their content. The build also
+writes a copy of the GIF there, for browsers without animated WebP; it is not
+committed (see .gitignore), and where it has not been built those browsers
+show the poster.
+The same goes for the step-6 WhatsApp download icons (resized to 1x, 2x and
+3x their displayed size, for `srcset`) and the browser-tab icon, so no page
+of the form loads anything from a third-party host.
+
+Streamlit serves static/ itself (`server.enableStaticServing` in
+.streamlit/config.toml). URLs carry the fingerprint as `?v=`, which makes the
+static file handler send a long-lived Cache-Control header: a file never
+changes under its name, so a browser that has it never asks again. The page
+shows the poster as soon as it arrives, then the animation over it.
+
+Rebuild after replacing one of the source images (until then the app falls
+back to the originals in resources/):
+
+    python assets.py build
+"""
+import argparse
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import threading
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+RESOURCES_DIR = os.path.join(APP_DIR, "resources")
+STATIC_DIR = os.path.join(APP_DIR, "static")
+STATIC_URL = "app/static"
+MANIFEST_FILE = os.path.join(RESOURCES_DIR, "static-assets.json")
+MANIFEST_VERSION = 3
+
+# Source images (relative to the app directory) turned into static assets
+ANIMATIONS = (
+    "resources/AspireCraft_resized.gif",
+    "resources/AspireCraft.gif",
+)
+WEBP_QUALITY = 50
+POSTER_QUALITY = 75
+MIN_FRAME_MS = 100  # short frames are merged up to this: 20 fps -> 10 fps, same timing
+
+# (source, displayed width in CSS pixels)
+ICONS = (
+    ("resources/icons/android.png", 100),
+    ("resources/icons/iphone.png", 100),
+    ("resources/icons/windows.png", 100),
+    ("resources/icons/macbook.png", 100),
+)
+ICON_SCALES = (1, 2, 3)  # only the ones the source is large enough for
+
+# The browser-tab icon: the wings of the logo, on the page background
+FAVICON = "resources/logo.png"
+FAVICON_CROP = (40, 176, 460, 362)
+FAVICON_TAGLINE = (100, 2, 330, 28)  # inside the crop: the tagline between the wings
+FAVICON_SIZE = 64
+FAVICON_BACKGROUND = (45, 43, 43)
+
+SOURCES = ANIMATIONS + tuple(source for source, _ in ICONS) + (FAVICON,)
+_FINGERPRINTED = re.compile(r"\.[0-9a-f]{12}\.\w+$")
+
+_lock = threading.Lock()
+_manifest = None  # (signature, {source: entry})
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _fingerprinted(stem, data, extension):
+    # "AspireCraft.gif" bytes -> "AspireCraft.1a2b3c4d5e6f.gif"
+    return f"{stem}.{_sha256(data)[:12]}{extension}"
+
+
+def _png(image):
+    output = io.BytesIO()
+    image.save(output, "PNG", optimize=True)
+    return output.getvalue()
+
+
+def transcode_animation(data):
+    # (animated WebP bytes, poster WebP bytes, (width, height)) for GIF bytes
+    from PIL import Image, ImageSequence
+
+    image = Image.open(io.BytesIO(data))
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(image):
+        frames.append(frame.convert("RGB"))
+        durations.append(frame.info.get("duration", 100))
+    poster_frame = frames[durations.index(max(durations))]
+
+    # Consecutive short frames are merged into one shown for their total
+    # duration, up to MIN_FRAME_MS; frames held that long or longer (the
+    # finished logo) are kept as they are
+    kept, kept_durations = [], []
+    for frame, duration in zip(frames, durations):
+        if kept_durations and kept_durations[-1] < MIN_FRAME_MS and duration < MIN_FRAME_MS:
+            kept_durations[-1] += duration
+        else:
+            kept.append(frame)
+            kept_durations.append(duration)
+
+    animation = io.BytesIO()
+    kept[0].save(animation, "WEBP", save_all=True, append_images=kept[1:], duration=kept_durations,
+                 loop=image.info.get("loop", 0), quality=WEBP_QUALITY, method=6, minimize_size=True)
+    poster = io.BytesIO()
+    poster_frame.save(poster, "WEBP", quality=POSTER_QUALITY, method=6)
+    return animation.getvalue(), poster.getvalue(), image.size
+
+
+def build_animation(stem, extension, data):
+    # (manifest entry, {file name: bytes}); the GIF fallback is not one of the
+    # entry's "files", so a checkout without it still uses the WebP
+    animation, poster, (width, height) = transcode_animation(data)
+    entry = {
+        "width": width,
+        "height": height,
+        "animation": _fingerprinted(stem, animation, ".webp"),
+        "poster": _fingerprinted(stem + ".poster", poster, ".webp"),
+        "fallback": _fingerprinted(stem, data, extension),
+    }
+    return entry, {entry["animation"]: animation, entry["poster"]: poster, entry["fallback"]: data}
+
+
+def build_icon(stem, data, width):
+    # PNG variants at each scale of `width` the source can fill without upscaling
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data)).convert("RGBA")
+    height = round(width * image.height / image.width)
+    entry = {"width": width, "height": height, "variants": []}
+    files = {}
+    for scale in ICON_SCALES:
+        if scale > 1 and width * scale > image.width:
+            break
+        content = _png(image.resize((width * scale, height * scale), Image.LANCZOS))
+        name = _fingerprinted(f"{stem}-{width * scale}", content, ".png")
+        entry["variants"].append([scale, name])
+        files[name] = content
+    return entry, files
+
+
+def build_favicon(stem, data):
+    from PIL import Image, ImageDraw
+
+    logo = Image.open(io.BytesIO(data)).convert("RGBA").crop(FAVICON_CROP)
+    ImageDraw.Draw(logo).rectangle(FAVICON_TAGLINE, fill=FAVICON_BACKGROUND + (255,))
+    side = max(logo.size)
+    icon = Image.new("RGBA", (side, side), FAVICON_BACKGROUND + (255,))
+    icon.alpha_composite(logo, ((side - logo.width) // 2, (side - logo.height) // 2))
+    content = _png(icon.resize((FAVICON_SIZE, FAVICON_SIZE), Image.LANCZOS))
+    name = _fingerprinted(f"{stem}-favicon", content, ".png")
+    return {"favicon": name}, {name: content}
+
+
+def build_assets(static_dir=STATIC_DIR, manifest_path=MANIFEST_FILE):
+    os.makedirs(static_dir, exist_ok=True)
+    icon_widths = dict(ICONS)
+    entries = {}
+    for source in SOURCES:
+        with open(os.path.join(APP_DIR, source), "rb") as f:
+            data = f.read()
+        stem, extension = os.path.splitext(os.path.basename(source))
+        if source in ANIMATIONS:
+            entry, files = build_animation(stem, extension, data)
+        elif source in icon_widths:
+            entry, files = build_icon(stem, data, icon_widths[source])
+        else:
+            entry, files = build_favicon(stem, data)
+        for name, content in files.items():
+            with open(os.path.join(static_dir, name), "wb") as f:
+                f.write(content)
+        entry["source_sha256"] = _sha256(data)
+        entry["files"] = sorted(name for name in files if name != entry.get("fallback"))
+        entries[source] = entry
+
+    # Drop the outputs of earlier builds
+    current = {name for entry in entries.values() for name in entry["files"] + [entry.get("fallback")]}
+    for name in os.listdir(static_dir):
+        if name not in current and _FINGERPRINTED.search(name):
+            os.remove(os.path.join(static_dir, name))
+
+    artifact = {"version": MANIFEST_VERSION, "assets": entries}
+    # Write to a temporary file first so a running app never reads half a file
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, manifest_path)
+    return entries
+
+
+def _signature(paths):
+    # mtime + size is enough to notice a rebuilt manifest or a replaced image
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            signature.append((path, None, None))
+        else:
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _load_manifest():
+    # {source: entry} for the assets whose build is up to date with their source
+    try:
+        with open(MANIFEST_FILE, encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if artifact.get("version") != MANIFEST_VERSION:
+        return {}
+    entries = {}
+    for source, entry in artifact["assets"].items():
+        try:
+            with open(os.path.join(APP_DIR, source), "rb") as f:
+                if _sha256(f.read()) != entry["source_sha256"]:
+                    continue
+        except OSError:
+            continue
+        if all(os.path.exists(os.path.join(STATIC_DIR, name)) for name in entry["files"]):
+            entries[source] = entry
+    return entries
+
+
+def get_manifest():
+    global _manifest
+    signature = _signature([MANIFEST_FILE] + [os.path.join(APP_DIR, source) for source in SOURCES])
+    cached = _manifest
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with _lock:
+        if _manifest is None or _manifest[0] != signature:
+            _manifest = (signature, _load_manifest())
+        return _manifest[1]
+
+
+def _url(name):
+    # The fingerprint doubles as the "v" argument that turns on long-lived caching
+    return f"{STATIC_URL}/{name}?v={name.rsplit('.', 2)[-2]}"
+
+
+def animation_html(source, alt=""):
+    # A <picture> showing the built animation at the column width, or None
+    # when `source` has not been built (or was changed since)
+    entry = get_manifest().get(source)
+    if entry is None:
+        return None
+    # Browsers without animated WebP get the GIF if it was built here, else the poster
+    fallback = entry["fallback"] if os.path.exists(os.path.join(STATIC_DIR, entry["fallback"])) else entry["poster"]
+    return (
+        f'<picture><source srcset="{_url(entry["animation"])}" type="image/webp">'
+        f'<img src="{_url(fallback)}" alt="{html.escape(alt)}" '
+        f'width="{entry["width"]}" height="{entry["height"]}" decoding="async" '
+        f'style="width:100%;height:auto;background:url({_url(entry["poster"])}) center/100% no-repeat">'
+        f'</picture>'
+    )
+
+
+def icon_html(source, alt=""):
+    # An <img> with 1x/2x/3x variants, or None when `source` has not been built
+    entry = get_manifest().get(source)
+    if entry is None:
+        return None
+    variants = entry["variants"]
+    srcset = ", ".join(f"{_url(name)} {scale}x" for scale, name in variants[1:])
+    return (
+        f'<img src="{_url(variants[0][1])}"' + (f' srcset="{srcset}"' if srcset else "")
+        + f' alt="{html.escape(alt)}" width="{entry["width"]}" height="{entry["height"]}">'
+    )
+
+
+def favicon_url():
+    # Relative URL of the built browser-tab icon, or None
+    entry = get_manifest().get(FAVICON)
+    return _url(entry["favicon"]) if entry else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the fingerprinted static assets.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="write the animations, icons and favicon to static/")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for source, entry in build_assets().items():
+            sizes = ", ".join(f"{name} {os.path.getsize(os.path.join(STATIC_DIR, name)) / 1024:.1f} KB"
+                              for name in entry["files"])
+            print(f"{source}: {sizes}")
@@ -0,0 +1,184 @@
+"""Content-addressed store for the documents learners upload.
+
+An upload is copied, in chunks, into a file named after the SHA-256 of its
+content (uploads/ab/abcdef...). The session only keeps a small handle
+({"sha256", "name", "type", "size"}) instead of the UploadedFile, so scans do
+not stay in memory while the learner finishes the form. The same content is
+stored once, whoever uploads it and under whatever name, and each session may
+store at most UPLOAD_QUOTA_MB (default 50) of distinct content.
+
+Storing a blob again refreshes its modification time; blobs nobody has stored
+for a while can be removed:
+
+    python blob_store.py stats               # number of blobs and bytes stored
+    python blob_store.py gc --days 30        # remove blobs not stored for 30 days
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from settings import get_settings
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+UPLOAD_DIR = os.path.join(APP_DIR, "uploads")
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    def __init__(self, directory=UPLOAD_DIR):
+        self.directory = directory
+        self.tmp_dir = os.path.join(directory, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, sha256):
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def put(self, stream, chunk_size=CHUNK_SIZE):
+        # (sha256, size) of everything left in `stream`, which is now stored
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter(lambda: stream.read(chunk_size), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            self._commit(tmp_path, sha256)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return sha256, size
+
+    def put_file(self, file_path, expected_sha256=None, chunk_size=CHUNK_SIZE):
+        # Move a finished file (on the same disk) into the store without
+        # copying it: (sha256, size). The file is removed instead when its
+        # content does not match `expected_sha256`.
+        digest = hashlib.sha256()
+        size = 0
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+        if expected_sha256 is not None and sha256 != expected_sha256:
+            os.remove(file_path)
+            raise ValueError(f"SHA-256 mismatch: expected {expected_sha256}, got {sha256}")
+        self._commit(file_path, sha256)
+        return sha256, size
+
+    def _commit(self, file_path, sha256):
+        path = self.path(sha256)
+        if os.path.exists(path):
+            # Already stored: keep the existing file, just mark it as in use
+            os.remove(file_path)
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(file_path, path)
+
+    def open(self, handle):
+        return open(self.path(handle["sha256"]), "rb")
+
+    def _files(self, blobs=True):
+        # Blobs (in the two-letter folders), or else everything else: temporary
+        # files and the indexes other modules keep here (e.g. normalized/)
+        for name in os.listdir(self.directory):
+            folder = os.path.join(self.directory, name)
+            if not os.path.isdir(folder) or (len(name) == 2) != blobs:
+                continue
+            for file_name in os.listdir(folder):
+                yield os.path.join(folder, file_name)
+
+    def _blobs(self):
+        return self._files(blobs=True)
+
+    def stats(self):
+        count = size = 0
+        for path in self._blobs():
+            count += 1
+            size += os.path.getsize(path)
+        return {"blobs": count, "bytes": size}
+
+    def gc(self, older_than_seconds):
+        # Remove blobs (and leftover temporary and index files) not stored or
+        # used since the cutoff
+        cutoff = time.time() - older_than_seconds
+        removed = 0
+        paths = list(self._blobs()) + list(self._files(blobs=False))
+        for path in paths:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(directory=None):
+    # One store per directory per process, shared by every session
+    directory = directory or get_settings().upload_dir or UPLOAD_DIR
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = _stores[directory] = BlobStore(directory)
+        return store
+
+
+def store_upload(session_state, uploaded_file):
+    # (handle, warning) for an UploadedFile. It is already in memory, so it
+    # is hashed before anything is written, for the quota check.
+    def put():
+        uploaded_file.seek(0)
+        return get_blob_store().put(uploaded_file)
+
+    sha256 = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+    return add_upload_handle(session_state, uploaded_file.file_id, uploaded_file.name,
+                             uploaded_file.type, uploaded_file.size, sha256, put)
+
+
+def add_upload_handle(session_state, upload_id, name, mime_type, size, sha256, put):
+    # (handle, warning) for an upload of content `sha256` that `put()`
+    # stores, returning (sha256, size). Each upload is only stored once per
+    # session; the quota counts every distinct content the session stored, so
+    # content the session already has is not charged again.
+    handles = session_state.setdefault("_upload_handles", {})  # upload id -> handle
+    handle = handles.get(upload_id)
+    if handle is not None:
+        return handle, None
+
+    sizes = session_state.setdefault("_upload_sizes", {})  # sha256 -> size
+    quota_mb = get_settings().upload_quota_mb
+    if sha256 not in sizes and sum(sizes.values()) + size > quota_mb * 1024 * 1024:
+        return None, (f"{name} was not uploaded: your documents can take up "
+                      f"at most {quota_mb:g} MB in total.")
+
+    sha256, size = put()
+    handle = {"sha256": sha256, "name": name, "type": mime_type, "size": size}
+    sizes[sha256] = size
+    handles[upload_id] = handle
+    return handle, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the uploaded documents store.")
+    parser.add_argument("--directory", default=None)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="number of blobs and bytes stored")
+    gc = subparsers.add_parser("gc", help="remove blobs not stored for a number of days")
+    gc.add_argument("--days", type=float, default=30)
+    args = parser.parse_args()
+
+    store = get_blob_store(args.directory)
+    if args.command == "stats":
+        stats = store.stats()
+        print(f"{stats['blobs']} blobs, {stats['bytes'] / 1024 / 1024:.1f} MB in {store.directory}")
+    elif args.command == "gc":
+        print(f"Removed {store.gc(args.days * 86400)} blobs from {store.directory}")
@@ -0,0 +1,171 @@
+"""Shared, read-only reference data for the enrolment forms.
+
+The country (with dialing codes and phone number lengths), nationality, subject
+area and CPD course lists are loaded once per process and shared by every
+session. Each source file is stat'ed on access and the catalog is only rebuilt
+when one of them changes on disk.
+
+The CPD course spreadsheet is compiled ahead of time into a small JSON file so
+the app does not need pandas/openpyxl to start:
+
+    python catalog.py build
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+from types import MappingProxyType
+
+from course_search import CourseIndex
+from phone_numbers import PHONE_LENGTHS_FILE, PhoneIndex, load_phone_lengths
+
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
+
+COUNTRIES_FILE = os.path.join(RESOURCES_DIR, "world-countries.json")
+NATIONALITIES_FILE = os.path.join(RESOURCES_DIR, "nationalities.json")
+SUBJECT_AREA_FILE = os.path.join(RESOURCES_DIR, "subject_area_list_v2.txt")
+SUBJECT_AREA_FILE_V1 = os.path.join(RESOURCES_DIR, "subject_area_list.txt")  # app.py
+CPD_COURSE_FILE = os.path.join(RESOURCES_DIR, "CPD_course_list.xlsx")
+CPD_CATALOG_FILE = os.path.join(RESOURCES_DIR, "CPD_course_list.catalog.json")
+CPD_CATALOG_VERSION = 1
+
+_lock = threading.Lock()
+_catalogs = {}  # (subject_area_file, with_courses) -> (signature, Catalog)
+
+
+class Catalog:
+    # Every derived structure the form needs is built here, once, so a rerun
+    # only has to look attributes up.
+    def __init__(self, subject_area_file, with_courses=True):
+        # Country names and dialing codes
+        with open(COUNTRIES_FILE) as file:
+            data = json.load(file)
+        self.countries = MappingProxyType({entry['name']: entry['dialing_code'] for entry in data})
+        self.country_names = ("Select",) + tuple(sorted(self.countries.keys()))
+        # Dialing-code trie and valid number lengths, for step 6
+        self.phone_index = PhoneIndex(self.countries, load_phone_lengths())
+
+        # Nationalities
+        with open(NATIONALITIES_FILE, "r") as f:
+            self.nationalities = tuple(json.load(f))
+        self.nationality_options = ("Select",) + self.nationalities
+
+        # Subject areas
+        with open(subject_area_file, "r") as file:
+            self.subject_areas = tuple(line.strip() for line in file.readlines())
+        self.sorted_subject_areas = tuple(sorted(self.subject_areas))
+        self.subject_area_options = ("Select",) + self.sorted_subject_areas
+
+        # CPD courses grouped by category (only the v2 form offers them)
+        self.category_courses = MappingProxyType(load_category_courses() if with_courses else {})
+        self.category_options = ("Select",) + tuple(self.category_courses.keys())
+        # Search index over the courses, with a stable ID per course
+        self.course_index = CourseIndex(self.category_courses)
+
+
+def load_category_courses(source=CPD_COURSE_FILE, compiled=CPD_CATALOG_FILE):
+    # Prefer the prebuilt catalog; only fall back to parsing the spreadsheet
+    # when the artifact is missing, from another format version or stale.
+    category_courses = load_compiled_category_courses(source, compiled)
+    if category_courses is None:
+        category_courses = read_category_courses_xlsx(source)
+    return category_courses
+
+
+def read_category_courses_xlsx(path=CPD_COURSE_FILE):
+    # Deduplicated, sorted course titles per category, categories in sorted order
+    import pandas as pd
+
+    df = pd.read_excel(path, sheet_name=0)
+    df = df.drop_duplicates(subset=['Category', 'Course Title'])
+    grouped = df.groupby('Category')['Course Title'].apply(lambda x: tuple(sorted(set(x)))).to_dict()
+    return grouped
+
+
+def _file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_compiled_category_courses(source=CPD_COURSE_FILE, compiled=CPD_CATALOG_FILE):
+    try:
+        with open(compiled, "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if artifact.get("version") != CPD_CATALOG_VERSION:
+        return None
+    # The spreadsheet is the source of truth; if it was edited after the
+    # artifact was built, the artifact is ignored until it is rebuilt.
+    if os.path.exists(source) and artifact.get("source_sha256") != _file_sha256(source):
+        return None
+
+    return {category: tuple(courses) for category, courses in artifact["categories"].items()}
+
+
+def compile_category_courses(source=CPD_COURSE_FILE, compiled=CPD_CATALOG_FILE):
+    category_courses = read_category_courses_xlsx(source)
+    artifact = {
+        "version": CPD_CATALOG_VERSION,
+        "source": os.path.basename(source),
+        "source_sha256": _file_sha256(source),
+        "categories": {category: list(courses) for category, courses in category_courses.items()},
+    }
+    # Write to a temporary file first so a running app never reads half a file
+    tmp_path = compiled + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    os.replace(tmp_path, compiled)
+    return artifact
+
+
+def _source_files(subject_area_file, with_courses):
+    files = [COUNTRIES_FILE, PHONE_LENGTHS_FILE, NATIONALITIES_FILE, subject_area_file]
+    if with_courses:
+        # Either one may be left out of a deployment (see load_category_courses)
+        files += [path for path in (CPD_COURSE_FILE, CPD_CATALOG_FILE) if os.path.exists(path)]
+    return files
+
+
+def _signature(files):
+    # mtime + size is enough to notice an edited or replaced resource file
+    signature = []
+    for path in files:
+        stat = os.stat(path)
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def get_catalog(subject_area_file=SUBJECT_AREA_FILE, with_courses=True):
+    key = (subject_area_file, with_courses)
+    signature = _signature(_source_files(subject_area_file, with_courses))
+
+    cached = _catalogs.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _lock:
+        # Another session may have rebuilt it while we waited for the lock
+        cached = _catalogs.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        catalog = Catalog(subject_area_file, with_courses)
+        _catalogs[key] = (signature, catalog)
+        return catalog
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the prebuilt reference data artifacts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="compile the CPD course spreadsheet into a JSON catalog")
+    build.add_argument("--source", default=CPD_COURSE_FILE)
+    build.add_argument("--output", default=CPD_CATALOG_FILE)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        artifact = compile_category_courses(args.source, args.output)
+        course_count = sum(len(courses) for courses in artifact["categories"].values())
+        print(f"Wrote {args.output}: {len(artifact['categories'])} categories, {course_count} courses")
@@ -0,0 +1,227 @@
+"""Search over the CPD course catalog for the step-8 course picker.
+
+The index is built once per catalog (see catalog.Catalog) and shared by every
+session. Each course gets a stable ID derived from its category and title, so a
+learner's selection survives catalog rebuilds and is stored as a set of IDs.
+
+Titles and categories are split into lowercase words. The inverted index maps
+each word to the (sorted) positions of the courses containing it; a sorted
+vocabulary answers prefix queries with two bisects, and a table of every word
+with one letter deleted answers typo-tolerant (edit distance 1) lookups
+without scanning the vocabulary. A search only touches the postings of the
+words it matches and returns one page of the top results, so its cost does not
+grow with the size of the catalog.
+
+    python course_search.py bench                  # 1k / 10k / 50k synthetic courses
+    python course_search.py bench --courses 50000
+"""
+import argparse
+import bisect
+import hashlib
+import heapq
+import random
+import re
+import time
+from functools import lru_cache
+
+PAGE_SIZE = 20
+FUZZY_MIN_LENGTH = 4  # shorter words match too many others with one typo
+
+# Points per query word, by how the course matched it
+EXACT_SCORE = 3
+PREFIX_SCORE = 2
+FUZZY_SCORE = 1
+
+
+def course_id(category, title):
+    # Stable across rebuilds and reorderings of the spreadsheet
+    return hashlib.sha1(f"{category}\x1f{title}".encode("utf-8")).hexdigest()[:12]
+
+
+def words(text):
+    return re.findall(r"[0-9a-z]+", text.lower())
+
+
+def _deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class CourseIndex:
+    def __init__(self, category_courses):
+        # Courses in category order, then title order, so every category is one
+        # contiguous range of positions
+        self.courses = []  # (id, category, title)
+        self.category_ranges = {}
+        for category, titles in category_courses.items():
+            start = len(self.courses)
+            for title in titles:
+                self.courses.append((course_id(category, title), category, title))
+            self.category_ranges[category] = (start, len(self.courses))
+        self.positions = {course[0]: position for position, course in enumerate(self.courses)}
+
+        postings = {}
+        for position, (_, category, title) in enumerate(self.courses):
+            for word in set(words(title)) | set(words(category)):
+                postings.setdefault(word, []).append(position)
+        self.postings = {word: tuple(positions) for word, positions in postings.items()}
+        self.vocabulary = sorted(self.postings)
+
+        # "managment" -> {"management"}: every word with one letter removed
+        self.deleted = {}
+        for word in self.vocabulary:
+            if len(word) >= FUZZY_MIN_LENGTH:
+                for deletion in _deletions(word):
+                    self.deleted.setdefault(deletion, set()).add(word)
+
+        # Repeated searches (fragment reruns while ticking courses) are free
+        self.search = lru_cache(maxsize=256)(self._search)
+
+    def __len__(self):
+        return len(self.courses)
+
+    def titles(self, ids):
+        # Titles of the given course IDs in catalog order (unknown IDs are skipped)
+        positions = sorted(self.positions[course] for course in ids if course in self.positions)
+        return [self.courses[position][2] for position in positions]
+
+    def _matches(self, word):
+        # {word in the vocabulary: score} for one query word
+        matches = {}
+        start = bisect.bisect_left(self.vocabulary, word)
+        end = bisect.bisect_left(self.vocabulary, word + "\uffff")
+        for candidate in self.vocabulary[start:end]:
+            matches[candidate] = EXACT_SCORE if candidate == word else PREFIX_SCORE
+        if len(word) >= FUZZY_MIN_LENGTH:
+            # A missing, extra or substituted letter
+            fuzzy = set(self.deleted.get(word, ()))
+            for deletion in _deletions(word):
+                if deletion in self.postings:
+                    fuzzy.add(deletion)
+                fuzzy.update(self.deleted.get(deletion, ()))
+            for candidate in fuzzy:
+                matches.setdefault(candidate, FUZZY_SCORE)
+        return matches
+
+    def _search(self, query, category=None, page=0, page_size=PAGE_SIZE):
+        # (courses on this page, number of matching courses). Every query word
+        # has to match; courses are ranked by score, then catalog order.
+        start, end = self.category_ranges.get(category, (0, len(self.courses)))
+        query_words = words(query)
+        if not query_words:
+            total = end - start
+            first = start + page * page_size
+            return tuple(self.courses[first:min(first + page_size, end)]), total
+
+        scores = None
+        for word in query_words:
+            word_scores = {}
+            for candidate, score in self._matches(word).items():
+                postings = self.postings[candidate]
+                # Only the part of the postings inside the category
+                low = bisect.bisect_left(postings, start)
+                high = bisect.bisect_left(postings, end)
+                for position in postings[low:high]:
+                    if word_scores.get(position, 0) < score:
+                        word_scores[position] = score
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {position: scores[position] + score
+                          for position, score in word_scores.items() if position in scores}
+            if not scores:
+                return (), 0
+
+        top = heapq.nsmallest((page + 1) * page_size, scores.items(), key=lambda item: (-item[1], item[0]))
+        return tuple(self.courses[position] for position, _ in top[page * page_size:]), len(scores)
+
+
+# --- benchmark ---------------------------------------------------------------------
+
+SYNTHETIC_WORDS = (
+    "safety", "management", "leadership", "care", "health", "digital", "marketing", "finance", "first", "aid",
+    "fire", "food", "hygiene", "awareness", "communication", "customer", "service", "data", "protection",
+    "equality", "diversity", "infection", "control", "manual", "handling", "mental", "wellbeing", "project",
+    "planning", "conflict", "resolution", "safeguarding", "children", "adults", "dementia", "nutrition",
+    "excel", "office", "sales", "coaching", "mentoring", "negotiation", "risk", "assessment", "stress",
+    "time", "teamwork", "budgeting", "recruitment", "induction", "autism", "diabetes", "medication",
+)
+
+
+def synthetic_catalog(course_count, category_count=40, seed=1):
+    # {category: sorted titles} with `course_count` distinct made-up courses
+    rng = random.Random(seed)
+    categories = [f"Category {index + 1} " + " ".join(rng.sample(SYNTHETIC_WORDS, 2)).title()
+                  for index in range(category_count)]
+    category_courses = {category: set() for category in categories}
+    number = 0
+    while number < course_count:
+        category = categories[number % category_count]
+        title = " ".join(rng.sample(SYNTHETIC_WORDS, rng.randint(2, 4))).title() + f" Level {number}"
+        category_courses[category].add(title)
+        number += 1
+    return {category: tuple(sorted(titles)) for category, titles in category_courses.items()}
+
+
+def _checkbox_loop(category_courses, category, selected):
+    # The bookkeeping step 8 used to do on every rerun (besides drawing one
+    # st.checkbox per course): visit every course in the category and keep a
+    # list of selected titles in sync
+    for course in category_courses.get(category, []):
+        is_checked = course in selected
+        if is_checked:
+            if course not in selected:
+                selected.append(course)
+        elif course in selected:
+            selected.remove(course)
+    return selected
+
+
+def benchmark(course_count, rounds=200):
+    # Seconds to build the index, and for each kind of step-8 rerun: seconds of
+    # work and checkboxes drawn. "new query" is a search the cache has not seen
+    # (typing); a "rerun" repeats it (ticking a course, paging back).
+    category_courses = synthetic_catalog(course_count)
+    started = time.perf_counter()
+    index = CourseIndex(category_courses)
+    build = time.perf_counter() - started
+
+    category = next(iter(category_courses))
+    selected_ids = {course[0] for course in index.courses[::max(1, len(index) // 200)]}
+    selected_titles = index.titles(selected_ids)
+    queries = [
+        ("category page", "", category),
+        ("prefix 'saf'", "saf", None),
+        ("two words", "fire safety", None),
+        ("typo 'managment'", "managment", None),
+    ]
+    results = {}
+    for name, query, in_category in queries:
+        for label, search in ((f"{name}, new query", index._search), (f"{name}, rerun", index.search)):
+            search(query, in_category)  # for "rerun", the query is already cached
+            started = time.perf_counter()
+            for _ in range(rounds):
+                page, _ = search(query, in_category)
+                [course[0] in selected_ids for course in page]
+            results[label] = ((time.perf_counter() - started) / rounds, len(page))
+    old_rounds = max(1, rounds // 20)
+    started = time.perf_counter()
+    for _ in range(old_rounds):
+        _checkbox_loop(category_courses, category, list(selected_titles))
+    results["old checkbox loop"] = ((time.perf_counter() - started) / old_rounds, len(category_courses[category]))
+    return build, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPD course search tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench = subparsers.add_parser("bench", help="search latency on synthetic catalogs")
+    bench.add_argument("--courses", type=int, nargs="*", default=[1000, 10000, 50000])
+    bench.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        for course_count in args.courses:
+            build, results = benchmark(course_count, args.rounds)
+            print(f"{course_count} courses: index built in {build * 1000:.0f} ms")
+            for name, (seconds, checkboxes) in results.items():
+                print(f"  {name:<32}{seconds * 1000:8.3f} ms{checkboxes:8} checkboxes")
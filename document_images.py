@@ -0,0 +1,186 @@
+"""Smaller copies of the photos learners upload, for the team's emails.
+
+ID cards, proofs of address and certificates mostly arrive as 8-12 MP phone
+photos of several MB each, often on their side. When a jpg or png upload is
+stored, a background thread makes a normalized copy of it: decoded straight
+at a reduced size where JPEG allows it (draft mode), turned upright from its
+EXIF orientation, scaled so that its long side is IMAGE_MAX_SIDE (default
+2000 px, about 170 dpi for an A4 page) and saved as a JPEG at IMAGE_QUALITY
+(default 80), without the photo's metadata. Both versions stay in the blob
+store; the team email and the digest ZIP attach the normalized one, waiting
+for it (or making it on the outbox worker) if it is not ready yet.
+
+Images larger than MAX_PIXELS once decoded (decompression bombs), files
+that are not valid images and copies that would not be clearly smaller are
+attached as they were uploaded. NORMALIZE_IMAGES=0 turns this off.
+
+    python document_images.py normalize FILE...   # size and time, before/after
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from blob_store import get_blob_store
+from settings import get_settings
+
+IMAGE_TYPES = {"image/jpeg", "image/png"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+MAX_PIXELS = 50_000_000  # largest image decoded, after draft mode
+MAX_SIZE_RATIO = 0.9  # keep the original unless the copy is at least 10% smaller
+WORKERS = 2
+
+logger = logging.getLogger(__name__)
+
+
+def is_image(handle):
+    extension = os.path.splitext(handle["name"])[1].lower()
+    return handle["type"] in IMAGE_TYPES or extension in IMAGE_EXTENSIONS
+
+
+def normalize_image(stream, max_side, quality):
+    # JPEG bytes of the image in `stream`, upright and at most `max_side`
+    # pixels on its long side, or None when it cannot (or should not) be done
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(stream)  # reads the header only
+        if image.format not in ("JPEG", "PNG"):
+            return None
+        width, height = image.size
+        if image.format == "JPEG":
+            # Let the decoder skip detail: 1/2, 1/4 or 1/8 of the size, as long
+            # as that is still at least the size we scale down to
+            scale = min(1, max_side / max(width, height))
+            image.draft("RGB", (max(1, int(width * scale)), max(1, int(height * scale))))
+        if image.width * image.height > MAX_PIXELS:
+            logger.warning("Not normalizing a %sx%s image: too large to decode", width, height)
+            return None
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            # Transparent areas become white, as they look on a page
+            image = image.convert("RGBA")
+            flat = Image.new("RGB", image.size, "white")
+            flat.paste(image, mask=image.getchannel("A"))
+            image = flat
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, "JPEG", quality=quality, optimize=True)
+        return output.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        logger.warning("Not normalizing an image: %s", error)
+        return None
+
+
+def _index_path(store, sha256):
+    # Which blob is the normalized copy of an upload (and with which settings)
+    return os.path.join(store.directory, "normalized", sha256 + ".json")
+
+
+def normalize_upload(handle, store=None):
+    # The handle of the normalized copy of an upload (or the upload's own
+    # handle when it is kept as it is), made now unless already indexed
+    store = store or get_blob_store()
+    settings = get_settings()
+    params = [settings.image_max_side, settings.image_quality]
+    index_path = _index_path(store, handle["sha256"])
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            entry = json.load(f)
+        if entry["params"] == params and os.path.exists(store.path(entry["sha256"])):
+            os.utime(index_path)  # in use, like storing a blob again
+            return _normalized(handle, entry)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with store.open(handle) as f:
+        data = normalize_image(f, *params)
+    if data is None or len(data) > handle["size"] * MAX_SIZE_RATIO:
+        entry = {"params": params, "sha256": handle["sha256"]}
+    else:
+        sha256, _ = store.put(io.BytesIO(data))
+        entry = {"params": params, "sha256": sha256}
+
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(index_path))
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, index_path)
+    return _normalized(handle, entry)
+
+
+def _normalized(handle, entry):
+    if entry["sha256"] == handle["sha256"]:
+        return handle
+    stem = os.path.splitext(handle["name"])[0]
+    size = os.path.getsize(get_blob_store().path(entry["sha256"]))
+    return {"sha256": entry["sha256"], "name": stem + ".jpg", "type": "image/jpeg", "size": size}
+
+
+_executor = None
+_futures = {}  # sha256 -> Future, while being normalized
+_lock = threading.Lock()
+
+
+def normalize_in_background(handle):
+    # Start normalizing a stored upload on the pool; returns at once
+    global _executor
+    if not get_settings().normalize_images or not is_image(handle):
+        return
+    with _lock:
+        if handle["sha256"] in _futures:
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="image-normalizer")
+        future = _executor.submit(normalize_upload, handle)
+        _futures[handle["sha256"]] = future
+    future.add_done_callback(lambda _: _forget(handle["sha256"]))
+
+
+def _forget(sha256):
+    with _lock:
+        _futures.pop(sha256, None)
+
+
+def normalized_handle(handle):
+    # The version of an upload to attach to an email. Never fails: when the
+    # copy cannot be made, the upload goes as it is.
+    if not get_settings().normalize_images or not is_image(handle):
+        return handle
+    with _lock:
+        future = _futures.get(handle["sha256"])
+    try:
+        if future is not None:
+            return future.result()
+        return normalize_upload(handle)
+    except Exception:
+        logger.exception("Could not normalize %s", handle["name"])
+        return handle
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize photos of documents.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    normalize = subparsers.add_parser("normalize", help="show what normalizing would do to images")
+    normalize.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "normalize":
+        settings = get_settings()
+        for path in args.files:
+            start = time.perf_counter()
+            with open(path, "rb") as f:
+                data = normalize_image(f, settings.image_max_side, settings.image_quality)
+            elapsed = time.perf_counter() - start
+            before = os.path.getsize(path) / 1024
+            if data is None:
+                print(f"{path}: {before:.0f} KB, kept as it is ({elapsed * 1000:.0f} ms)")
+            else:
+                print(f"{path}: {before:.0f} KB -> {len(data) / 1024:.0f} KB ({elapsed * 1000:.0f} ms)")
@@ -0,0 +1,423 @@
+"""DOCX rendering of a submitted enrolment form.
+
+Works on the plain submission record (see submission.submission_record)
+rather than on st.session_state, so it can run on an outbox worker thread.
+
+Rendering starts from a template that already contains the header table with
+the AspireCraft logo and the main heading. It is loaded once per process: the
+parts that never change (styles, theme, logo, ...) are compressed into a
+ready-made zip, and one styled paragraph per block type is kept as a parsed
+prototype. A submission only clones prototypes, fills in their text and
+appends document.xml (and the signature) to a copy of that zip, instead of
+opening the python-docx default template, decoding the logo and
+re-serialising every part of the package each time.
+
+    python documents.py build-template   # write resources/form_template.docx
+    python documents.py bench            # compare with the python-docx builder
+"""
+import argparse
+import copy
+import io
+import os
+import threading
+import time
+import tracemalloc
+
+from signature import EMU_PER_CANVAS_PIXEL, png_size
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+HEADER_IMAGE = os.path.join(APP_DIR, "resources", "img_doc.png")
+TEMPLATE_FILE = os.path.join(APP_DIR, "resources", "form_template.docx")
+
+# Paragraph styles used by the form, keyed by the names submission_blocks() uses
+BLOCK_STYLES = {
+    "h1": "Heading 1",
+    "h2": "Heading 2",
+    "p": "Normal",
+    "bullet": "List Bullet",
+}
+
+
+def build_template(path=None):
+    from docx import Document
+    from docx.shared import Inches
+
+    doc = Document()
+
+    # Header: a 1x4 table with the logo in the right-most cell
+    table = doc.add_table(rows=1, cols=4)
+    table.allow_autofit = False
+    left_cell = table.cell(0, 0)
+    right_cell = table.cell(0, 3)
+    run = right_cell.paragraphs[0].add_run()
+    run.add_picture(HEADER_IMAGE, width=Inches(1.5))
+    left_cell.text = " "  # Empty text to leave room for formatting
+
+    # Main Heading
+    doc.add_heading('Enrolment Form Submission', 0)
+
+    # One sample paragraph per style; the renderer clones and removes them
+    for style in BLOCK_STYLES.values():
+        doc.add_paragraph("", style=style).add_run("{text}")
+
+    stream = io.BytesIO()
+    doc.save(stream)
+    if path:
+        with open(path, "wb") as f:
+            f.write(stream.getvalue())
+    return stream.getvalue()
+
+
+DOCUMENT_PART = "word/document.xml"
+DOCUMENT_RELS_PART = "word/_rels/document.xml.rels"
+SIGNATURE_PART = "word/media/signature.png"
+SIGNATURE_REL_ID = "rIdSignature"
+IMAGE_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+
+
+class DocxTemplate:
+    # Everything that is the same for every submission is prepared here once:
+    # the static package parts are compressed into a ready-made zip, and the
+    # body, style prototypes and signature paragraph are parsed XML elements.
+    def __init__(self, template_bytes):
+        import zipfile
+        from docx.oxml.ns import qn
+        from docx.oxml.parser import parse_xml
+        from docx.oxml.shape import CT_Inline
+        from docx.shared import Inches
+
+        with zipfile.ZipFile(io.BytesIO(template_bytes)) as template:
+            parts = {info.filename: template.read(info.filename) for info in template.infolist()}
+
+        self.document = parse_xml(parts.pop(DOCUMENT_PART))
+        body = self.document.find(qn("w:body"))
+        self.sect_pr_index = list(body).index(body.find(qn("w:sectPr")))
+
+        # The style samples sit right before sectPr; keep them as prototypes
+        samples = body.findall(qn("w:p"))[-len(BLOCK_STYLES):]
+        self.prototypes = {}
+        for key, p in zip(BLOCK_STYLES, samples):
+            body.remove(p)
+            self.prototypes[key] = p
+        self.sect_pr_index -= len(samples)
+
+        # Signature picture paragraph, pointing at a fixed relationship id
+        inline = CT_Inline.new_pic_inline(1000, SIGNATURE_REL_ID, "signature.png", Inches(2), Inches(1))
+        self.signature_paragraph = parse_xml(
+            '<w:p xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            '<w:r><w:drawing/></w:r></w:p>'
+        )
+        self.signature_paragraph.find(qn("w:r")).find(qn("w:drawing")).append(inline)
+
+        rels = parts.pop(DOCUMENT_RELS_PART)
+        self.rels = rels
+        self.rels_with_signature = rels.replace(
+            b"</Relationships>",
+            f'<Relationship Id="{SIGNATURE_REL_ID}" Type="{IMAGE_REL_TYPE}" Target="media/signature.png"/>'
+            "</Relationships>".encode(),
+        )
+
+        # Static parts compressed once; each render appends its own parts
+        static = io.BytesIO()
+        with zipfile.ZipFile(static, "w", compression=zipfile.ZIP_DEFLATED) as package:
+            for name, data in parts.items():
+                package.writestr(name, data)
+        self.static_package = static.getvalue()
+
+    def render(self, blocks, signature_png, doc_path, signature_scale=1.0):
+        import zipfile
+        from lxml import etree
+        from docx.oxml.ns import qn
+        from docx.text.paragraph import Paragraph
+
+        document = copy.deepcopy(self.document)
+        body = document.find(qn("w:body"))
+
+        new_elements = []
+        for style, text in blocks:
+            p = copy.deepcopy(self.prototypes[style])
+            run = p.r_lst[0]
+            if "\n" in text or "\t" in text or "\r" in text:
+                # Let python-docx turn line breaks and tabs into <w:br/>/<w:tab/>
+                p.remove(run)
+                Paragraph(p, None).add_run(text)
+            else:
+                run.t_lst[0].text = text
+            new_elements.append(p)
+        if signature_png is not None:
+            # Shown at the scale it was drawn on the canvas (2 inches = canvas
+            # width); signature_scale is image pixels per canvas pixel
+            signature_paragraph = copy.deepcopy(self.signature_paragraph)
+            width, height = png_size(signature_png)
+            emu_per_pixel = EMU_PER_CANVAS_PIXEL / signature_scale
+            cx, cy = str(round(width * emu_per_pixel)), str(round(height * emu_per_pixel))
+            for extent in signature_paragraph.iter(qn("wp:extent"), qn("a:ext")):
+                extent.set("cx", cx)
+                extent.set("cy", cy)
+            new_elements.append(signature_paragraph)
+        body[self.sect_pr_index:self.sect_pr_index] = new_elements
+
+        output = io.BytesIO(self.static_package)
+        output.seek(0, io.SEEK_END)
+        with zipfile.ZipFile(output, "a", compression=zipfile.ZIP_DEFLATED) as package:
+            package.writestr(DOCUMENT_PART, etree.tostring(document, xml_declaration=True, encoding="UTF-8", standalone=True))
+            if signature_png is not None:
+                package.writestr(DOCUMENT_RELS_PART, self.rels_with_signature)
+                package.writestr(SIGNATURE_PART, signature_png, compress_type=zipfile.ZIP_STORED)
+            else:
+                package.writestr(DOCUMENT_RELS_PART, self.rels)
+
+        if hasattr(doc_path, "write"):
+            doc_path.write(output.getvalue())
+        else:
+            with open(doc_path, "wb") as f:
+                f.write(output.getvalue())
+        return doc_path
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_template():
+    # Loaded once per process; the prebuilt file is used when present
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                if os.path.exists(TEMPLATE_FILE):
+                    with open(TEMPLATE_FILE, "rb") as f:
+                        template_bytes = f.read()
+                else:
+                    template_bytes = build_template()
+                _template = DocxTemplate(template_bytes)
+    return _template
+
+
+def submission_blocks(summary):
+    # The form content as (style, text) pairs, in document order, from the
+    # same summary the step-13 review shows
+    blocks = []
+    for kind, label, value in summary:
+        if kind == "section":
+            blocks.append(("h1", label))
+        elif kind in ("field", "service_field", "no_services"):
+            blocks.append(("p", f"{label}: {value}"))
+        elif kind == "service":
+            blocks.append(("h2", label))
+        elif kind == "options":
+            blocks.append(("p", f"{label}:"))
+        elif kind == "option":
+            blocks.append(("bullet", f"  - {value}"))
+        elif kind == "option_detail":
+            blocks.append(("p", f"    {label}: {value}"))
+
+    # Signature (the image itself is added by the renderer)
+    blocks.append(("h1", 'Signature'))
+    return blocks
+
+
+def build_submission_docx(record, signature_png, doc_path, signature_scale=1.0):
+    return get_template().render(submission_blocks(record["summary"]), signature_png, doc_path, signature_scale)
+
+
+def _build_sample_docx(form, signature_png, doc_path):
+    # The template engine, starting from the same plain form as the baseline
+    from form_schema import get_form_schema
+
+    return build_submission_docx(get_form_schema().record(form), signature_png, doc_path)
+
+
+def _build_submission_docx_python_docx(form, signature_png, doc_path):
+    # The original builder, kept only as the baseline for `python documents.py bench`
+    from docx import Document
+    from docx.shared import Inches
+
+    # Create a new Document
+    doc = Document()
+
+    # Add image
+    # Create a table with 1 row and 2 columns
+    table = doc.add_table(rows=1, cols=4)
+    table.allow_autofit = False
+
+    # Access the cells
+    left_cell = table.cell(0, 0)
+    right_cell = table.cell(0, 3)
+
+    # Add the image to the right cell
+    paragraph = right_cell.paragraphs[0]
+    run = paragraph.add_run()
+    run.add_picture(HEADER_IMAGE, width=Inches(1.5))  # Adjust the width as needed
+
+    # Add the heading to the left cell
+    left_cell.text = " "  # Empty text to leave room for formatting
+
+    # Main Heading
+    doc.add_heading('Enrolment Form Submission', 0)
+
+    doc.add_paragraph(f"Selected Support Option: {form['selected_option']}")
+
+    # Add Personal Information
+    doc.add_heading('Personal Information', level=1)
+    doc.add_paragraph(f"Full Name: {form.get('personal_info', 'Not Provided')}")
+    doc.add_paragraph(f"Date of Birth: {form.get('dob', 'Not Provided')}")
+    doc.add_paragraph(f"Gender: {form.get('gender', 'Not Provided')}")
+    doc.add_paragraph(f"Country of Residence: {form.get('country', 'Not Provided')}")
+    doc.add_paragraph(f"Nationality: {form.get('nationality', 'Not Provided')}")
+    doc.add_paragraph(f"Preferred Language of Communication: {form.get('preferred_language', 'Not Provided')}")
+
+    # Add Contact Information
+    doc.add_heading('Contact Information', level=1)
+    doc.add_paragraph(f"Email: {form['email']}")
+    doc.add_paragraph(f"Phone: {form['dialing_code']}{form['phone_number']}")
+
+    # Add Educational and Professional Background
+    doc.add_heading('Educational and Professional Background', level=1)
+    doc.add_paragraph(f"Current Institution: {form['current_institution']}")
+    if form['highest_education'] == "Other (please specify)":
+        doc.add_paragraph(f"Highest Level of Education: {form['highest_education']} - {form['other_education']}")
+    else:
+        doc.add_paragraph(f"Highest Level of Education: {form['highest_education']}")
+    doc.add_paragraph(f"Accredited Qualifications: {form['accredited_qualifications']}")
+    doc.add_paragraph(f"Years of Professional Industry Work Experience: {form['industry_experience']}")
+    doc.add_paragraph(f"Current Role or Profession: {form['current_role']}")
+
+    # Add Services and Courses Interested In
+    doc.add_heading('Services and Courses Interested In', level=1)
+    if form.get('selected_course'):
+        for subject_area, details in form['selected_course'].items():
+            doc.add_heading(subject_area, level=2)
+            if subject_area == "CPD Courses":
+                doc.add_paragraph(f"Category: {details.get('category', 'Not Provided')}")
+                doc.add_paragraph(f"Courses: {', '.join(details.get('courses', []))}")
+                doc.add_paragraph(f"Learning Mode: {details.get('learning_mode_cpd', 'Not Provided')}")
+            elif subject_area == "International Career Advice and Navigation (ICAN)":
+                doc.add_paragraph(f"Career Goals: {details.get('career_goals', 'Not Provided')}")
+                doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_ican', 'Not Provided')}")
+            elif subject_area == "University Success (Admissions Support)":
+                doc.add_paragraph(f"Course Level: {details.get('course_level', 'Not Provided')}")
+                doc.add_paragraph(f"Learning Mode: {details.get('learning_mode', 'Not Provided')}")
+                doc.add_paragraph(f"Higher Education Goals: {details.get('higher_education_goals', 'Not Provided')}")
+                # Handle assistance needed and "Other" option
+                assistance_needed = details.get('assistance_needed', [])
+                assistance_other = details.get('assistance_other', '')
+                if assistance_needed:
+                    assistance_display = ', '.join(assistance_needed)
+                    if "Other (please specify)" in assistance_needed and assistance_other:
+                        assistance_display += f" (Other: {assistance_other})"
+                    doc.add_paragraph(f"Assistance Needed: {assistance_display}")
+                else:
+                    doc.add_paragraph("Assistance Needed: Not Provided")
+                doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_us', 'Not Provided')}")
+            elif subject_area == "Functional Skills Commerce (English & Math Training)":
+                doc.add_paragraph(f"Current Role: {details.get('current_role', 'Not Provided')}")
+                doc.add_paragraph(f"Reason for Interest: {details.get('functional_reason_for_interest', 'Not Provided')}")
+            elif subject_area == "Teaching and Assessment Programme":
+                # Add Selected Vocational Sectors
+                selected_sectors = details.get('selected_vocational_sectors', [])
+                if selected_sectors:
+                    doc.add_paragraph("Selected Vocational Sectors:")
+                    for sector in selected_sectors:
+                        doc.add_paragraph(f"  - {sector}", style="List Bullet")
+                        # Add details for each sector
+                        sector_details = details.get('sector_details', {}).get(sector, 'Not Provided')
+                        doc.add_paragraph(f"    Details: {sector_details}")
+                # Add Work Aspirations
+                work_aspirations = details.get('work_aspirations', 'Not Provided')
+                doc.add_paragraph(f"Work Aspirations for a UK teacher recruitment agency: {work_aspirations}")
+                # Add Reason for Interest
+                doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_tap', 'Not Provided')}")
+            elif subject_area == "International Accredited Courses":
+                doc.add_paragraph(f"Sector Accreditation: {details.get('sector_accreditation', 'Not Provided')}")
+                doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_accreditation', 'Not Provided')}")
+            elif subject_area == "Summer International Internship Programme":
+                doc.add_paragraph(f"Internship Package: {details.get('internship_package', 'Not Provided')}")
+                doc.add_paragraph(f"Cohort Date: {details.get('cohort_date', 'Not Provided')}")
+                doc.add_paragraph(f"Reason for Interest: {details.get('reason_for_interest_siip', 'Not Provided')}")
+            elif subject_area == "IELTS":
+                doc.add_paragraph(f"IELTS Reason: {details.get('ielts_reason', 'Not Provided')}")
+            elif subject_area == "Business Incubation Services":
+                doc.add_paragraph(f"Business Services: {', '.join(details.get('business_services', []))}")
+    else:
+        doc.add_paragraph("Courses Interested In: None")
+
+    # Add Additional Information
+    doc.add_heading('Additional Information', level=1)
+    doc.add_paragraph(f"Preferred Start Date/Timeline for Participation: {form['preferred_start_date']}")
+    doc.add_paragraph(f"Special Requirements: {form['special_requirements']}")
+    # Add Digital Media Consent to the document
+    digital_media_consent_status = "Yes, consent provided." if form['digital_media_consent'] else "No, consent not provided."
+    doc.add_paragraph(f"Digital Media Consent: {digital_media_consent_status}")
+
+    # Add Signature
+    doc.add_heading('Signature', level=1)
+    if signature_png is not None:
+        doc.add_picture(io.BytesIO(signature_png), width=Inches(2), height=Inches(1))
+
+    # Save the document
+    doc.save(doc_path)
+    return doc_path
+
+
+def benchmark(form, signature_png, rounds=50):
+    # Time and peak allocations per render for both builders, rendering to memory
+    results = {}
+    for name, build in (("python-docx builder", _build_submission_docx_python_docx),
+                        ("template engine", _build_sample_docx)):
+        build(form, signature_png, io.BytesIO())  # warm up imports and the template
+        started = time.perf_counter()
+        for _ in range(rounds):
+            build(form, signature_png, io.BytesIO())
+        elapsed = (time.perf_counter() - started) / rounds
+
+        tracemalloc.start()
+        build(form, signature_png, io.BytesIO())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = (elapsed, peak)
+    return results
+
+
+SAMPLE_FORM = {
+    "selected_option": "Self", "personal_info": "Sample Learner", "dob": "01-01-2000", "gender": "Female",
+    "country": "United Kingdom", "nationality": "British", "preferred_language": "English",
+    "email": "learner@example.com", "dialing_code": "+44", "phone_number": "7700900123",
+    "current_institution": "none", "highest_education": "Master's Degree", "other_education": "",
+    "accredited_qualifications": "", "industry_experience": "3–5 years", "current_role": "Engineer",
+    "selected_course": {
+        "University Success (Admissions Support)": {
+            "course_level": "Postgraduate", "learning_mode": "Online", "higher_education_goals": "UK, MSc",
+            "assistance_needed": ["IELTS preparation", "Other (please specify)"], "assistance_other": "Visa",
+            "reason_for_interest_us": "Securing admissions abroad",
+        },
+        "Teaching and Assessment Programme": {
+            "selected_vocational_sectors": ["Digital & IT", "Education & Training"],
+            "sector_details": {"Digital & IT": "5 years", "Education & Training": "2 years"},
+            "work_aspirations": "Yes", "reason_for_interest_tap": "To enhance teaching skills and pedagogy.",
+        },
+        "CPD Courses": {"category": "Health and Safety", "courses": ["Fire Safety", "First Aid"], "learning_mode_cpd": "Online"},
+        "IELTS": {"ielts_reason": "Immigration"},
+    },
+    "preferred_start_date": "ASAP", "special_requirements": "none", "digital_media_consent": True,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Submission DOCX template tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build-template", help=f"write {os.path.relpath(TEMPLATE_FILE, APP_DIR)}")
+    bench = subparsers.add_parser("bench", help="compare the template engine with the python-docx builder")
+    bench.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.command == "build-template":
+        build_template(TEMPLATE_FILE)
+        print(f"Wrote {TEMPLATE_FILE}")
+    elif args.command == "bench":
+        from PIL import Image
+
+        signature = io.BytesIO()
+        Image.new("L", (600, 150), 255).save(signature, format="PNG")
+        for name, (elapsed, peak) in benchmark(SAMPLE_FORM, signature.getvalue(), args.rounds).items():
+            print(f"{name:<22}{elapsed * 1000:8.1f} ms/render{peak / 1024:10.0f} KiB peak")
@@ -0,0 +1,187 @@
+"""Email address check for step 6.
+
+`is_valid_email` accepts the same addresses as the regex the form used before
+(kept below as LEGACY_EMAIL_PATTERN for comparison), with length caps on top:
+at most 254 characters in all (RFC 5321), 64 before the "@" and 63 per domain
+label. The length is checked before anything else, and the rest is one pass
+over the characters, so the cost of a check is bounded whatever is typed or
+pasted into the field.
+
+    python email_address.py fuzz             # compare with the old regex on random input
+    python email_address.py bench            # worst-case latency on long pathological input
+    python email_address.py bench --lengths 1000 1000000
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+MAX_LENGTH = 254
+MAX_LOCAL_LENGTH = 64
+MAX_LABEL_LENGTH = 63
+
+LETTERS = frozenset(string.ascii_letters)
+DIGITS = frozenset(string.digits)
+LOCAL_SPECIALS = frozenset("._%+-")
+DOMAIN_SPECIALS = frozenset(".-")
+LOCAL_CHARS = LETTERS | DIGITS | LOCAL_SPECIALS
+DOMAIN_CHARS = LETTERS | DIGITS | DOMAIN_SPECIALS
+
+# What the form used before; only used by the fuzz and bench commands
+LEGACY_EMAIL_PATTERN = re.compile(r'''
+    ^                         # Start of string
+    (?!.*[._%+-]{2})          # No consecutive special characters
+    [a-zA-Z0-9._%+-]{1,64}    # Local part: allowed characters and length limit
+    (?<![._%+-])              # No special characters at the end of local part
+    @                         # "@" symbol
+    [a-zA-Z0-9.-]+            # Domain part: allowed characters
+    (?<![.-])                 # No special characters at the end of domain
+    \.[a-zA-Z]{2,}$           # Top-level domain with minimum 2 characters
+''', re.VERBOSE)
+
+
+def legacy_is_valid_email(email):
+    return LEGACY_EMAIL_PATTERN.match(email) is not None
+
+
+def is_valid_email(email):
+    if not 0 < len(email) <= MAX_LENGTH:
+        return False
+    at = email.find("@")
+    if not 0 < at <= MAX_LOCAL_LENGTH:
+        return False
+
+    # Local part: allowed characters, no two specials in a row, none at the end
+    previous_special = False
+    for ch in email[:at]:
+        if ch not in LOCAL_CHARS:
+            return False
+        is_special = ch in LOCAL_SPECIALS
+        if is_special and previous_special:
+            return False
+        previous_special = is_special
+    if previous_special:
+        return False
+
+    # Domain: allowed characters (so no second "@"), no two specials in a row,
+    # labels of at most 63 characters, and a last label of 2+ letters after
+    # at least one character
+    domain = email[at + 1:]
+    previous_special = False
+    label_length = 0
+    last_dot = -1
+    tld_letters = True
+    for index, ch in enumerate(domain):
+        if ch not in DOMAIN_CHARS:
+            return False
+        is_special = ch in DOMAIN_SPECIALS
+        if is_special and previous_special:
+            return False
+        previous_special = is_special
+        if ch == ".":
+            last_dot, label_length, tld_letters = index, 0, True
+        else:
+            label_length += 1
+            if label_length > MAX_LABEL_LENGTH:
+                return False
+            if ch not in LETTERS:
+                tld_letters = False
+    return last_dot > 0 and tld_letters and len(domain) - last_dot > 2
+
+
+# --- fuzz and benchmark ------------------------------------------------------------
+
+FUZZ_ALPHABET = "aZ9._%+-@!"
+
+
+def _mutate(rng, email):
+    # Insert, delete or replace one character
+    position = rng.randint(0, len(email))
+    ch = rng.choice(FUZZ_ALPHABET)
+    kind = rng.randint(0, 2)
+    if kind == 0:
+        return email[:position] + ch + email[position:]
+    if kind == 1:
+        return email[:position] + email[position + 1:]
+    return email[:position] + ch + email[position + 1:]
+
+
+def fuzz(cases, seed=1):
+    # Inputs on which the scanner and the old regex disagree. Inputs stay short
+    # enough that the new length caps never apply.
+    rng = random.Random(seed)
+    seeds = ["jane.doe@example.co.uk", "a@b.cd", "first+tag@sub-domain.example.org", "x_y%z@a1.io"]
+    mismatches = []
+    for number in range(cases):
+        if number % 2:
+            email = "".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 20)))
+        else:
+            email = rng.choice(seeds)
+            for _ in range(rng.randint(0, 3)):
+                email = _mutate(rng, email)
+        if is_valid_email(email) != legacy_is_valid_email(email):
+            mismatches.append(email)
+    return mismatches
+
+
+def pathological_inputs(length):
+    # (name, input): long strings that make a check scan, or backtrack, as far as it can
+    return [
+        ("no @", "a" * length),
+        ("many @", "@" * length),
+        ("long domain, no dot", "a@" + "a" * length),
+        ("dotted domain, bad TLD", "a@" + "ab." * (length // 3) + "a1"),
+        ("alternating specials", "a" + "a+" * (length // 2) + "@b.cd"),
+        ("long valid-looking", "a" * 64 + "@" + "b" * length + ".com"),
+    ]
+
+
+def worst_case(check, email, rounds):
+    # Slowest of `rounds` calls, in seconds
+    worst = 0.0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        check(email)
+        worst = max(worst, time.perf_counter() - started)
+    return worst
+
+
+def benchmark(lengths, rounds=20):
+    # {length: [(input name, old regex seconds, scanner seconds)]}, plus the
+    # scanner's worst case on inputs right at the length cap
+    results = {}
+    for length in lengths:
+        results[length] = [(name, worst_case(legacy_is_valid_email, email, rounds),
+                            worst_case(is_valid_email, email, rounds))
+                           for name, email in pathological_inputs(length)]
+    at_cap = max(worst_case(is_valid_email, email[:MAX_LENGTH], rounds * 10)
+                 for _, email in pathological_inputs(MAX_LENGTH * 2))
+    return results, at_cap
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Email address check tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    fuzz_parser = subparsers.add_parser("fuzz", help="compare with the old regex on random input")
+    fuzz_parser.add_argument("--cases", type=int, default=200000)
+    fuzz_parser.add_argument("--seed", type=int, default=1)
+    bench = subparsers.add_parser("bench", help="worst-case latency on long pathological input")
+    bench.add_argument("--lengths", type=int, nargs="*", default=[1000, 10000, 100000, 1000000])
+    bench.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "fuzz":
+        mismatches = fuzz(args.cases, args.seed)
+        print(f"{args.cases} inputs, {len(mismatches)} disagreements with the old regex")
+        for email in mismatches[:20]:
+            print(f"  {email!r}: scanner {is_valid_email(email)}, old regex {legacy_is_valid_email(email)}")
+        raise SystemExit(1 if mismatches else 0)
+
+    if args.command == "bench":
+        results, at_cap = benchmark(args.lengths, args.rounds)
+        for length, rows in results.items():
+            print(f"{length} characters (worst of {args.rounds})")
+            for name, old, new in rows:
+                print(f"  {name:<28}old regex {old * 1000:10.3f} ms   scanner {new * 1000:8.4f} ms")
+        print(f"scanner, worst case at the {MAX_LENGTH}-character cap: {at_cap * 1000:.4f} ms")
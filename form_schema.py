@@ -0,0 +1,636 @@
+"""Declarative description of the enrolment form in app_v2.py.
+
+Every question is a Field: which widget draws it, its options, whether it is
+required, the warning shown when it is missing and how it is labelled in the
+summary (the step-13 review and the DOCX). Fields are grouped into STEPS, the
+step-8 services into SERVICES, and SUMMARY lists what the review and the DOCX
+show, in order.
+
+`get_form_schema()` compiles all of it once per process (and per catalog,
+since some option lists come from it) into lookup tables: options and
+option -> index maps per field, default values, and the set of widget keys.
+app_v2.py draws widgets, validates and renders the review from the compiled
+schema; documents.py builds the DOCX from the same summary. Adding a service
+is a matter of adding one Service below.
+"""
+import threading
+from datetime import date
+
+from email_address import is_valid_email
+
+SELECT = "Select"  # first option of most dropdowns, meaning "not answered"
+OTHER = "Other (please specify)"
+
+
+class Field:
+    # widget: "select", "radio", "multiselect", "text", "textarea",
+    # "checkbox", "date" or "course_search" (search the CPD courses and tick
+    # them; the value is a set of course IDs).
+    # options: a tuple, or the name of a Catalog attribute.
+    # summary: the label in the review/DOCX (None: not shown there).
+    # name: the key in selected_course for service fields (default: key).
+    # show_if: (key, option) - only asked when that field has that option.
+    # per_option: a Field asked once per selected option (key/labels use {option}).
+    def __init__(self, key, label, widget="text", options=None, required=True, missing=None,
+                 summary=None, name=None, default=None, placeholder=None, show_if=None,
+                 validator=None, summary_value=None, per_option=None,
+                 heading=None, help=None, min_value=None, min_age=None):
+        self.key = key
+        self.label = label
+        self.widget = widget
+        self.options = options
+        self.required = required
+        self.missing = missing
+        self.summary = summary
+        self.name = name or key
+        self.default = default
+        self.placeholder = placeholder
+        self.show_if = show_if
+        self.validator = validator
+        self.summary_value = summary_value
+        self.per_option = per_option
+        self.heading = heading
+        self.help = help
+        self.min_value = min_value
+        self.min_age = min_age
+
+
+class Note:
+    # Text between the fields of a step: kind is an st.* function name
+    def __init__(self, kind, text):
+        self.kind = kind
+        self.text = text
+
+
+class Step:
+    # items: Fields and Notes in display order. missing: one warning used
+    # whenever any required field is empty (otherwise the field's own).
+    def __init__(self, number, title, items, next_step, back_step, missing=None, in_form=False):
+        self.number = number
+        self.title = title
+        self.items = items
+        self.next_step = next_step
+        self.back_step = back_step
+        self.missing = missing
+        self.in_form = in_form
+
+    @property
+    def fields(self):
+        return [item for item in self.items if isinstance(item, Field)]
+
+
+class Service:
+    def __init__(self, name, fields, heading=None, intro=None, outro=None):
+        self.name = name
+        self.fields = fields
+        self.heading = heading or name
+        self.intro = intro
+        self.outro = outro
+
+
+class Section:
+    # keys: top-level fields shown, or SERVICES_SECTION for the services
+    def __init__(self, title, review_title, keys):
+        self.title = title
+        self.review_title = review_title
+        self.keys = keys
+
+
+SERVICES_SECTION = "services"
+
+
+# --- validators ------------------------------------------------------------------
+# Each takes (value, values, catalog) and returns a warning or None.
+
+def check_email(value, values, catalog):
+    if not is_valid_email(value):
+        return "Please enter a valid email address."
+    return None
+
+
+def check_phone_number(value, values, catalog):
+    # Against the dialing code shown next to the number (see phone_numbers.py)
+    is_valid, message = catalog.phone_index.validate(value, values.get("dialing_code"))
+    return None if is_valid else message
+
+
+# --- summary formatting ----------------------------------------------------------
+
+def _phone(form):
+    return f"{form['dialing_code']}{form['phone_number']}"
+
+
+def _highest_education(form):
+    if form['highest_education'] == OTHER:
+        return f"{form['highest_education']} - {form['other_education']}"
+    return form['highest_education']
+
+
+def _digital_media_consent(form):
+    return "Yes, consent provided." if form['digital_media_consent'] else "No, consent not provided."
+
+
+def _courses(details):
+    # Titles are stored next to the IDs when the step is checked
+    return ', '.join(details.get('courses', []))
+
+
+def _assistance_needed(details):
+    assistance_needed = details.get('assistance_needed', [])
+    assistance_other = details.get('assistance_other', '')
+    if not assistance_needed:
+        return "Not Provided"
+    assistance_display = ', '.join(assistance_needed)
+    if OTHER in assistance_needed and assistance_other:
+        assistance_display += f" (Other: {assistance_other})"
+    return assistance_display
+
+
+# --- the form ----------------------------------------------------------------------
+
+SUPPORT_OPTIONS = (
+    "    ", "Self", "M.I. Rushan", "Jaad Javed", "Shaad Javed", "Mohamed Sathath", "Aakifah Asger", "Navin Yogarasu",
+    "Rochelle Ravishankar", "Dhilshan Abdul Rahman", "Pasindu Chamodya Nanayakkara", "Dinith Ferdinando",
+)
+
+PRIVACY_POLICY_LINK = 'https://drive.google.com/file/d/1sgF6eHZ57idELDEkQD8ZQ7p8VPrmy3WC/view?ts=6789943b'
+MEDIA_CONSENT_LINK = 'https://drive.google.com/file/d/1SrHyvp_PHM7OhHyQvE-JJRPCUvloTV0z/view?ts=67899187'
+
+STEPS = [
+    Step(2, None, [
+        Field("selected_option", "Who is supporting you to fill this form?", "select", SUPPORT_OPTIONS,
+              missing="Please select SUPPORTING option before proceeding.", summary="Selected Support Option"),
+        Note("title", "> 1: Personal Information"),
+        Field("personal_info", "Please enter your full name as it appears on your official documents.",
+              missing="Please enter your full name before proceeding.", summary="Full Name"),
+    ], next_step=3, back_step=1),
+    Step(3, "> 2: Date of Birth", [
+        Field("dob", "Date of Birth", "date", help="Choose a date", min_value=date(1900, 1, 1), min_age=14,
+              missing="Please select your date of birth before proceeding.", summary="Date of Birth"),
+    ], next_step=4, back_step=2),
+    Step(4, "> 3: Gender", [
+        Field("gender", "Please select your gender.", "select", (SELECT, "Male", "Female", "Other"),
+              missing="Please select your gender before proceeding.", summary="Gender"),
+    ], next_step=5, back_step=3),
+    Step(5, "> 4: Country of Residence, Nationality, and Preferred Language", [
+        Field("country", "Please select your country of residence:", "select", "country_names",
+              summary="Country of Residence"),
+        Field("nationality", "Please select your nationality:", "select", "nationality_options",
+              summary="Nationality"),
+        Field("preferred_language", "Preferred Language of Communication: (OPTIONAL)", required=False,
+              placeholder="Enter your preferred language (e.g., English, Urdu)",
+              summary="Preferred Language of Communication"),
+    ], next_step=6, back_step=4, in_form=True,
+        missing="Please complete all fields (Country, Nationality, and Preferred Language) before proceeding."),
+    # Step 6 has its own layout in app_v2.py (dialing country row + form)
+    Step(6, "> 5: Contact Information", [
+        Field("selected_country", "Country:", "select", "country_names", required=False),
+        Field("phone_number", "Phone Number:", placeholder="Enter your contact number",
+              validator=check_phone_number, summary="Phone", summary_value=_phone),
+        Field("email", "Please enter your email address where we can reach you.",
+              validator=check_email, summary="Email"),
+    ], next_step=7, back_step=5, in_form=True,
+        missing="Please fill out all the contact information fields before proceeding."),
+    Step(7, "> 6: Educational and Professional Background", [
+        Field("current_institution",
+              "Please enter the name of your current educational institution (if applicable, else put 'none'):",
+              summary="Current Institution"),
+        Field("highest_education", "Highest Level of Education:", "select",
+              (SELECT, "High School Diploma", "Bachelor's Degree", "Master's Degree", "Doctorate", OTHER),
+              summary="Highest Level of Education", summary_value=_highest_education),
+        # Always shown: inside the form it cannot appear when Other is picked
+        Field("other_education", "If Other, please specify your highest level of education:",
+              show_if=("highest_education", OTHER)),
+        Field("accredited_qualifications",
+              "Accredited Qualifications (please specify the sector, if applicable) (OPTIONAL):",
+              required=False, summary="Accredited Qualifications"),
+        Field("industry_experience", "Years of Professional Industry Work Experience:", "select",
+              (SELECT, "Less than 1 year", "1–2 years", "3–5 years", "More than 5 years"),
+              summary="Years of Professional Industry Work Experience"),
+        Field("current_role", "Current Role or Profession: (Indicate N/A if not working)",
+              summary="Current Role or Profession"),
+    ], next_step=8, back_step=6, in_form=True, missing="Please complete all fields before proceeding."),
+    Step(8, "> 7: Select Services", [
+        Field("subject_areas", "Please select the subject area(s):", "multiselect", "sorted_subject_areas",
+              missing="Please select at least one subject area before proceeding."),
+    ], next_step=11, back_step=7),
+    Step(11, "> 10: Additional Information", [
+        Field("preferred_start_date", "Preferred Start Date/Timeline for Participation:", "select",
+              (SELECT, "ASAP", "1 to 2 months", "2 to 4 months", "6 months +"),
+              summary="Preferred Start Date/Timeline for Participation"),
+        Field("special_requirements",
+              "Please let us know if you have any special requirements. (if applicable, else put 'none')",
+              "textarea", summary="Special Requirements"),
+        Note("write", f"[Privacy Policy]({PRIVACY_POLICY_LINK})"),
+        Field("consent",
+              "I consent to the collection and processing of my personal data according to AspireCraft’s privacy policy.",
+              "checkbox"),
+        Note("write", f"[Media Release Consent (M) document]({MEDIA_CONSENT_LINK})"),
+        Field("digital_media_consent",
+              "I consent to AspireCraft using my photos, videos, or digital media for promotional and educational purposes.",
+              "checkbox", required=False, default=True, summary="Digital Media Consent",
+              summary_value=_digital_media_consent),
+    ], next_step=12, back_step=8, in_form=True, missing="Please complete all fields and consent before proceeding."),
+]
+
+# The sub-options for each subject area, like Foundation, Undergraduate, etc.
+SUB_OPTIONS = ("Foundation", "Undergraduate", "Pre-Masters", "Postgraduate", "PhD & Research", "Professional development")
+
+# Learning modes (these are hypothetical, but you can adjust them to your case)
+LEARNING_MODES = ("Online", "Blended", "On-Campus")
+
+SERVICES = [
+    Service("University Success (Admissions Support)", [
+        Field("sub_option", "Please select your course level.", "select", (SELECT,) + SUB_OPTIONS,
+              missing="Please select the course level before proceeding.", summary="Course Level", name="course_level"),
+        Field("learning_mode", "Please select the learning mode.", "select", (SELECT,) + LEARNING_MODES,
+              missing="Please select the learning mode before proceeding.", summary="Learning Mode"),
+        Field("higher_education_goals", "Higher Education Goals: Specify target countries, universities, or courses.",
+              "textarea", missing="Please specify your higher education goals before proceeding.",
+              summary="Higher Education Goals"),
+        Field("assistance_needed", "Assistance Needed: Select areas of support.", "multiselect",
+              ("Portfolio development", "IELTS preparation", "Application documentation", "Scholarship assistance", OTHER),
+              missing="Please select at least one area of assistance before proceeding.",
+              summary="Assistance Needed", summary_value=_assistance_needed),
+        Field("assistance_other", "Please specify the additional assistance needed:", show_if=("assistance_needed", OTHER),
+              missing="Please specify the additional assistance needed for 'Other'."),
+        Field("reason_for_interest_us", "Reason for Interest:", "select",
+              (SELECT, "Simplifying university applications", "Securing admissions abroad",
+               "Personalized guidance for successful placement"),
+              missing="Please select your reason for interest before proceeding.", summary="Reason for Interest"),
+    ]),
+    Service("International Career Advice and Navigation (ICAN)", [
+        Field("career_goals", "Career Goals: Outline your career aspirations and sectors of interest:", "textarea",
+              missing="Please outline your career goals before proceeding.", summary="Career Goals"),
+        Field("reason_for_interest_ican", "Reason for Interest:", "select",
+              (SELECT, "Career exploration and development", "CV building and job placement support",
+               "Personalized career diagnostics"),
+              missing="Please select your reason for interest before proceeding.", summary="Reason for Interest"),
+    ]),
+    Service("Functional Skills Commerce (English & Math Training)", [
+        Field("functional_current_role", "Please specify your position (e.g., migrant worker, business owner):",
+              missing="Please specify your current role before proceeding.", summary="Current Role", name="current_role"),
+        Field("functional_reason_for_interest", "Reason for Interest:", "select",
+              (SELECT, "To improve workplace communication and productivity.",
+               "To meet employer expectations for functional skills.", "To access better employment opportunities."),
+              missing="Please select a reason for interest before proceeding.", summary="Reason for Interest"),
+    ]),
+    Service("Teaching and Assessment Programme", [
+        Field("selected_vocational_sectors", "Please select your vocational sector(s):", "multiselect",
+              ("Health & Social Care", "Construction & Engineering", "Business & Administration", "Digital & IT",
+               "Education & Training", "Retail & Customer Service", "Hospitality & Tourism", "Creative Arts & Media",
+               OTHER),
+              missing="Please select at least one vocational sector.", summary="Selected Vocational Sectors",
+              per_option=Field("sector_details_{option}",
+                               "Specify your sector(s) with accredited qualifications and work experience for {option}:",
+                               "textarea", name="sector_details", heading="Details for {option}", summary="Details",
+                               missing="Please provide details for the selected sector: {option}."),
+              heading="### Details for Selected Sectors"),
+        Field("work_aspirations", "Are you interested in working for a UK teacher recruitment agency?", "select",
+              (SELECT, "Yes", "No"),
+              missing="Please indicate your interest in working for a UK teacher recruitment agency.",
+              summary="Work Aspirations for a UK teacher recruitment agency"),
+        Field("reason_for_interest_tap", "Please select your reason for interest:", "radio",
+              ("To gain qualifications as an accredited educator.", "To enhance teaching skills and pedagogy.",
+               "To achieve UK tutor certification and recognition.",
+               "To deliver affordable, high-quality education globally."),
+              missing="Please select a reason for interest.", summary="Reason for Interest"),
+    ], heading="Teacher & Assessment Training", intro="""
+                    Please select your professional vocational sector where you have:
+                    - An accredited qualification.
+                    - More than 2 years of professional industry work experience.
+                    """),
+    Service("International Accredited Courses", [
+        Field("sector_accreditation", "Which sector do you wish to achieve accreditation?", "select",
+              (SELECT, "Health, public services and care", "Construction, planning and the built environment",
+               "Information and communication technology", "Arts, media and publishing", "Education and training",
+               "Preparation for Life and Work", "Business, administration and law", "Digital Transformation",
+               "Sustainability"),
+              missing="Please select a sector before proceeding.", summary="Sector Accreditation"),
+        Field("reason_for_interest_accreditation", "Reason for Interest:", "select",
+              (SELECT, "To advance your career with globally recognized qualifications.",
+               "To meet employer requirements for niche skills.", "To gain expertise in emerging markets."),
+              missing="Please select a reason for your interest before proceeding.", summary="Reason for Interest"),
+    ]),
+    Service("Summer International Internship Programme", [
+        Field("internship_package", "Which package you are interested in? (Basic or Premium)", "select",
+              (SELECT, "Basic", "Premium"),
+              missing="Please select a package (Basic or Premium) before proceeding.", summary="Internship Package"),
+        Field("cohort_date", "Which cohort date would you like to be part of?", "select",
+              (SELECT, "15th July 2025", "29th July 2025", "12th August 2025", "26th August 2025"),
+              missing="Please select a cohort date before proceeding.", summary="Cohort Date"),
+        Field("reason_for_interest_siip", "Please select your reason for interest:", "select",
+              (SELECT, "To gain hands-on work experience in UK hospitals or allied sectors.",
+               "To enhance employability with practical international exposure.",
+               "To participate in cultural and professional development activities."),
+              missing="Please select a reason for interest before proceeding.", summary="Reason for Interest"),
+    ], outro="""
+### Basic Package (Included for All Students):
+- **2 weeks work experience** in teaching hospitals across England.
+- **Accredited UK medical CPD or certification courses** (e.g., ACLS, BLS).
+- CPD training on patient communication and NHS protocols.
+- Accommodation in university dorms near teaching hospitals.
+- Guided London tours to iconic landmarks (e.g., Big Ben, Buckingham Palace).
+
+### Premium Package (Optional Upgrade):
+- All Basic Package features.
+- **Private, upscale accommodation.**
+- Entertainment: Theme parks, cultural shows, or private river cruises.
+- **Career mentorship** with UK medical professionals.
+- Exclusive tours to elite medical facilities (e.g., Royal Society of Medicine).
+- Concierge services: Airport pickups, personalized itineraries, and meal customization.
+"""),
+    Service("IELTS", [
+        Field("ielts_reason", "Please select your primary reason for taking the IELTS exam:", "select",
+              (SELECT,
+               "Higher Education Abroad: Admission to universities or colleges in English-speaking countries.",
+               "Immigration: Meeting language requirements for migration to countries like the UK, Canada, or Australia.",
+               "Professional Registration: Certification for professions such as nursing, engineering, or accounting.",
+               "Employment: Enhancing job prospects in international or English-speaking environments.",
+               "Personal Development: Assessing and improving English language proficiency for personal growth."),
+              missing="Please select your reason for taking the IELTS exam before proceeding.", summary="IELTS Reason"),
+    ], outro="_Note: Understanding your motivation helps tailor your preparation effectively._"),
+    Service("CPD Courses", [
+        Field("category", "Please select the course category.", "select", "category_options", required=False,
+              summary="Category"),
+        Field("course_ids", "Search courses by title or category:", "course_search", default=set(),
+              placeholder="e.g. fire safety", missing="Please select your courses before proceeding.",
+              summary="Courses", summary_value=_courses),
+        Field("learning_mode_cpd", "Please select your preferred mode of learning.", "select", LEARNING_MODES,
+              summary="Learning Mode"),
+    ]),
+    Service("Business Incubation Services", [
+        Field("business_services", "Please select the services you are interested in:", "multiselect",
+              ("MVP Testing: Minimal Viable Product testing and validation.",
+               "Business Plan Review: Expert feedback on your business plan.",
+               "Market Gap Analysis: Identifying opportunities in your target market.",
+               "Workforce Development: Training and support for building your team.",
+               "Growth Management: Strategies for scaling and managing business growth."),
+              missing="Please select at least one service to proceed.", summary="Business Services"),
+    ]),
+]
+
+SUMMARY = [
+    Section(None, None, ["selected_option"]),
+    Section("Personal Information", "> Personal Information Review",
+            ["personal_info", "dob", "gender", "country", "nationality", "preferred_language"]),
+    Section("Contact Information", "> Contact Information", ["email", "phone_number"]),
+    Section("Educational and Professional Background", "> 6: Educational and Professional Background",
+            ["current_institution", "highest_education", "accredited_qualifications", "industry_experience",
+             "current_role"]),
+    Section("Services and Courses Interested In", "> 7: Select Services", SERVICES_SECTION),
+    Section("Additional Information", "> 10: Additional Information",
+            ["preferred_start_date", "special_requirements", "digital_media_consent"]),
+]
+
+# Keys of the submitted record (besides "dob", which is formatted, and
+# "selected_course", which holds the service answers)
+RECORD_KEYS = [
+    field.key for step in STEPS for field in step.fields
+    if field.summary and field.key != "dob"
+] + ["dialing_code", "other_education", "selected_course"]
+
+
+# --- compiled schema -------------------------------------------------------------
+
+class FormSchema:
+    def __init__(self, catalog, steps=STEPS, services=SERVICES, summary=SUMMARY):
+        self.catalog = catalog
+        self.steps = {step.number: step for step in steps}
+        self.services = {service.name: service for service in services}
+        self.summary_sections = summary
+
+        self.fields = {}
+        self.options = {}
+        self.option_index = {}
+        self.defaults = {}
+        self.per_option_prefixes = []
+        all_fields = [field for step in steps for field in step.fields]
+        all_fields += [field for service in services for field in service.fields]
+        for field in all_fields:
+            self.fields[field.key] = field
+            if field.options is not None:
+                options = getattr(catalog, field.options) if isinstance(field.options, str) else tuple(field.options)
+                self.options[field.key] = options
+                self.option_index[field.key] = {option: index for index, option in enumerate(options)}
+            self.defaults[field.key] = self._default(field)
+            if field.per_option:
+                self.per_option_prefixes.append(field.per_option.key.split("{option}")[0])
+        self.per_option_prefixes = tuple(self.per_option_prefixes)
+        self.widget_keys = frozenset(self.fields)
+
+    def _default(self, field):
+        if field.default is not None:
+            return field.default
+        if field.widget in ("select", "radio"):
+            return self.options[field.key][0]
+        if field.widget == "multiselect":
+            return []
+        if field.widget == "checkbox":
+            return False
+        if field.widget == "date":
+            return None
+        return ""
+
+    def is_widget_key(self, key):
+        return key in self.widget_keys or key.startswith(self.per_option_prefixes)
+
+    def blank(self, field):
+        # The option that means "not answered", if the field has one
+        options = self.options.get(field.key)
+        if options and options[0] in (SELECT, "    "):
+            return options[0]
+        return None
+
+    def default_for(self, key):
+        # Starting value of a widget key, including per-option keys
+        if key in self.defaults:
+            value = self.defaults[key]
+            return type(value)(value) if isinstance(value, (list, set)) else value
+        return ""
+
+    def sanitize(self, values):
+        # Put back the default for choices that are no longer offered (e.g. the
+        # catalog changed), so a widget never gets a value outside its options
+        for key, index in self.option_index.items():
+            if key not in values:
+                continue
+            value = values[key]
+            if isinstance(value, list):
+                if any(option not in index for option in value):
+                    values[key] = [option for option in value if option in index]
+            elif value not in index:
+                values[key] = self.default_for(key)
+        # Courses that were removed from the catalog
+        for field in self.fields.values():
+            if field.widget == "course_search" and field.key in values:
+                known = self.catalog.course_index.positions
+                if any(course not in known for course in values[field.key]):
+                    values[field.key] = {course for course in values[field.key] if course in known}
+
+    def is_shown(self, field, values):
+        if not field.show_if:
+            return True
+        key, option = field.show_if
+        value = values.get(key)
+        return option in value if isinstance(value, list) else value == option
+
+    def is_missing(self, field, value):
+        if not field.required:
+            return False
+        if field.widget in ("text", "textarea"):
+            return not (value or "").strip()
+        if field.widget in ("select", "radio"):
+            return not value or value == self.blank(field)
+        return not value
+
+    # --- validation ----------------------------------------------------------
+
+    def check_step(self, number, values):
+        # The warning that keeps the learner on this step, as a list (empty when
+        # they can move on); like the original form, only the first problem is shown
+        step = self.steps[number]
+        for field in step.fields:
+            if self.is_shown(field, values) and self.is_missing(field, values.get(field.key)):
+                return [step.missing or field.missing]
+        for field in step.fields:
+            if field.validator:
+                message = field.validator(values.get(field.key), values, self.catalog)
+                if message:
+                    return [message]
+        return []
+
+    def check_services(self, values):
+        # (warnings, selected_course) for the chosen subject areas
+        warnings = self.check_step(8, values)
+        if warnings:
+            return warnings, {}
+        selected_course = {}
+        for area in values.get("subject_areas", []):
+            service = self.services.get(area)
+            if service is None:
+                continue
+            area_warnings = []
+            for field in service.fields:
+                if not self.is_shown(field, values):
+                    continue
+                value = values.get(field.key)
+                if self.is_missing(field, value):
+                    area_warnings.append(f"[{area}] {field.missing}")
+                elif field.per_option:
+                    for option in value:
+                        if not (values.get(field.per_option.key.format(option=option)) or "").strip():
+                            area_warnings.append(f"[{area}] {field.per_option.missing.format(option=option)}")
+                            break
+            warnings += area_warnings
+            if not area_warnings:
+                selected_course[area] = self.service_details(service, values)
+        return warnings, selected_course
+
+    def service_details(self, service, values):
+        # What selected_course keeps for one service
+        details = {}
+        for field in service.fields:
+            value = values.get(field.key) if self.is_shown(field, values) else self.default_for(field.key)
+            if field.widget == "course_search":
+                # IDs to identify the courses, titles for the review and the DOCX
+                details[field.name] = sorted(value)
+                details["courses"] = self.catalog.course_index.titles(value)
+                continue
+            if field.widget == "select" and value == SELECT:
+                value = None  # an optional dropdown left on its placeholder
+            details[field.name] = list(value) if isinstance(value, (list, tuple)) else value
+            if field.per_option:
+                details[field.per_option.name] = {
+                    option: (values.get(field.per_option.key.format(option=option)) or "").strip()
+                    for option in value
+                }
+        return details
+
+    # --- summary -------------------------------------------------------------
+
+    def record(self, form, digest=None):
+        # The normalized submission: the form snapshot plus its summary, all
+        # plain JSON, which is what the review, the DOCX, the emails and the
+        # outbox work from
+        return {
+            "digest": digest,
+            "form": form,
+            "summary": [list(entry) for entry in self.summary(form)],
+        }
+
+    def summary(self, form):
+        # The review/DOCX content as (kind, label, value) entries, in order.
+        # Kinds: section, field, services / no_services, service,
+        # unknown_service, service_field, options / no_options, option,
+        # option_detail
+        entries = []
+        for section in self.summary_sections:
+            if section.title:
+                entries.append(("section", section.title, section.review_title))
+            if section.keys == SERVICES_SECTION:
+                entries += self._services_summary(form.get("selected_course") or {})
+                continue
+            for key in section.keys:
+                field = self.fields[key]
+                if field.summary_value:
+                    value = field.summary_value(form)
+                else:
+                    value = form.get(key, 'Not Provided')
+                entries.append(("field", field.summary, value))
+        return entries
+
+    def _services_summary(self, selected_course):
+        if not selected_course:
+            return [("no_services", "Courses Interested In", "None")]
+        entries = [("services", "Courses Interested In", None)]
+        for area, details in selected_course.items():
+            entries.append(("service", area, None))
+            service = self.services.get(area)
+            if service is None:
+                entries.append(("unknown_service", None, "No specific fields defined for this subject area."))
+                continue
+            for field in service.fields:
+                if not field.summary:
+                    continue
+                if field.per_option:
+                    options = details.get(field.name, [])
+                    if not options:
+                        entries.append(("no_options", field.summary, "None"))
+                        continue
+                    entries.append(("options", field.summary, None))
+                    for option in options:
+                        entries.append(("option", None, option))
+                        detail = details.get(field.per_option.name, {}).get(option, 'Not Provided')
+                        entries.append(("option_detail", field.per_option.summary, detail))
+                    continue
+                if field.summary_value:
+                    value = field.summary_value(details)
+                elif field.widget == "multiselect":
+                    value = ', '.join(details.get(field.name, []))
+                else:
+                    value = details.get(field.name)
+                    if value in (None, "", SELECT):
+                        value = 'Not Provided'
+                entries.append(("service_field", field.summary, value))
+        return entries
+
+
+_schema_lock = threading.Lock()
+_schema = None  # (catalog, FormSchema)
+
+
+def get_form_schema(catalog=None):
+    # Compiled once per catalog: a new one is only built when the catalog is
+    # rebuilt because a resource file changed
+    global _schema
+    if catalog is None:
+        from catalog import get_catalog
+        catalog = get_catalog()
+    cached = _schema
+    if cached is not None and cached[0] is catalog:
+        return cached[1]
+    with _schema_lock:
+        if _schema is None or _schema[0] is not catalog:
+            _schema = (catalog, FormSchema(catalog))
+        return _schema[1]
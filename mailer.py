@@ -0,0 +1,262 @@
+"""Outgoing email for the enrolment forms.
+
+Messages go out over a small pool of authenticated SMTP connections that are
+kept open between messages and sessions, so a submission does not pay for a
+TCP connect, STARTTLS handshake and LOGIN per email. The server is configured
+with SMTP_HOST, SMTP_PORT, SMTP_STARTTLS and SMTP_POOL_SIZE (defaults: Gmail,
+587, on, 2; see settings.py), which also lets the pool be pointed at a local
+SMTP stand-in.
+
+Messages are never assembled in memory: the MIME parts are written straight
+to the SMTP DATA command, and each attachment is read from disk and base64
+encoded CHUNK_SIZE bytes at a time, so sending costs the same fixed buffer
+whatever the number and size of the attachments.
+"""
+import base64
+import contextlib
+import os
+import queue
+import threading
+import time
+import uuid
+
+from settings import get_settings
+
+CHUNK_SIZE = 57 * 1024  # bytes read per step: 1024 base64 lines of 76 characters
+
+
+class SMTPConnectionPool:
+    # Thread-safe pool of logged-in SMTP connections. At most `size`
+    # connections exist at once; a thread that needs one while all are in
+    # use waits for one to be returned.
+    def __init__(self, host, port, username=None, password=None, size=2, starttls=True,
+                 timeout=30, probe_after=5.0, max_idle=240.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.probe_after = probe_after  # NOOP-check connections idle for longer than this
+        self.max_idle = max_idle  # drop connections the server has probably timed out
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self):
+        import smtplib
+
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.starttls and server.has_extn('starttls'):
+                server.starttls()
+                server.ehlo()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            self._discard(server)
+            raise
+        return server
+
+    def _discard(self, server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _is_alive(self, server):
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self):
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.max_idle:
+                self._discard(server)
+            elif idle_for <= self.probe_after or self._is_alive(server):
+                return server
+            else:
+                server.close()
+
+    @contextlib.contextmanager
+    def connection(self):
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._checkout()
+            yield server
+        except Exception:
+            # Don't hand a connection in an unknown state (e.g. halfway
+            # through DATA) to the next sender
+            if server is not None:
+                server.close()
+                server = None
+            raise
+        finally:
+            if server is not None:
+                self._idle.put((server, time.monotonic()))
+            self._slots.release()
+
+    def send_message(self, msg):
+        import smtplib
+
+        # A pooled connection can still die between the probe and the send;
+        # retry once on a fresh one.
+        try:
+            with self.connection() as server:
+                server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            with self.connection() as server:
+                server.send_message(msg)
+
+    def send_stream(self, from_addr, to_addrs, chunks):
+        # Like send_message, for a message produced by `chunks()` as bytes
+        # with CRLF line ends; it is called again for the retry
+        import smtplib
+
+        try:
+            with self.connection() as server:
+                return _send_data(server, from_addr, to_addrs, chunks())
+        except smtplib.SMTPServerDisconnected:
+            with self.connection() as server:
+                return _send_data(server, from_addr, to_addrs, chunks())
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(username, password, host=None, port=None, size=None, starttls=None):
+    settings = get_settings()
+    host = host or settings.smtp_host
+    port = port or settings.smtp_port
+    key = (host, port, username)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.password != password:
+            if pool is not None:
+                pool.close()
+            pool = SMTPConnectionPool(
+                host, port, username, password,
+                size=size or settings.smtp_pool_size,
+                starttls=settings.smtp_starttls if starttls is None else starttls,
+            )
+            _pools[key] = pool
+        return pool
+
+
+def _send_data(server, from_addr, to_addrs, chunks):
+    # MAIL, RCPT and DATA by hand (what SMTP.sendmail does), with the message
+    # written to the socket chunk by chunk instead of passed as one string
+    import smtplib
+
+    code, reply = server.mail(from_addr)
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPSenderRefused(code, reply, from_addr)
+    refused = {}
+    for address in to_addrs:
+        code, reply = server.rcpt(address)
+        if code not in (250, 251):
+            refused[address] = (code, reply)
+    if len(refused) == len(to_addrs):
+        server.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    server.putcmd("data")
+    code, reply = server.getreply()
+    if code != 354:
+        server.rset()
+        raise smtplib.SMTPDataError(code, reply)
+    at_line_start = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # Lines starting with "." get a second one (RFC 5321 4.5.2)
+        chunk = chunk.replace(b"\n.", b"\n..")
+        if at_line_start and chunk.startswith(b"."):
+            chunk = b"." + chunk
+        server.send(chunk)
+        at_line_start = chunk.endswith(b"\n")
+    server.send(b".\r\n" if at_line_start else b"\r\n.\r\n")
+    code, reply = server.getreply()
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPDataError(code, reply)
+    return refused
+
+
+def _headers(part):
+    # The header block of `part`, folded (and RFC 2047/2231 encoded) for the wire
+    from email.policy import SMTP
+
+    return b"".join(SMTP.fold_binary(name, value) for name, value in part.items()) + b"\r\n"
+
+
+def _open_attachment(source):
+    # A path, or a file object already open (e.g. an UploadedFile)
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb")
+    source.seek(0)
+    return contextlib.nullcontext(source)
+
+
+def mime_chunks(sender_email, receiver_email, subject, body, attachments=()):
+    # The message as CRLF byte chunks: headers, the HTML body, then each
+    # (source, file name) attachment base64-encoded CHUNK_SIZE bytes at a time
+    from email.message import EmailMessage, MIMEPart
+    from email.policy import SMTP
+
+    boundary = "===============" + uuid.uuid4().hex
+    headers = EmailMessage(policy=SMTP)
+    headers['From'] = sender_email
+    headers['To'] = ", ".join(receiver_email)
+    headers['Subject'] = subject
+    headers['MIME-Version'] = "1.0"
+    headers['Content-Type'] = f'multipart/mixed; boundary="{boundary}"'
+    yield _headers(headers)
+
+    text = MIMEPart(policy=SMTP)
+    text.set_content(body, subtype='html')
+    yield f"--{boundary}\r\n".encode("ascii") + text.as_bytes()
+
+    for source, file_name in attachments:
+        part = MIMEPart(policy=SMTP)
+        part['Content-Type'] = "application/octet-stream"
+        part['Content-Transfer-Encoding'] = "base64"
+        part.add_header('Content-Disposition', 'attachment', filename=file_name)
+        yield f"\r\n--{boundary}\r\n".encode("ascii") + _headers(part)
+        with _open_attachment(source) as f:
+            for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+                yield base64.encodebytes(data).replace(b"\n", b"\r\n")
+    yield f"\r\n--{boundary}--\r\n".encode("ascii")
+
+
+# Function to send email with attachments (Handle Local + Uploaded).
+# `files` are file objects with a .name (e.g. UploadedFile) or (path, file name) pairs.
+def send_email_with_attachments(sender_email, sender_password, receiver_email, subject, body, files=None, local_file_path=None):
+    attachments = []
+    for file in files or []:
+        attachments.append(file if isinstance(file, tuple) else (file, file.name))
+    if local_file_path:
+        attachments.append((local_file_path, os.path.basename(local_file_path)))
+
+    # Reuse a logged-in connection to the configured server (Gmail by default)
+    get_smtp_pool(sender_email, sender_password).send_stream(
+        sender_email, receiver_email,
+        lambda: mime_chunks(sender_email, receiver_email, subject, body, attachments),
+    )
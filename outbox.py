@@ -0,0 +1,420 @@
+"""Durable local outbox for work that must not run on the Streamlit script thread.
+
+Jobs are rows in a SQLite database. A small pool of worker threads claims due
+jobs, runs the handler registered for their kind and either marks them done,
+schedules a retry with exponential backoff, or moves them to the dead-letter
+state once they have used up their attempts. Because every job is committed
+before `enqueue` returns, a crash or restart never loses a submission: pending
+jobs are picked up again on the next start, and jobs that were running when the
+process died are retried once their lease expires. A worker renews the lease
+while its handler runs, and only records the result of a job it still holds.
+
+Done jobs and the spool files nothing needs any more are deleted after
+`retention_days` (by an idle worker, every few hours, or with `prune`); dead
+letters are kept, with their files, until they are requeued.
+
+    python outbox.py stats           # queue depth and age per state
+    python outbox.py dead            # list dead-lettered jobs
+    python outbox.py requeue [ID]    # move dead-lettered jobs back to pending
+    python outbox.py prune --days 30 # delete done jobs and their spool files
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import traceback
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTBOX_DIR = os.environ.get("ASPIRECRAFT_OUTBOX_DIR", os.path.join(APP_DIR, "outbox"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+STATES = (PENDING, RUNNING, DONE, DEAD)
+PRUNE_INTERVAL = 6 * 3600  # seconds between two automatic prunes
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (state, next_attempt_at);
+"""
+
+
+class Job:
+    def __init__(self, id, kind, payload, attempts):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+
+
+class Outbox:
+    def __init__(self, directory=OUTBOX_DIR, workers=2, max_attempts=6, backoff_base=5.0,
+                 backoff_max=600.0, lease_seconds=600.0, poll_interval=1.0, retention_days=None):
+        self.directory = directory
+        self.spool_dir = os.path.join(directory, "spool")
+        self.db_path = os.path.join(directory, "outbox.sqlite3")
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retention_days = retention_days
+
+        self._handlers = {}
+        self._threads = []
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._in_flight = 0
+        self._next_prune = 0.0
+        self._prune_lock = threading.Lock()
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.close()
+
+    # --- connections -------------------------------------------------------
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self):
+        # SQLite connections are not shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- producer side -----------------------------------------------------
+
+    def register(self, kind, handler):
+        # handler(job) runs on a worker thread. It may return a list of
+        # (kind, payload) or (kind, payload, delay) follow-up jobs, which are
+        # committed together with the job being marked done.
+        self._handlers[kind] = handler
+
+    def spool_path(self, *parts):
+        path = os.path.join(self.spool_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def enqueue(self, kind, payload, delay=0.0):
+        conn = self._conn()
+        job_id = self._insert(conn, kind, payload, delay)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def _insert(self, conn, kind, payload, delay=0.0):
+        now = time.time()
+        cursor = conn.execute(
+            "INSERT INTO jobs (kind, payload, state, created_at, updated_at, next_attempt_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload), PENDING, now, now, now + delay),
+        )
+        return cursor.lastrowid
+
+    # --- workers -----------------------------------------------------------
+
+    def start(self):
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"outbox-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _claim(self):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Due pending jobs, plus running jobs whose worker has held them
+            # longer than the lease (it died or got stuck)
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs "
+                "WHERE (state = ? AND next_attempt_at <= ?) OR (state = ? AND updated_at < ?) "
+                "ORDER BY next_attempt_at, id LIMIT 1",
+                (PENDING, now, RUNNING, now - self.lease_seconds),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (RUNNING, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return Job(row[0], row[1], json.loads(row[2]), row[3] + 1)
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.OperationalError:
+                logger.exception("Could not claim an outbox job")
+                job = None
+
+            if job is None:
+                self._prune_when_due()
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            with self._wakeup:
+                self._in_flight += 1
+            try:
+                self._run(job)
+            except Exception:
+                # The job stays "running" and is recovered after its lease
+                logger.exception("Could not record the result of outbox job %s", job.id)
+            finally:
+                with self._wakeup:
+                    self._in_flight -= 1
+                    self._wakeup.notify_all()
+
+    def _heartbeat(self, job, finished):
+        # Renew the lease while the handler runs, so a slow job (a large email,
+        # a slow SMTP server) is not claimed again by another worker
+        conn = self._connect()
+        try:
+            while not finished.wait(self.lease_seconds / 3):
+                try:
+                    conn.execute(
+                        "UPDATE jobs SET updated_at = ? WHERE id = ? AND state = ? AND attempts = ?",
+                        (time.time(), job.id, RUNNING, job.attempts),
+                    )
+                except sqlite3.OperationalError:
+                    logger.exception("Could not renew the lease of outbox job %s", job.id)
+        finally:
+            conn.close()
+
+    def _run(self, job):
+        conn = self._conn()
+        handler = self._handlers.get(job.kind)
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, finished),
+                                     name=f"outbox-heartbeat-{job.id}", daemon=True)
+        heartbeat.start()
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {job.kind!r}")
+            follow_ups = handler(job) or []
+        except Exception:
+            error = traceback.format_exc()
+            now = time.time()
+            if job.attempts >= self.max_attempts:
+                logger.error("Outbox job %s (%s) moved to dead letters:\n%s", job.id, job.kind, error)
+                self._finish(conn, job, "state = ?, updated_at = ?, last_error = ?", (DEAD, now, error))
+            else:
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (job.attempts - 1)))
+                logger.warning("Outbox job %s (%s) failed, retrying in %.0fs", job.id, job.kind, delay)
+                self._finish(conn, job, "state = ?, updated_at = ?, next_attempt_at = ?, last_error = ?",
+                             (PENDING, now, now + delay, error))
+            return
+        finally:
+            finished.set()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._finish(conn, job, "state = ?, updated_at = ?, last_error = NULL", (DONE, time.time())):
+                for follow_up in follow_ups:
+                    self._insert(conn, *follow_up)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _finish(self, conn, job, assignments, params):
+        # Record the outcome only if this worker still holds the job: each
+        # claim bumps `attempts`, so a job whose lease expired and was claimed
+        # again is left to its new worker (and its follow-ups are not added twice)
+        updated = conn.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND state = ? AND attempts = ?",
+            (*params, job.id, RUNNING, job.attempts),
+        ).rowcount
+        if not updated:
+            logger.warning("Outbox job %s (%s) lost its lease; result discarded", job.id, job.kind)
+        return bool(updated)
+
+    # --- retention ---------------------------------------------------------
+
+    def prune(self, older_than_seconds):
+        # Delete done jobs, and spool files, older than the cutoff: (jobs,
+        # files). Files that a pending, running or dead-lettered job refers to,
+        # or that sit in the same folder as one, are kept.
+        cutoff = time.time() - older_than_seconds
+        conn = self._conn()
+        jobs = conn.execute("DELETE FROM jobs WHERE state = ? AND updated_at < ?", (DONE, cutoff)).rowcount
+        in_use = set()
+        for (payload,) in conn.execute("SELECT payload FROM jobs WHERE state != ?", (DONE,)):
+            for value in _strings(json.loads(payload)):
+                path = os.path.normpath(value)
+                in_use.update((path, os.path.dirname(path)))
+
+        files = 0
+        emptied = set()  # folders this prune removed something from
+        for folder, _, names in os.walk(self.spool_dir, topdown=False):
+            folder = os.path.normpath(folder)
+            for name in names:
+                path = os.path.join(folder, name)
+                try:
+                    if folder in in_use or path in in_use or os.path.getmtime(path) >= cutoff:
+                        continue
+                    os.remove(path)
+                    files += 1
+                    emptied.add(folder)
+                except FileNotFoundError:
+                    pass  # pruned by another process at the same time
+            if folder != os.path.normpath(self.spool_dir):
+                try:
+                    if not os.listdir(folder) and (folder in emptied or os.path.getmtime(folder) < cutoff):
+                        os.rmdir(folder)
+                        emptied.add(os.path.dirname(folder))
+                except OSError:
+                    pass
+        return jobs, files
+
+    def _prune_when_due(self):
+        # Run by an idle worker; the others skip it while one is pruning
+        if not self.retention_days or time.time() < self._next_prune:
+            return
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_prune = time.time() + PRUNE_INTERVAL
+            jobs, files = self.prune(self.retention_days * 86400)
+            if jobs or files:
+                logger.info("Outbox pruned %s done job(s) and %s spool file(s)", jobs, files)
+        except (OSError, sqlite3.OperationalError):
+            logger.exception("Could not prune the outbox")
+        finally:
+            self._prune_lock.release()
+
+    def shutdown(self, timeout=30.0):
+        # Stop claiming new jobs and let the ones in flight finish. Anything
+        # still pending stays in the database for the next start.
+        self._stopping.set()
+        deadline = time.time() + timeout
+        with self._wakeup:
+            self._wakeup.notify_all()
+            while self._in_flight and time.time() < deadline:
+                self._wakeup.wait(deadline - time.time())
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.time()))
+        self._threads = []
+
+    # --- observability -----------------------------------------------------
+
+    def stats(self):
+        now = time.time()
+        conn = self._conn()
+        stats = {state: {"count": 0, "oldest_age_seconds": None} for state in STATES}
+        rows = conn.execute("SELECT state, COUNT(*), MIN(created_at) FROM jobs GROUP BY state").fetchall()
+        for state, count, oldest in rows:
+            stats[state] = {"count": count, "oldest_age_seconds": round(now - oldest, 1) if oldest else None}
+        stats["in_flight"] = self._in_flight
+        return stats
+
+    def dead_letters(self, limit=50):
+        rows = self._conn().execute(
+            "SELECT id, kind, attempts, updated_at, last_error FROM jobs WHERE state = ? ORDER BY id DESC LIMIT ?",
+            (DEAD, limit),
+        ).fetchall()
+        return [
+            {"id": row[0], "kind": row[1], "attempts": row[2], "failed_at": row[3], "last_error": row[4]}
+            for row in rows
+        ]
+
+    def requeue_dead(self, job_id=None):
+        now = time.time()
+        query = "UPDATE jobs SET state = ?, attempts = 0, updated_at = ?, next_attempt_at = ? WHERE state = ?"
+        params = [PENDING, now, now, DEAD]
+        if job_id is not None:
+            query += " AND id = ?"
+            params.append(job_id)
+        count = self._conn().execute(query, params).rowcount
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return count
+
+
+def _strings(value):
+    # Every string in a job payload (paths, among others)
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+_outboxes = {}
+_outboxes_lock = threading.Lock()
+
+
+def get_outbox(handlers, directory=OUTBOX_DIR, workers=2, retention_days=None):
+    # One started outbox per directory per process, shared by every session
+    with _outboxes_lock:
+        outbox = _outboxes.get(directory)
+        if outbox is None:
+            outbox = Outbox(directory, workers=workers, retention_days=retention_days)
+            for kind, handler in handlers.items():
+                outbox.register(kind, handler)
+            outbox.start()
+            atexit.register(outbox.shutdown)
+            _outboxes[directory] = outbox
+        return outbox
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the submission outbox.")
+    parser.add_argument("--directory", default=OUTBOX_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="queue depth and age per state")
+    subparsers.add_parser("dead", help="list dead-lettered jobs")
+    requeue = subparsers.add_parser("requeue", help="move dead-lettered jobs back to pending")
+    requeue.add_argument("job_id", nargs="?", type=int)
+    prune = subparsers.add_parser("prune", help="delete done jobs and their spool files")
+    prune.add_argument("--days", type=float, default=30)
+    args = parser.parse_args()
+
+    outbox = Outbox(args.directory)
+    if args.command == "stats":
+        print(json.dumps(outbox.stats(), indent=2))
+    elif args.command == "dead":
+        for job in outbox.dead_letters():
+            print(f"#{job['id']} {job['kind']} after {job['attempts']} attempts")
+            print(job["last_error"])
+    elif args.command == "requeue":
+        print(f"Requeued {outbox.requeue_dead(args.job_id)} job(s)")
+    elif args.command == "prune":
+        jobs, files = outbox.prune(args.days * 86400)
+        print(f"Deleted {jobs} done job(s) and {files} spool file(s)")
@@ -0,0 +1,120 @@
+"""Phone number routing and validation for step 6.
+
+Built once per catalog (see catalog.Catalog) and shared by every session:
+
+- a trie over the digits of every dialing code in world-countries.json, so a
+  number pasted in international format ("+44 7700 900123" or "0044...") is
+  matched to its longest dialing code in one pass over the number and moved
+  to the right country;
+- the valid lengths of the national number (the digits after the dialing
+  code) for each dialing code, from resources/phone-number-lengths.json,
+  checked after dropping a trunk prefix typed out of habit ("07700..." under
+  +44), except where national numbers really start with 0.
+
+Both checks are O(length of the number).
+"""
+import json
+import os
+
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
+PHONE_LENGTHS_FILE = os.path.join(RESOURCES_DIR, "phone-number-lengths.json")
+
+# E.164: at most 15 digits including the country code
+MAX_DIGITS = 15
+MIN_NATIONAL_DIGITS = 4
+
+_IGNORED = str.maketrans("", "", " -.()/")
+
+# Dialing codes whose national numbers really start with 0 (Italy, San
+# Marino, Vatican City, Côte d'Ivoire): the 0 is not a trunk prefix there
+KEEP_LEADING_ZERO = {"+39", "+378", "+379", "+225"}
+
+
+def load_phone_lengths(path=PHONE_LENGTHS_FILE):
+    with open(path, encoding="utf-8") as f:
+        return {code: tuple(lengths) for code, lengths in json.load(f).items()}
+
+
+def code_digits(dialing_code):
+    # "+1-242" -> "1242"
+    return "".join(ch for ch in dialing_code if ch.isdigit())
+
+
+def normalize(number):
+    # Drop spaces and punctuation; "00" (international prefix) becomes "+"
+    number = number.strip().translate(_IGNORED)
+    if number.startswith("00"):
+        number = "+" + number[2:]
+    return number
+
+
+def strip_trunk_prefix(national, dialing_code):
+    # "07700 900123" under +44 -> "7700 900123": the 0 dialled within the
+    # country is not part of the number after the dialing code
+    if national.startswith("0") and dialing_code not in KEEP_LEADING_ZERO:
+        return national[1:]
+    return national
+
+
+class PhoneIndex:
+    def __init__(self, countries, lengths):
+        # countries: {country name: dialing code}; lengths: {dialing code: (min, max)}
+        self.lengths = dict(lengths)
+        self.trie = {}
+        for name in sorted(countries):
+            node = self.trie
+            for digit in code_digits(countries[name]):
+                node = node.setdefault(digit, {})
+            # Some codes are shared (+1, +7, ...): keep every country, with the code
+            node.setdefault("$", []).append((name, countries[name]))
+
+    def match(self, digits):
+        # Longest dialing code at the start of `digits`: ([(country, code), ...], national digits)
+        node, found, end = self.trie, None, 0
+        for index, digit in enumerate(digits):
+            node = node.get(digit)
+            if node is None:
+                break
+            if "$" in node:
+                found, end = node["$"], index + 1
+        if found is None:
+            return None, digits
+        return found, digits[end:]
+
+    def route(self, number, preferred_countries=()):
+        # (country, dialing code, national number) for a number in
+        # international format, or None if it is not in that format or the
+        # code is unknown. For a shared code the first preferred country that
+        # has it wins (e.g. the one already selected, then the residence).
+        number = normalize(number)
+        if not number.startswith("+"):
+            return None
+        countries, national = self.match(number[1:])
+        if not countries:
+            return None
+        for preferred in preferred_countries:
+            for name, code in countries:
+                if name == preferred:
+                    return name, code, strip_trunk_prefix(national, code)
+        name, code = countries[0]
+        return name, code, strip_trunk_prefix(national, code)
+
+    def length_range(self, dialing_code):
+        return self.lengths.get(dialing_code) or (MIN_NATIONAL_DIGITS, MAX_DIGITS - len(code_digits(dialing_code)))
+
+    def validate(self, phone, dialing_code):
+        # (is_valid, message) for a national number under `dialing_code`
+        phone = normalize(phone)
+        if phone.startswith("+"):
+            return False, "Please enter the number without the dialing code, or pick its country."
+        if not dialing_code:
+            return False, "Please select the country of your phone number."
+        if not phone.isdigit():
+            return False, "Phone number must contain only digits after the dialing code."
+        phone = strip_trunk_prefix(phone, dialing_code)
+        low, high = self.length_range(dialing_code)
+        if not low <= len(phone) <= high:
+            expected = f"{low}" if low == high else f"{low} to {high}"
+            return False, (f"Phone numbers for {dialing_code} have {expected} digits after the dialing code "
+                           f"(you entered {len(phone)}).")
+        return True, ""
@@ -0,0 +1,261 @@
+"""Small measurement helpers for the enrolment forms.
+
+    python profiling.py imports
+    python profiling.py reruns
+    python profiling.py deltas
+
+`imports` prints how long each heavy dependency takes to import in a fresh interpreter,
+both on its own and on top of `import streamlit` (which already pulls some of
+them in), so we can see what a cold start of each step really costs.
+
+`reruns` walks app_v2.py from step 1 to 14 headlessly, pressing Submit at
+the end, and prints how many script runs each click costs; every action
+should be one. Submitting only queues the submission: the walk uses a
+throwaway outbox directory with no workers, so nothing is rendered or sent.
+
+`deltas` walks to the thank-you page the same way and prints how many elements
+(delta messages) the last script run of each step sent to the browser, and
+their serialized size.
+
+With PROFILE_RUNS=1 the app also counts its own script runs per step for the
+current session, and the elements and bytes of the last run of each step, and
+shows them in the sidebar, e.g. to check how many reruns drawing a signature
+costs.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date
+
+PROFILE_RUNS = os.environ.get("PROFILE_RUNS", "0").lower() in ("1", "true", "yes")
+
+# Dependencies app_v2.py imports lazily, and where they are first needed:
+# a step of the form, the upload threads, or the outbox worker that renders
+# the DOCX and sends the emails
+HEAVY_DEPENDENCIES = [
+    ("streamlit_drawable_canvas", "step 12 (app_v2.py)"),
+    ("numpy", "step 12, raster signature (signature.py)"),
+    ("PIL.Image", "steps 9/10 photos (document_images.py), step 12 raster signature, worker (signature.py)"),
+    ("docx", "worker (documents.py)"),
+    ("smtplib", "worker (mailer.py)"),
+    ("email.message", "worker (mailer.py)"),
+    ("tornado.web", "steps 9/10, RESUMABLE_UPLOADS=1 (resumable_upload.py)"),
+    ("pandas", "catalog fallback only (catalog.py)"),
+    ("openpyxl", "catalog fallback only (catalog.py)"),
+]
+
+
+def measure_import(module, preload=None):
+    # Cumulative import time of `module` in microseconds, measured with
+    # -X importtime in a clean interpreter so nothing is already cached.
+    code = f"import {preload}\nimport {module}" if preload else f"import {module}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+
+    top_level = module.split(".")[0]
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        name = parts[2]
+        # Sum the top-level entries (no indentation) of our package; nested
+        # entries are already included in their parent's cumulative time.
+        if line.split("|")[2].startswith("  "):
+            continue
+        if name == top_level or name.startswith(top_level + "."):
+            cumulative += int(parts[1])
+    return cumulative
+
+
+def import_cost_report(dependencies=HEAVY_DEPENDENCIES, preload="streamlit"):
+    rows = []
+    for module, used_in in dependencies:
+        alone = measure_import(module)
+        on_top = measure_import(module, preload) if preload else None
+        rows.append((module, used_in, alone, on_top))
+    return rows
+
+
+def count_script_run(session_state, step):
+    # Number of script runs that started on each step, kept per session
+    counts = session_state.get("_script_runs")
+    if counts is None:
+        counts = session_state["_script_runs"] = {}
+    counts[step] = counts.get(step, 0) + 1
+    return counts
+
+
+class DeltaMeter:
+    # Counts the delta messages (one per element) a session's script runs send
+    # and their serialized size, per step
+    def __init__(self):
+        self.history = {}
+        self.step = None
+        self.elements = 0
+        self.bytes = 0
+
+    def start(self, step):
+        # Closes the previous run (fragment reruns count towards it) and starts a new one
+        if self.step is not None:
+            self.history[self.step] = {"elements": self.elements, "bytes": self.bytes}
+        self.step = step
+        self.elements = 0
+        self.bytes = 0
+
+    def wrap(self, enqueue):
+        def metered_enqueue(msg):
+            if msg.HasField("delta"):
+                self.elements += 1
+                self.bytes += msg.ByteSize()
+            enqueue(msg)
+        metered_enqueue.delta_meter = self
+        return metered_enqueue
+
+
+def meter_deltas(session_state, step):
+    # Start metering this script run; returns {step: {"elements", "bytes"}} for
+    # the last finished run of each step
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    meter = session_state.get("_delta_meter")
+    if meter is None:
+        meter = session_state["_delta_meter"] = DeltaMeter()
+    meter.start(step)
+    ctx = get_script_run_ctx()
+    if ctx is not None and getattr(ctx._enqueue, "delta_meter", None) is not meter:
+        ctx._enqueue = meter.wrap(ctx._enqueue)
+    return meter.history
+
+
+# What a learner enters on each step before pressing Next in the `reruns` walk
+WALK_ANSWERS = {
+    2: {"selected_option": "Self", "personal_info": "Sample Learner"},
+    3: {"dob": date(2000, 1, 1)},
+    4: {"gender": "Female"},
+    5: {"country": "United Kingdom", "nationality": "British"},
+    6: {"email": "learner@example.com", "selected_country": "United Kingdom", "dialing_code": "+44",
+        "phone_number": "7700900123"},
+    7: {"current_institution": "none", "highest_education": "Master's Degree",
+        "industry_experience": "3–5 years", "current_role": "Engineer"},
+    8: {"ielts_reason": "Immigration: Meeting language requirements for migration to countries like the UK, Canada, or Australia."},
+    11: {"preferred_start_date": "ASAP", "special_requirements": "none", "consent": True},
+    12: {"signature": {"width": 600, "height": 150, "strokes": [{"width": 2, "path": [["M", 10, 10], ["L", 90, 40]]}]}},
+}
+
+
+def _open_app(script):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), script), default_timeout=60)
+    app.run()
+    return app
+
+
+def _without_outbox_workers():
+    # Submitting then just writes the job to a temporary outbox that nothing
+    # reads (set before the app first imports outbox.py)
+    os.environ["ASPIRECRAFT_OUTBOX_DIR"] = tempfile.mkdtemp(prefix="profiling-outbox-")
+    os.environ["OUTBOX_WORKERS"] = "0"
+    from settings import reload_settings
+
+    reload_settings()
+
+
+def _click(app, label):
+    # The only Next/Back button on screen (a plain button or a form's submit button)
+    return lambda: next(button for button in app.button if button.label == label).click().run()
+
+
+def _walk_to_review(app, act):
+    # Fill in each step with WALK_ANSWERS and press Next until the Final Review
+    while app.session_state["step"] < 13:
+        step = app.session_state["step"]
+        if step == 8:
+            act("select a subject area", lambda: app.multiselect(key="subject_areas").select("IELTS").run())
+        for key, value in WALK_ANSWERS.get(step, {}).items():
+            app.session_state[key] = value
+        act("Next", _click(app, "Next"))
+
+
+def rerun_report(script="app_v2.py"):
+    # (step, action, step after, script runs) for a walk forward through the
+    # form, all the way back to step 1, forward again with the saved answers
+    # and Submit
+    _without_outbox_workers()
+    app = _open_app(script)
+    rows = []
+
+    def act(action, do):
+        step = app.session_state["step"]
+        before = sum(app.session_state["_script_runs"].values())
+        do()
+        if app.exception:
+            raise RuntimeError(f"step {step}, {action}: {app.exception[0].value}")
+        rows.append((step, action, app.session_state["step"], sum(app.session_state["_script_runs"].values()) - before))
+
+    _walk_to_review(app, act)
+    while app.session_state["step"] > 1:
+        act("Back", _click(app, "Back"))
+    while app.session_state["step"] < 13:
+        act("Next", _click(app, "Next"))
+    act("Submit", _click(app, "Submit"))
+    return rows
+
+
+def delta_report(script="app_v2.py"):
+    # {step: {"elements", "bytes"}} of the last script run of each step on the
+    # way to the Final Review, plus one rerun of the review itself and the
+    # thank-you page after Submit
+    os.environ["PROFILE_RUNS"] = "1"
+    _without_outbox_workers()
+    app = _open_app(script)
+
+    def act(action, do):
+        do()
+        if app.exception:
+            raise RuntimeError(f"{action}: {app.exception[0].value}")
+
+    _walk_to_review(app, act)
+    act("rerun the review", app.run)
+    act("Submit", _click(app, "Submit"))
+    act("close the last run", app.run)
+    return app.session_state["_delta_meter"].history
+
+
+def _format_ms(microseconds):
+    if microseconds is None:
+        return "n/a"
+    return f"{microseconds / 1000:.1f} ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performance measurements for the enrolment forms.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("imports", help="report the import cost of each heavy dependency")
+    subparsers.add_parser("reruns", help="count the script runs each click costs, steps 1-14")
+    subparsers.add_parser("deltas", help="count the elements and bytes each step sends, steps 1-14")
+    args = parser.parse_args()
+
+    if args.command == "imports":
+        print(f"{'module':<28}{'alone':>12}{'after streamlit':>18}  used in")
+        for module, used_in, alone, on_top in import_cost_report():
+            print(f"{module:<28}{_format_ms(alone):>12}{_format_ms(on_top):>18}  {used_in}")
+    elif args.command == "reruns":
+        print(f"{'step':<6}{'action':<24}{'now on':>8}{'script runs':>13}")
+        for step, action, step_after, runs in rerun_report():
+            print(f"{step:<6}{action:<24}{step_after:>8}{runs:>13}")
+    elif args.command == "deltas":
+        print(f"{'step':<6}{'elements':>10}{'bytes':>10}")
+        for step, sent in sorted(delta_report().items()):
+            print(f"{step:<6}{sent['elements']:>10}{sent['bytes']:>10}")
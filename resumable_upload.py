@@ -0,0 +1,476 @@
+"""Chunked, resumable uploads written straight to disk.
+
+`st.file_uploader` sends a whole file in one request, keeps it in server
+memory and starts again from zero when the connection drops. The uploader
+component in components/resumable_uploader/ sends files in 1 MB chunks to a
+small upload server instead (Tornado, in a thread of the app process):
+
+    POST  /uploads        {"name", "type", "size"}  -> {"id", "offset": 0}
+    GET   /uploads/<id>                              -> {"id", "offset", "size"}
+    PATCH /uploads/<id>   one chunk, with an Upload-Offset header
+
+Every request carries the session's upload token (`Authorization: Bearer`),
+which the app signs with a key kept in the upload folder; an upload can only
+be continued, and only be accepted by the app, with a token of the session
+that started it. The sizes are checked when an upload is created, before any
+bytes are written: at most UPLOAD_QUOTA_MB per session and UPLOAD_SPOOL_MB
+(default 500) for all unfinished uploads together. Uploads left unfinished
+for SPOOL_EXPIRY_HOURS are removed by the server every few minutes.
+
+Each chunk is appended to a spool file in the blob store's tmp/ folder. If a
+request fails, the browser asks for the offset the server has and carries on
+from there, after the connection comes back or even after a reload (the
+learner picks the same file again). The last chunk carries the SHA-256 the
+browser computed while reading the file; the server checks the spool file
+against it and moves it into the blob store, and the app turns the finished
+upload into the same handle as an `st.file_uploader` upload
+(`store_spooled_upload`).
+
+RESUMABLE_UPLOADS=1 turns the component on (by default the app uses
+`st.file_uploader`). The server listens on plain HTTP on UPLOAD_SERVER_PORT
+(default 8765) of the host the app is served from, and only answers pages of
+that host (or UPLOAD_ALLOWED_ORIGINS). An app served over HTTPS needs a proxy
+path to it (with TLS), set in UPLOAD_SERVER_URL.
+
+    python resumable_upload.py serve     # run the upload server on its own
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import mimetypes
+import os
+import secrets
+import threading
+import time
+
+from blob_store import add_upload_handle, get_blob_store
+from settings import get_settings
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPONENT_DIR = os.path.join(APP_DIR, "components", "resumable_uploader")
+CHUNK_SIZE = 1024 * 1024  # sent by the browser per request
+MAX_CHUNK_SIZE = 8 * 1024 * 1024  # largest request body the server accepts
+MAX_NAME_LENGTH = 255
+TOKEN_HOURS = 12  # how long an upload token is valid; renewed on reruns
+SPOOL_EXPIRY_HOURS = 24  # unfinished uploads idle for longer are removed
+EXPIRY_INTERVAL = 10 * 60  # seconds between two expiry runs
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class Spool:
+    # Uploads in progress: <id>.part (the bytes received so far) and <id>.json
+    # (name, type, size, the session that started it, and sha256 once
+    # finished), next to the blob store's temporary files
+    def __init__(self, store):
+        self.store = store
+        self.directory = store.tmp_dir
+        self._finishing = set()
+
+    def _path(self, upload_id, extension):
+        return os.path.join(self.directory, upload_id + extension)
+
+    def record(self, upload_id):
+        if not upload_id.isalnum():
+            return None
+        try:
+            with open(self._path(upload_id, ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, upload_id, record):
+        tmp_path = self._path(upload_id, ".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self._path(upload_id, ".json"))
+
+    def records(self):
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json"):
+                record = self.record(filename[:-len(".json")])
+                if record is not None:
+                    yield filename[:-len(".json")], record
+
+    def create(self, name, mime_type, size, session, session_limit, spool_limit):
+        # The space is counted from the declared sizes, so nothing is written
+        # for an upload that would not fit: everything a session has uploaded
+        # (until expired) and every unfinished upload of the spool
+        session_bytes = spool_bytes = 0
+        for _, record in self.records():
+            if record.get("session") == session:
+                session_bytes += record["size"]
+            if "sha256" not in record:
+                spool_bytes += record["size"]
+        if session_bytes + size > session_limit:
+            raise UploadError(413, f"Your documents can take up at most {session_limit // (1024 * 1024)} MB")
+        if spool_bytes + size > spool_limit:
+            logger.warning("Upload spool full (%s bytes waiting)", spool_bytes)
+            raise UploadError(503, "Too many uploads at the moment, please try again later")
+        upload_id = secrets.token_hex(16)
+        mime_type = mime_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        open(self._path(upload_id, ".part"), "wb").close()
+        self._save(upload_id, {"name": name, "type": mime_type, "size": size, "session": session,
+                               "created": time.time()})
+        return upload_id
+
+    def check_session(self, upload_id, session):
+        record = self.record(upload_id)
+        if record is None:
+            raise UploadError(404, "Unknown upload")
+        if record.get("session") != session:
+            raise UploadError(403, "This upload belongs to another session")
+
+    def status(self, upload_id):
+        record = self.record(upload_id)
+        if record is None:
+            raise UploadError(404, "Unknown upload")
+        if "sha256" in record:
+            offset = record["size"]
+        else:
+            try:
+                offset = os.path.getsize(self._path(upload_id, ".part"))
+            except OSError:
+                raise UploadError(404, "Unknown upload") from None
+        status = {"id": upload_id, "offset": offset, "size": record["size"]}
+        if "sha256" in record:
+            status["sha256"] = record["sha256"]
+        return status
+
+    def append(self, upload_id, offset, data, sha256=None):
+        # Write one chunk at `offset`; returns True when it was the last one
+        status = self.status(upload_id)
+        if "sha256" in status or upload_id in self._finishing:
+            raise UploadError(409, "Upload already finished", offset=status["size"])
+        if offset != status["offset"]:
+            raise UploadError(409, "Offset does not match", offset=status["offset"])
+        end = offset + len(data)
+        if end > status["size"]:
+            raise UploadError(400, "More data than the declared size")
+        if end == status["size"] and not sha256:
+            raise UploadError(400, "The last chunk needs an Upload-Checksum")
+        with open(self._path(upload_id, ".part"), "ab") as f:
+            f.write(data)
+        if end < status["size"]:
+            return False
+        self._finishing.add(upload_id)
+        return True
+
+    def finish(self, upload_id, sha256):
+        # Check the spool file against the browser's hash and move it into the
+        # blob store (runs off the server's event loop: it reads the whole file)
+        try:
+            record = self.record(upload_id)
+            try:
+                self.store.put_file(self._path(upload_id, ".part"), expected_sha256=sha256)
+            except ValueError:
+                os.remove(self._path(upload_id, ".json"))
+                raise UploadError(422, "The file changed during the upload, please choose it again") from None
+            record["sha256"] = sha256
+            self._save(upload_id, record)
+            return self.status(upload_id)
+        finally:
+            self._finishing.discard(upload_id)
+
+    def expire(self, max_age):
+        # Remove uploads not written to for `max_age` seconds (finished ones
+        # only drop their record: the file is in the blob store by then)
+        now = time.time()
+        removed = 0
+        for filename in os.listdir(self.directory):
+            upload_id, extension = os.path.splitext(filename)
+            if extension != ".json" or upload_id in self._finishing:
+                continue
+            paths = [self._path(upload_id, ".json"), self._path(upload_id, ".part")]
+            try:
+                last_used = max(os.path.getmtime(path) for path in paths if os.path.exists(path))
+            except ValueError:
+                continue
+            if now - last_used > max_age:
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                removed += 1
+        return removed
+
+
+# --- upload tokens -------------------------------------------------------------
+
+def _token_key(store):
+    # Shared by the app and the server (which may run on its own) through
+    # the upload folder; made on first use
+    path = os.path.join(store.directory, "upload-token.key")
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    with open(path) as f:
+        return f.read().strip().encode()
+
+
+def _sign(key, message):
+    return hmac.new(key, message.encode(), hashlib.sha256).hexdigest()
+
+
+def upload_token(session_state):
+    # "<session>.<expires>.<signature>": the session id names the session on
+    # the upload server, which never sees the session state itself
+    session = session_state.setdefault("_upload_session", secrets.token_hex(16))
+    token = session_state.get("_upload_token")
+    if token is None or int(token.split(".")[1]) - time.time() < TOKEN_HOURS * 3600 / 2:
+        expires = int(time.time() + TOKEN_HOURS * 3600)
+        message = f"{session}.{expires}"
+        token = f"{message}.{_sign(_token_key(get_blob_store()), message)}"
+        session_state["_upload_token"] = token
+    return token
+
+
+def check_token(key, token):
+    # The session id of a valid upload token
+    try:
+        session, expires, signature = token.split(".")
+        expired = int(expires) < time.time()
+    except ValueError:
+        raise UploadError(401, "Missing or invalid upload token") from None
+    if not hmac.compare_digest(signature, _sign(key, f"{session}.{expires}")):
+        raise UploadError(401, "Missing or invalid upload token")
+    if expired:
+        raise UploadError(401, "Upload token expired, please reload the page")
+    return session
+
+
+def _token_session(token):
+    try:
+        return check_token(_token_key(get_blob_store()), str(token or ""))
+    except UploadError:
+        return None
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool():
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = Spool(get_blob_store())
+        return _spool
+
+
+def make_app(spool, key, max_size, spool_size, allowed_origins=()):
+    import tornado.web
+    from urllib.parse import urlsplit
+
+    class UploadHandler(tornado.web.RequestHandler):
+        def set_default_headers(self):
+            self.set_header("Cache-Control", "no-store")
+
+        def origin_allowed(self, origin):
+            # The component runs in an iframe served by Streamlit: on another
+            # port of the same host, or on an origin set in UPLOAD_ALLOWED_ORIGINS
+            return origin in allowed_origins or urlsplit(origin).hostname == urlsplit("//" + self.request.host).hostname
+
+        def prepare(self):
+            origin = self.request.headers.get("Origin")
+            if origin is None:
+                return
+            if not self.origin_allowed(origin):
+                return self.fail(UploadError(403, "Origin not allowed"))
+            self.set_header("Access-Control-Allow-Origin", origin)
+            self.set_header("Access-Control-Allow-Methods", "GET, POST, PATCH, OPTIONS")
+            self.set_header("Access-Control-Allow-Headers", "Authorization, Content-Type, Upload-Offset, Upload-Checksum")
+            self.set_header("Vary", "Origin")
+
+        def session(self):
+            authorization = self.request.headers.get("Authorization", "")
+            return check_token(key, authorization[len("Bearer "):] if authorization.startswith("Bearer ") else "")
+
+        def options(self, upload_id=None):
+            self.set_status(204)
+
+        def reply(self, status, body):
+            self.set_status(status)
+            self.set_header("Content-Type", "application/json")
+            self.finish(json.dumps(body))
+
+        def fail(self, error):
+            self.reply(error.status, dict(error=str(error), **error.details))
+
+        def post(self, upload_id=None):
+            try:
+                session = self.session()
+            except UploadError as error:
+                return self.fail(error)
+            try:
+                request = json.loads(self.request.body)
+                name, mime_type, size = str(request["name"]), str(request.get("type") or ""), request["size"]
+            except (ValueError, KeyError, TypeError):
+                return self.fail(UploadError(400, "Expected name and size"))
+            if upload_id is not None or not isinstance(size, int) or size < 0 or not name:
+                return self.fail(UploadError(400, "Expected name and size"))
+            if size > max_size:
+                return self.fail(UploadError(413, f"Files can be at most {max_size // (1024 * 1024)} MB"))
+            try:
+                upload_id = spool.create(os.path.basename(name)[-MAX_NAME_LENGTH:], mime_type, size,
+                                         session, max_size, spool_size)
+            except UploadError as error:
+                return self.fail(error)
+            self.reply(201, spool.status(upload_id))
+
+        def get(self, upload_id=None):
+            try:
+                spool.check_session(upload_id or "", self.session())
+                self.reply(200, spool.status(upload_id))
+            except UploadError as error:
+                self.fail(error)
+
+        async def patch(self, upload_id=None):
+            checksum = self.request.headers.get("Upload-Checksum", "")  # "sha256 <hex>"
+            sha256 = checksum[len("sha256 "):].strip().lower() if checksum.startswith("sha256 ") else None
+            try:
+                spool.check_session(upload_id or "", self.session())
+                try:
+                    offset = int(self.request.headers.get("Upload-Offset", ""))
+                except ValueError:
+                    raise UploadError(400, "Expected an Upload-Offset header") from None
+                if spool.append(upload_id, offset, self.request.body, sha256):
+                    loop = asyncio.get_running_loop()
+                    return self.reply(200, await loop.run_in_executor(None, spool.finish, upload_id, sha256))
+                self.reply(200, spool.status(upload_id))
+            except UploadError as error:
+                self.fail(error)
+
+    return tornado.web.Application([
+        (r"/uploads/?", UploadHandler),
+        (r"/uploads/([0-9a-f]{32})", UploadHandler),
+    ])
+
+
+def serve(port, ready=None):
+    # Run the upload server on this thread until the process exits
+    import tornado.ioloop
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    settings = get_settings()
+    spool = get_spool()
+    app = make_app(
+        spool, _token_key(spool.store),
+        max_size=int(settings.upload_quota_mb * 1024 * 1024),
+        spool_size=int(settings.upload_spool_mb * 1024 * 1024),
+        allowed_origins=settings.upload_allowed_origins,
+    )
+    try:
+        app.listen(port, max_body_size=MAX_CHUNK_SIZE)
+    except OSError as error:
+        # Usually another app process on this host (sharing the same spool)
+        logger.warning("Upload server not started on port %s: %s", port, error)
+        return
+    finally:
+        if ready is not None:
+            ready.set()
+    logger.info("Upload server listening on port %s", port)
+
+    def expire():
+        removed = spool.expire(SPOOL_EXPIRY_HOURS * 3600)
+        if removed:
+            logger.info("Removed %s abandoned upload(s)", removed)
+
+    expire()
+    tornado.ioloop.PeriodicCallback(expire, EXPIRY_INTERVAL * 1000).start()
+    tornado.ioloop.IOLoop.current().start()
+
+
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_upload_server():
+    # One server thread per process, started by the first uploader shown
+    global _server_started
+    with _server_lock:
+        if _server_started:
+            return
+        _server_started = True
+        ready = threading.Event()
+        thread = threading.Thread(target=serve, args=(get_settings().upload_server_port, ready),
+                                  name="upload-server", daemon=True)
+        thread.start()
+        ready.wait(5)
+
+
+_component = None
+
+
+def resumable_uploader(label, types, key, multiple=True, on_change=None):
+    # The uploader component; its value (in st.session_state[key]) is the
+    # list of finished uploads, each {"id", "name", "type", "size", "sha256"}
+    global _component
+    import streamlit as st
+    import streamlit.components.v1 as components
+
+    if _component is None:
+        _component = components.declare_component("resumable_uploader", path=COMPONENT_DIR)
+    start_upload_server()
+    settings = get_settings()
+    return _component(
+        label=label, types=list(types), multiple=multiple,
+        endpoint=settings.upload_server_url, port=settings.upload_server_port,
+        token=upload_token(st.session_state),
+        chunk_size=CHUNK_SIZE, max_size=int(settings.upload_quota_mb * 1024 * 1024),
+        key=key, default=[], on_change=on_change,
+    )
+
+
+def store_spooled_upload(session_state, upload, types=None):
+    # (handle, warning) for an upload the component reports as finished. The
+    # browser only says which upload it was; name, size and hash come from
+    # the spool. The upload must have been started by this session, or by an
+    # earlier one of the same browser (resumed after a reload), whose token
+    # the component sends back.
+    record = get_spool().record(str(upload.get("id", "")))
+    name = (record or upload).get("name", "file")
+    if record is None or "sha256" not in record:
+        return None, f"{name} was not uploaded completely. Please choose it again."
+    if record.get("session") is None or record["session"] not in (
+            session_state.get("_upload_session"), _token_session(upload.get("token"))):
+        return None, f"{name} was not uploaded completely. Please choose it again."
+    if types and os.path.splitext(name)[1].lower().lstrip(".") not in types:
+        return None, f"{name} was not uploaded: please choose a {', '.join(types)} file."
+    path = get_blob_store().path(record["sha256"])
+    if not os.path.exists(path):
+        return None, f"{name} is no longer available. Please choose it again."
+
+    def put():
+        os.utime(path)  # mark the blob as in use, like storing it again
+        return record["sha256"], record["size"]
+
+    return add_upload_handle(session_state, "spool:" + upload["id"], name, record["type"], record["size"],
+                             record["sha256"], put)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable upload server.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="run the upload server on its own")
+    serve_parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO)
+        serve(args.port or get_settings().upload_server_port)
@@ -0,0 +1,147 @@
+"""Settings of the app and its outbox workers, resolved once per process.
+
+Each setting is looked up in the environment first, then in `.env` next to
+this file, then in Streamlit secrets (`.streamlit/secrets.toml`), and
+converted to its type. `get_settings()` returns the same immutable Settings to
+every caller, so nothing on the submit path reads `.env` or the secrets again.
+After editing either, `reload_settings()` resolves them afresh; connections
+and workers already started keep the settings they were made with, except the
+SMTP pool, which is looked up per email and so follows the new server and
+credentials.
+
+    python settings.py show          # resolved settings, with credentials masked
+"""
+import argparse
+import collections
+import os
+import threading
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DOTENV_PATH = os.path.join(APP_DIR, ".env")
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def parse_list(value):
+    # "a@x.com, b@x.com" (or a TOML list) -> ("a@x.com", "b@x.com")
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(item.strip() for item in value if item.strip())
+
+
+# (attribute, key in the environment / .env / secrets, type, default)
+SETTINGS = (
+    # SMTP account the forms are sent from (also the team inbox by default)
+    ("sender_email", "sender_email", str, None),
+    ("sender_password", "sender_password", str, None),
+    ("smtp_host", "SMTP_HOST", str, "smtp.gmail.com"),
+    ("smtp_port", "SMTP_PORT", int, 587),
+    ("smtp_starttls", "SMTP_STARTTLS", parse_bool, True),
+    ("smtp_pool_size", "SMTP_POOL_SIZE", int, 2),
+    # Where team notifications go (empty: the sender's inbox)
+    ("team_recipients", "TEAM_RECIPIENTS", parse_list, ()),
+    ("outbox_workers", "OUTBOX_WORKERS", int, 2),
+    # Days done outbox jobs and their spool files are kept (0: forever)
+    ("outbox_retention_days", "OUTBOX_RETENTION_DAYS", float, 30.0),
+    ("team_digest", "TEAM_DIGEST", parse_bool, False),
+    ("team_digest_minutes", "TEAM_DIGEST_MINUTES", float, 30.0),
+    ("team_digest_max_submissions", "TEAM_DIGEST_MAX_SUBMISSIONS", int, 25),
+    # Uploaded documents (see blob_store.py; empty: uploads/ next to the app)
+    ("upload_dir", "UPLOAD_DIR", str, None),
+    ("upload_quota_mb", "UPLOAD_QUOTA_MB", float, 50.0),
+    # Attach the step 9/10 documents of app_v2.py to the team email (or digest)
+    ("attach_uploads", "ATTACH_UPLOADS", parse_bool, False),
+    # Chunked, resumable uploads (see resumable_upload.py); the URL is
+    # needed when browsers reach the upload server through a proxy (always
+    # for an app served over HTTPS)
+    ("resumable_uploads", "RESUMABLE_UPLOADS", parse_bool, False),
+    ("upload_server_port", "UPLOAD_SERVER_PORT", int, 8765),
+    ("upload_server_url", "UPLOAD_SERVER_URL", str, None),
+    ("upload_allowed_origins", "UPLOAD_ALLOWED_ORIGINS", parse_list, ()),
+    ("upload_spool_mb", "UPLOAD_SPOOL_MB", float, 500.0),
+    # Photos of documents are downscaled and recompressed before they are
+    # emailed (see document_images.py)
+    ("normalize_images", "NORMALIZE_IMAGES", parse_bool, True),
+    ("image_max_side", "IMAGE_MAX_SIDE", int, 2000),
+    ("image_quality", "IMAGE_QUALITY", int, 80),
+    ("signature_mode", "SIGNATURE_MODE", str, "vector"),
+    ("signature_dpi", "SIGNATURE_DPI", int, 600),
+)
+SECRET_SETTINGS = {"sender_password"}
+
+Settings = collections.namedtuple("Settings", [name for name, _, _, _ in SETTINGS])
+
+
+def _dotenv(path=DOTENV_PATH):
+    if not os.path.exists(path):
+        return {}
+    from dotenv import dotenv_values
+
+    return dotenv_values(path)
+
+
+def _streamlit_secrets():
+    # An empty mapping when there is no secrets.toml (st.secrets would show an
+    # error in the app instead)
+    try:
+        import streamlit as st
+
+        if st.secrets.load_if_toml_exists():
+            return st.secrets
+    except Exception:
+        pass
+    return {}
+
+
+def load_settings(environ=None, dotenv_path=DOTENV_PATH):
+    environ = os.environ if environ is None else environ
+    sources = (environ, _dotenv(dotenv_path), _streamlit_secrets())
+    values = {}
+    for name, key, parse, default in SETTINGS:
+        raw = next((source[key] for source in sources if source.get(key) not in (None, "")), None)
+        if raw is None:
+            values[name] = default
+            continue
+        try:
+            values[name] = parse(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"Setting {key}={raw!r} is not a valid {parse.__name__}") from None
+    return Settings(**values)
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings():
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = load_settings()
+    return _settings
+
+
+def reload_settings():
+    global _settings
+    settings = load_settings()
+    with _settings_lock:
+        _settings = settings
+    return settings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the app settings.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("show", help="resolved settings, with credentials masked")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        for name, value in get_settings()._asdict().items():
+            if name in SECRET_SETTINGS and value:
+                value = "********"
+            print(f"{name:<30}{value!r}")
@@ -0,0 +1,204 @@
+"""Signature capture helpers.
+
+Two capture modes, chosen with SIGNATURE_MODE:
+
+"vector" (default): the canonical signature is the list of freehand strokes
+from the canvas `json_data` (usually a few KB). The review screen draws it as
+SVG and it is rasterised exactly once, on the outbox worker, at
+SIGNATURE_DPI for the DOCX. Being plain JSON it can also be stored or sent
+elsewhere with the rest of an in-progress form.
+
+"raster": the canvas hands us a 600x150 RGBA array (360 KB). At capture time
+it is cropped to the strokes, flattened to grayscale and encoded as PNG once;
+the session only keeps those PNG bytes.
+
+Either way `is_signature_drawn` is a plain truth test on what the session holds.
+"""
+import io
+
+from settings import get_settings
+
+# Canvas size on step 12; the DOCX shows it 2 inches wide, so one canvas pixel
+# is 2in / 600 (in EMU) and a cropped signature keeps its drawn size.
+CANVAS_WIDTH = 600
+CANVAS_HEIGHT = 150
+EMU_PER_CANVAS_PIXEL = 1828800 // CANVAS_WIDTH
+
+CANVAS_DPI = CANVAS_WIDTH // 2  # 600 canvas pixels across 2 inches
+CURVE_STEPS = 8  # line segments per quadratic curve when rasterising
+
+INK_THRESHOLD = 250  # channels darker than this count as ink on the white background
+PADDING = 4  # pixels of white kept around the strokes
+
+
+def compact_signature(image_data):
+    # PNG bytes of the cropped, grayscale signature, or None if nothing was drawn
+    import numpy as np
+    from PIL import Image
+
+    if image_data is None or image_data.size == 0:
+        return None
+
+    rgb = image_data[:, :, :3]
+    ink = rgb.min(axis=2) < INK_THRESHOLD
+    if image_data.shape[2] == 4:
+        ink &= image_data[:, :, 3] > 0
+    rows = np.flatnonzero(ink.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(ink.any(axis=0))
+
+    top = max(rows[0] - PADDING, 0)
+    bottom = min(rows[-1] + PADDING + 1, image_data.shape[0])
+    left = max(cols[0] - PADDING, 0)
+    right = min(cols[-1] + PADDING + 1, image_data.shape[1])
+    cropped = image_data[top:bottom, left:right].astype(np.uint8)
+
+    # Flatten onto white so transparent pixels don't turn black in grayscale
+    image = Image.fromarray(cropped, "RGBA" if cropped.shape[2] == 4 else "RGB").convert("RGBA")
+    background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+    grayscale = Image.alpha_composite(background, image).convert("L")
+
+    stream = io.BytesIO()
+    grayscale.save(stream, format="PNG", optimize=True)
+    return stream.getvalue()
+
+
+def is_signature_drawn(signature):
+    # compact_signature() returns None for an empty canvas
+    return bool(signature)
+
+
+def png_size(png):
+    # Width and height straight from the IHDR chunk, without decoding the image
+    return int.from_bytes(png[16:20], "big"), int.from_bytes(png[20:24], "big")
+
+
+def signature_preview(signature):
+    # Something st.image can show: SVG for strokes, the PNG bytes otherwise
+    if isinstance(signature, dict):
+        return signature_svg(signature)
+    return signature
+
+
+def signature_png(signature):
+    # PNG bytes for the DOCX and their pixels-per-canvas-pixel scale
+    if isinstance(signature, dict):
+        return rasterize_signature(signature, get_settings().signature_dpi)
+    return signature, 1.0
+
+
+def capture_signature(canvas_result):
+    # What the session keeps for the signature in the configured mode
+    if get_settings().signature_mode == "vector":
+        return strokes_from_canvas(canvas_result.json_data)
+    return compact_signature(canvas_result.image_data)
+
+
+# --- vector strokes --------------------------------------------------------------
+
+def strokes_from_canvas(json_data):
+    # Freehand paths from the fabric.js canvas JSON, in canvas coordinates,
+    # e.g. {"width": 600, "height": 150, "strokes": [{"width": 2, "path": [["M", x, y], ["Q", ...], ...]}]}
+    if not json_data:
+        return None
+    strokes = []
+    for obj in json_data.get("objects", []):
+        if obj.get("type") != "path" or not obj.get("path"):
+            continue
+        # fabric keeps the points around pathOffset and positions the object by
+        # its origin; map them back to canvas space
+        scale_x = obj.get("scaleX", 1) or 1
+        scale_y = obj.get("scaleY", 1) or 1
+        stroke_width = obj.get("strokeWidth", 0)
+        offset = obj.get("pathOffset") or {"x": 0, "y": 0}
+        center_x = obj.get("left", 0)
+        center_y = obj.get("top", 0)
+        if obj.get("originX", "left") == "left":
+            center_x += (obj.get("width", 0) + stroke_width) * scale_x / 2
+        if obj.get("originY", "top") == "top":
+            center_y += (obj.get("height", 0) + stroke_width) * scale_y / 2
+
+        path = []
+        for command in obj["path"]:
+            points = command[1:]
+            mapped = []
+            for i in range(0, len(points) - 1, 2):
+                mapped.append(round((points[i] - offset["x"]) * scale_x + center_x, 1))
+                mapped.append(round((points[i + 1] - offset["y"]) * scale_y + center_y, 1))
+            path.append([command[0]] + mapped)
+        strokes.append({"width": obj.get("strokeWidth", 2), "path": path})
+
+    if not strokes:
+        return None
+    return {"width": CANVAS_WIDTH, "height": CANVAS_HEIGHT, "strokes": strokes}
+
+
+def _polylines(signature, steps=CURVE_STEPS):
+    # Each stroke as a list of points, with quadratic curves flattened
+    for stroke in signature["strokes"]:
+        points = []
+        for command in stroke["path"]:
+            op, args = command[0], command[1:]
+            if op in ("M", "L"):
+                points.append((args[0], args[1]))
+            elif op == "Q" and points:
+                x0, y0 = points[-1]
+                cx, cy, x1, y1 = args
+                for step in range(1, steps + 1):
+                    t = step / steps
+                    points.append((
+                        (1 - t) ** 2 * x0 + 2 * (1 - t) * t * cx + t ** 2 * x1,
+                        (1 - t) ** 2 * y0 + 2 * (1 - t) * t * cy + t ** 2 * y1,
+                    ))
+        if points:
+            yield stroke["width"], points
+
+
+def _bounds(signature):
+    xs, ys, pad = [], [], PADDING
+    for width, points in _polylines(signature, steps=2):
+        xs.extend(x for x, _ in points)
+        ys.extend(y for _, y in points)
+        pad = max(pad, width)
+    return min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad
+
+
+def signature_svg(signature):
+    # Inline SVG of the strokes for the review screen (no rasterising)
+    left, top, right, bottom = _bounds(signature)
+    paths = []
+    for stroke in signature["strokes"]:
+        d = " ".join(f"{command[0]} " + " ".join(str(v) for v in command[1:]) for command in stroke["path"])
+        paths.append(f'<path d="{d}" stroke-width="{stroke["width"]}"/>')
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{left:.1f} {top:.1f} {right - left:.1f} {bottom - top:.1f}" '
+        f'width="{right - left:.0f}" height="{bottom - top:.0f}" style="background:white">'
+        '<g fill="none" stroke="black" stroke-linecap="round" stroke-linejoin="round">'
+        + "".join(paths) + "</g></svg>"
+    )
+
+
+def rasterize_signature(signature, dpi=600):
+    # Grayscale PNG of the strokes at `dpi`, cropped to the signature. Returns
+    # the PNG and its pixels-per-canvas-pixel scale.
+    from PIL import Image, ImageDraw
+
+    scale = dpi / CANVAS_DPI
+    left, top, right, bottom = _bounds(signature)
+    size = (max(1, round((right - left) * scale)), max(1, round((bottom - top) * scale)))
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    for width, points in _polylines(signature):
+        scaled = [((x - left) * scale, (y - top) * scale) for x, y in points]
+        line_width = max(1, round(width * scale))
+        if len(scaled) > 1:
+            draw.line(scaled, fill=0, width=line_width, joint="curve")
+        # Round caps (and single-point dots)
+        radius = line_width / 2
+        for x, y in (scaled[0], scaled[-1]):
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=0)
+
+    stream = io.BytesIO()
+    image.save(stream, format="PNG", optimize=True)
+    return stream.getvalue(), scale
@@ -0,0 +1,329 @@
+"""Submission pipeline: the step-13 Submit button only enqueues a job.
+
+A "submission" job renders the DOCX on an outbox worker and then fans out into
+one "email" job per message (team + learner), so a failed learner email is
+retried on its own without re-sending the team email.
+
+With TEAM_DIGEST=1 the team notification is not sent per submission. It is
+added to a digest on disk instead, which is flushed as a single email (summary
+table + one ZIP of all the DOCX files) every TEAM_DIGEST_MINUTES minutes or as
+soon as TEAM_DIGEST_MAX_SUBMISSIONS submissions are waiting, whichever comes
+first. Learner confirmations are always sent straight away.
+"""
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import uuid
+import zipfile
+from datetime import date, datetime
+
+from blob_store import get_blob_store
+from document_images import normalized_handle
+from documents import build_submission_docx
+from form_schema import RECORD_KEYS, get_form_schema
+from mailer import send_email_with_attachments
+from outbox import get_outbox
+from settings import get_settings
+from signature import signature_png as signature_to_png
+
+SUBJECT_LEARNER = "Thank You for Signing Up – Next Steps for Your Journey with AspireCraft"
+BODY_TEAM = "AspireCraft Form submitted. Please find the attached files."
+BODY_LEARNER = """
+            <html>
+            <body>
+                <p>Dear {name},</p>
+
+                <p>Thank you for completing the registration form! We’re excited to have you take the first step toward unlocking your potential with AspireCraft.</p>
+
+                <p><strong>What’s Next?</strong></p>
+
+                <p>We will soon invite you to an <strong>Online Orientation Session</strong>, where you will:</p>
+                <ul>
+                    <li>Learn more about the program and how it can benefit you.</li>
+                    <li>Get detailed guidance on the opportunities available to you.</li>
+                    <li>Meet some of our team members who will support you throughout your journey.</li>
+                </ul>
+
+                <p><strong>Look Out for Our Invitation</strong></p>
+                <p>You’ll receive an email from us shortly with the link to join the orientation session. Please ensure you have a stable internet connection and a device to access the session.</p>
+
+                <p>If you have any questions or need assistance, feel free to contact us:</p>
+                <ul>
+                    <li><strong>Email:</strong> enquiries@aspirecraft.co.uk</li>
+                    <li><strong>WhatsApp:</strong> +44 7711 317561</li>
+                </ul>
+
+                <p>We look forward to welcoming you online and helping you craft your success!</p>
+
+                <p><strong>Warm regards,</strong></p>
+                <p>The AspireCraft Team<br>
+                <em>Crafting Success, Empowering Futures</em></p>
+            </body>
+            </html>
+            """
+
+
+def form_snapshot(session_state):
+    # JSON-serialisable copy of everything the DOCX needs (the keys come from
+    # the form schema)
+    form = {key: session_state.get(key) for key in RECORD_KEYS}
+    dob = session_state.get("dob")
+    form["dob"] = dob.strftime('%d-%m-%Y') if dob else 'Not Provided'
+    return form
+
+
+def submission_record(session_state):
+    # The normalized record of the form (snapshot + summary, see
+    # FormSchema.record). It is built once and kept in the session under the
+    # hash of the snapshot, so review reruns and Submit reuse it until an
+    # answer changes.
+    form = form_snapshot(session_state)
+    digest = hashlib.sha1(json.dumps(form, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    cached = session_state.get("_submission_record")
+    if cached is not None and cached["digest"] == digest:
+        return cached
+    record = get_form_schema().record(form, digest)
+    session_state["_submission_record"] = record
+    return record
+
+
+def team_subject(record):
+    form = record["form"]
+    return f"AspireCraft - Country: {form['country']} Name: {form['personal_info']} Submission Date: {date.today()}"
+
+
+def enqueue_submission(session_state):
+    outbox = get_submission_outbox()
+    submission_id = uuid.uuid4().hex
+    record = submission_record(session_state)
+
+    signature_path = None
+    signature = session_state.get("signature")
+    if isinstance(signature, dict):
+        # Vector strokes; rasterised on the worker at DOCX resolution
+        signature_path = outbox.spool_path(submission_id, "signature.json")
+        with open(signature_path, "w", encoding="utf-8") as f:
+            json.dump(signature, f)
+    elif signature:
+        # Already the compact PNG produced at capture time
+        signature_path = outbox.spool_path(submission_id, "signature.png")
+        with open(signature_path, "wb") as f:
+            f.write(signature)
+
+    payload = {
+        "submission_id": submission_id,
+        "record": record,
+        "signature_path": signature_path,
+        "subject_team": team_subject(record),
+    }
+    if get_settings().attach_uploads:
+        # Handles of the supporting documents (steps 9 and 10) in the blob
+        # store, attached to the team email / digest ZIP
+        payload["uploads"] = list(session_state.get("files_step_9") or []) + list(session_state.get("files_step_10") or [])
+    return outbox.enqueue("submission", payload)
+
+
+def payload_record(payload):
+    # Jobs queued before records existed only carry the form snapshot
+    if "record" not in payload:
+        payload["record"] = get_form_schema().record(payload["form"])
+    return payload["record"]
+
+
+def handle_submission(job):
+    outbox = get_submission_outbox()
+    payload = job.payload
+    record = payload_record(payload)
+    form = record["form"]
+
+    signature_png, signature_scale = None, 1.0
+    if payload["signature_path"]:
+        if payload["signature_path"].endswith(".json"):
+            with open(payload["signature_path"], encoding="utf-8") as f:
+                signature_png, signature_scale = signature_to_png(json.load(f))
+        else:
+            with open(payload["signature_path"], "rb") as f:
+                signature_png = f.read()
+
+    # Keep the learner's name in the file name, but not path separators
+    safe_name = re.sub(r'[\\/:*?"<>|]+', "_", form.get('personal_info') or 'Unnamed')
+    doc_path = outbox.spool_path(payload["submission_id"], f"AspireCraft_Form_Submission_{safe_name}.docx")
+    build_submission_docx(record, signature_png, doc_path, signature_scale)
+
+    if get_settings().team_digest:
+        team_follow_ups = add_to_digest(outbox, payload, doc_path)
+    else:
+        team_follow_ups = [("email", {
+            "to": None,  # the team inbox, resolved when sending
+            "subject": payload["subject_team"],
+            "body": BODY_TEAM,
+            "attachment_path": doc_path,
+            "uploads": payload.get("uploads", []),
+        })]
+
+    return team_follow_ups + [
+        ("email", {
+            "to": [form["email"]],
+            "subject": SUBJECT_LEARNER,
+            "body": BODY_LEARNER.format(name=form["personal_info"]),
+            "attachment_path": None,
+        }),
+    ]
+
+
+def handle_email(job):
+    payload = job.payload
+    settings = get_settings()
+    sender_email = settings.sender_email
+    sender_password = settings.sender_password
+    receiver_email = payload["to"] or list(settings.team_recipients) or [sender_email]
+    if payload["attachment_path"] and not os.path.exists(payload["attachment_path"]):
+        raise FileNotFoundError(payload["attachment_path"])
+    # Uploaded documents are streamed from the blob store, never read whole;
+    # photos go as their normalized copies (see document_images.py)
+    store = get_blob_store()
+    handles = [normalized_handle(handle) for handle in payload.get("uploads", [])]
+    uploads = [(store.path(handle["sha256"]), handle["name"]) for handle in handles]
+    for path, _ in uploads:
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+    send_email_with_attachments(
+        sender_email, sender_password, receiver_email, payload["subject"], payload["body"],
+        files=uploads, local_file_path=payload["attachment_path"],
+    )
+
+
+# --- team digest ---------------------------------------------------------------
+
+_digest_lock = threading.Lock()
+
+
+def _digest_dirs(outbox):
+    pending = os.path.join(outbox.spool_dir, "digest", "pending")
+    batches = os.path.join(outbox.spool_dir, "digest", "batches")
+    os.makedirs(pending, exist_ok=True)
+    os.makedirs(batches, exist_ok=True)
+    return pending, batches
+
+
+def add_to_digest(outbox, payload, doc_path):
+    pending, _ = _digest_dirs(outbox)
+    form = payload_record(payload)["form"]
+    entry = {
+        "submitted_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "name": form.get("personal_info"),
+        "country": form.get("country"),
+        "email": form.get("email"),
+        "phone": f"{form.get('dialing_code') or ''}{form.get('phone_number') or ''}",
+        "services": list(form.get("selected_course") or {}),
+        "doc_path": doc_path,
+        "uploads": payload.get("uploads", []),
+    }
+    with _digest_lock:
+        # Written under a temporary name first so a flush never sees half an entry
+        entry_path = os.path.join(pending, f"{payload['submission_id']}.json")
+        with open(entry_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(entry_path + ".tmp", entry_path)
+        waiting = len([name for name in os.listdir(pending) if name.endswith(".json")])
+
+    settings = get_settings()
+    if waiting >= settings.team_digest_max_submissions:
+        return [("digest_flush", {})]
+    if waiting == 1:
+        # First entry of a new digest: make sure it goes out within the window.
+        # The flush names this entry, so it does nothing if a size-triggered
+        # flush has already sent the digest (instead of cutting the next one short)
+        return [("digest_flush", {"batch": payload["submission_id"]}, settings.team_digest_minutes * 60)]
+    return []
+
+
+def handle_digest_flush(job):
+    outbox = get_submission_outbox()
+    pending, batches = _digest_dirs(outbox)
+
+    # The batch is named after this job, so when building or sending it
+    # fails after the entries were taken out of pending/, the retry finds
+    # them there again instead of an empty digest
+    batch_dir = os.path.join(batches, f"job-{job.id}")
+    with _digest_lock:
+        if not os.path.isdir(batch_dir):
+            # Nothing waiting, or not the digest this timed flush was scheduled
+            # for: a size-triggered flush already took it
+            if not any(name.endswith(".json") for name in os.listdir(pending)):
+                return []
+            batch = job.payload.get("batch")
+            if batch and not os.path.exists(os.path.join(pending, f"{batch}.json")):
+                return []
+            os.replace(pending, batch_dir)
+            os.makedirs(pending, exist_ok=True)
+
+    entries = []
+    for name in sorted(os.listdir(batch_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(batch_dir, name), encoding="utf-8") as f:
+                entries.append(json.load(f))
+    entries.sort(key=lambda entry: entry["submitted_at"])
+
+    # One compressed archive with every DOCX in the digest, and each
+    # submission's uploaded documents in a folder next to it
+    archive_path = os.path.join(batch_dir, f"AspireCraft_Submissions_{date.today():%Y%m%d}_{job.id}.zip")
+    store = get_blob_store()
+    used_names = set()
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for entry in entries:
+            arcname = _unique_name(os.path.basename(entry["doc_path"]), used_names)
+            archive.write(entry["doc_path"], arcname)
+            folder = os.path.splitext(arcname)[0] + " - documents"
+            for handle in map(normalized_handle, entry.get("uploads", [])):
+                archive.write(store.path(handle["sha256"]), _unique_name(f"{folder}/{handle['name']}", used_names))
+
+    return [("email", {
+        "to": None,
+        "subject": f"AspireCraft - {len(entries)} Form Submissions - Digest {date.today()}",
+        "body": digest_body(entries),
+        "attachment_path": archive_path,
+    })]
+
+
+def _unique_name(arcname, used_names):
+    # "name.docx", then "name (2).docx", ... for names already in the archive
+    stem, extension = os.path.splitext(arcname)
+    counter = 2
+    while arcname in used_names:
+        arcname = f"{stem} ({counter}){extension}"
+        counter += 1
+    used_names.add(arcname)
+    return arcname
+
+
+def digest_body(entries):
+    rows = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(value))}</td>" for value in (
+            entry["submitted_at"], entry["name"], entry["country"], entry["email"], entry["phone"],
+            ", ".join(entry["services"]),
+        )) + "</tr>"
+        for entry in entries
+    )
+    return f"""
+    <html>
+    <body>
+        <p>{len(entries)} AspireCraft form(s) submitted. The completed forms are in the attached archive.</p>
+        <table border="1" cellpadding="4" cellspacing="0">
+            <tr><th>Submitted</th><th>Name</th><th>Country</th><th>Email</th><th>Phone</th><th>Services</th></tr>
+            {rows}
+        </table>
+    </body>
+    </html>
+    """
+
+
+def get_submission_outbox():
+    return get_outbox({
+        "submission": handle_submission,
+        "email": handle_email,
+        "digest_flush": handle_digest_flush,
+    }, workers=get_settings().outbox_workers, retention_days=get_settings().outbox_retention_days)
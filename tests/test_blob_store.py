@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+import blob_store
+import settings
+
+
+class Upload(io.BytesIO):
+    # The parts of an UploadedFile that store_upload uses
+    def __init__(self, file_id, name, data):
+        super().__init__(data)
+        self.file_id, self.name, self.type, self.size = file_id, name, "application/pdf", len(data)
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setenv("UPLOAD_QUOTA_MB", "1")
+    settings.reload_settings()
+    yield
+    monkeypatch.undo()
+    settings.reload_settings()
+
+
+def test_same_content_again_is_not_charged():
+    session_state = {}
+    data = b"x" * (700 * 1024)
+    handle, warning = blob_store.store_upload(session_state, Upload("a", "scan.pdf", data))
+    assert warning is None
+    again, warning = blob_store.store_upload(session_state, Upload("b", "scan (1).pdf", data))
+    assert warning is None
+    assert again["sha256"] == handle["sha256"]
+
+
+def test_new_content_over_quota_is_refused():
+    session_state = {}
+    blob_store.store_upload(session_state, Upload("a", "scan.pdf", b"x" * (700 * 1024)))
+    handle, warning = blob_store.store_upload(session_state, Upload("b", "other.pdf", b"y" * (700 * 1024)))
+    assert handle is None
+    assert "at most 1 MB" in warning
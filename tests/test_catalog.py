@@ -0,0 +1,11 @@
+import catalog
+
+
+def test_catalog_without_the_spreadsheet(tmp_path, monkeypatch):
+    # A deployment may ship only the compiled CPD catalog
+    monkeypatch.setattr(catalog, "CPD_COURSE_FILE", str(tmp_path / "CPD_course_list.xlsx"))
+    monkeypatch.setattr(catalog, "_catalogs", {})
+    files = catalog._source_files(catalog.SUBJECT_AREA_FILE, with_courses=True)
+    assert catalog.CPD_COURSE_FILE not in files
+    assert catalog.CPD_CATALOG_FILE in files
+    assert catalog.get_catalog().category_courses
@@ -0,0 +1,29 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+APP_V2 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app_v2.py")
+
+
+def submit_contact(country, dialing_code, phone_number):
+    at = AppTest.from_file(APP_V2, default_timeout=60).run()
+    at.session_state["step"] = 6
+    at.run()
+    at.selectbox(key="selected_country").set_value(country)
+    at.session_state["dialing_code"] = dialing_code
+    at.text_input(key="phone_number").set_value(phone_number)
+    at.text_input(key="email").set_value("learner@example.com")
+    at.button[0].click().run()  # Next
+    return at
+
+
+def test_italian_number_keeps_its_leading_zero():
+    at = submit_contact("Italy", "+39", "06 1234 5678")
+    assert at.session_state["phone_number"] == "0612345678"
+    assert at.session_state["step"] == 7
+
+
+def test_trunk_prefix_is_dropped_elsewhere():
+    at = submit_contact("United Kingdom", "+44", "07700 900123")
+    assert at.session_state["phone_number"] == "7700900123"
+    assert at.session_state["step"] == 7
@@ -0,0 +1,55 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+import submission
+from outbox import Job, Outbox
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    outbox = Outbox(str(tmp_path), workers=0)
+    monkeypatch.setattr(submission, "get_submission_outbox", lambda: outbox)
+    return outbox
+
+
+def add_entry(outbox, submission_id, doc_path):
+    pending, _ = submission._digest_dirs(outbox)
+    entry = {"submitted_at": "2024-01-01 10:00", "name": "Ada", "country": "Italy", "email": "ada@example.com",
+             "phone": "+39 06 1234 5678", "services": [], "doc_path": doc_path, "uploads": []}
+    with open(os.path.join(pending, f"{submission_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+
+
+def test_flush_that_fails_partway_is_sent_on_retry(outbox, tmp_path):
+    doc_path = str(tmp_path / "form.docx")
+    add_entry(outbox, "abc", doc_path)
+    job = Job(7, "digest_flush", {"batch": "abc"}, 1)
+
+    # The DOCX is not there yet: building the archive fails after the
+    # entries have been taken out of pending/
+    with pytest.raises(FileNotFoundError):
+        submission.handle_digest_flush(job)
+
+    with open(doc_path, "wb") as f:
+        f.write(b"docx")
+    job.attempts = 2
+    follow_ups = submission.handle_digest_flush(job)
+
+    assert len(follow_ups) == 1
+    kind, payload = follow_ups[0]
+    assert kind == "email"
+    with zipfile.ZipFile(payload["attachment_path"]) as archive:
+        assert archive.namelist() == ["form.docx"]
+
+
+def test_timed_flush_after_size_flush_does_nothing(outbox, tmp_path):
+    doc_path = str(tmp_path / "form.docx")
+    with open(doc_path, "wb") as f:
+        f.write(b"docx")
+    add_entry(outbox, "abc", doc_path)
+
+    assert submission.handle_digest_flush(Job(1, "digest_flush", {}, 1))
+    assert submission.handle_digest_flush(Job(2, "digest_flush", {"batch": "abc"}, 1)) == []
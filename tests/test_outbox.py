@@ -0,0 +1,47 @@
+import os
+import time
+
+from outbox import DEAD, DONE, Outbox
+
+DAY = 86400
+
+
+def spool_file(outbox, *parts):
+    path = outbox.spool_path(*parts)
+    with open(path, "w") as f:
+        f.write("x")
+    return path
+
+
+def age(path, days):
+    when = time.time() - days * DAY
+    os.utime(path, (when, when))
+
+
+def set_state(outbox, job_id, state, days_ago):
+    outbox._conn().execute("UPDATE jobs SET state = ?, updated_at = ? WHERE id = ?",
+                           (state, time.time() - days_ago * DAY, job_id))
+
+
+def test_prune_deletes_old_done_jobs_and_keeps_dead_letters(tmp_path):
+    outbox = Outbox(str(tmp_path), workers=0)
+    done_doc = spool_file(outbox, "done", "form.docx")
+    dead_doc = spool_file(outbox, "dead", "form.docx")
+    dead_signature = spool_file(outbox, "dead", "signature.png")
+    recent_doc = spool_file(outbox, "recent", "form.docx")
+    for path in (done_doc, dead_doc, dead_signature, os.path.dirname(done_doc)):
+        age(path, 40)
+
+    done = outbox.enqueue("email", {"attachment_path": done_doc})
+    dead = outbox.enqueue("email", {"attachment_path": dead_doc})
+    recent = outbox.enqueue("email", {"attachment_path": recent_doc})
+    set_state(outbox, done, DONE, 40)
+    set_state(outbox, dead, DEAD, 40)
+    set_state(outbox, recent, DONE, 1)
+
+    assert outbox.prune(30 * DAY) == (1, 1)
+    ids = [row[0] for row in outbox._conn().execute("SELECT id FROM jobs ORDER BY id")]
+    assert ids == [dead, recent]
+    assert not os.path.exists(os.path.dirname(done_doc))
+    assert os.path.exists(dead_doc) and os.path.exists(dead_signature)
+    assert os.path.exists(recent_doc)